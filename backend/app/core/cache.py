@@ -1,13 +1,235 @@
+import asyncio
 import redis
+import redis.asyncio as redis_async
+import fnmatch
+import hashlib
 import json
 import logging
-from typing import Optional, Any, Dict, List, cast
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Any, Awaitable, Callable, Dict, List, Tuple, cast
 from datetime import datetime
-from app.core.config import REDIS_HOST, REDIS_PORT, REDIS_DB, CACHE_TTL_MEDIUM, CACHE_TTL_LONG
+from app.core.config import (
+    REDIS_HOST, REDIS_PORT, REDIS_DB, REDIS_ASYNC_MAX_CONNECTIONS, CACHE_TTL_MEDIUM, CACHE_TTL_LONG,
+    L1_CACHE_ENABLED, L1_CACHE_MAX_BYTES, L1_CACHE_TTL, L1_CACHE_PREFIX_LIMITS, CACHE_INVALIDATION_CHANNEL,
+    CACHE_REFRESH_LOCK_TTL, CACHE_REFRESH_WAIT
+)
 
 # Configuration du logging
 logger = logging.getLogger(__name__)
 
+def _serialize_entry(value: Any, ttl: int, stale_ttl: int = 0) -> str:
+    """
+    Sérialise une valeur dans l'enveloppe commune {data, cached_at, ttl}.
+    Avec `stale_ttl`, l'enveloppe porte aussi son expiration douce (soft_expires_at) :
+    au-delà, l'entrée est encore servie mais doit être recalculée.
+    """
+    # Ajouter timestamp pour debug
+    cache_data: Dict[str, Any] = {
+        "data": value,
+        "cached_at": datetime.now().isoformat(),
+        "ttl": ttl
+    }
+    if stale_ttl:
+        cache_data["soft_expires_at"] = time.time() + ttl
+    return json.dumps(cache_data, ensure_ascii=False, default=str)
+
+def _is_stale(entry: Any) -> bool:
+    """True si l'enveloppe a dépassé son expiration douce"""
+    return isinstance(entry, dict) and entry.get("soft_expires_at") is not None and time.time() >= entry["soft_expires_at"]
+
+def compute_etag(value: Any) -> str:
+    """
+    ETag fort (entre guillemets) d'une valeur : empreinte de sa sérialisation JSON.
+    Stable après un aller-retour par le cache (même sérialisation, default=str).
+    """
+    serialized = json.dumps(value, ensure_ascii=False, default=str)
+    return '"' + hashlib.blake2b(serialized.encode("utf-8"), digest_size=16).hexdigest() + '"'
+
+def _etag_key(key: str) -> str:
+    """Clé Redis de l'ETag associé à une entrée (même préfixe : couverte par clear_pattern)."""
+    return f"{key}:etag"
+
+def _body_key(key: str) -> str:
+    """Clé Redis du corps de réponse gzip associé à une entrée (voir AsyncRedisCache.get_response_body)."""
+    return f"{key}:gz"
+
+def _entry_ttl(entry: Any) -> int:
+    """TTL déclaré dans l'enveloppe (TTL du L1 par défaut)"""
+    if isinstance(entry, dict) and isinstance(entry.get("ttl"), int):
+        return entry["ttl"]
+    return L1_CACHE_TTL
+
+def _unwrap_entry(cached: Any) -> Any:
+    """Extrait les données d'une enveloppe de cache."""
+    if cached and isinstance(cached, dict) and "data" in cached:
+        return cached["data"]
+    return cached
+
+# Valeur absente du cache local (None est une valeur valide)
+_MISSING = object()
+
+class LocalCache:
+    """
+    Cache L1 en mémoire du worker, devant Redis (L2), pour les données de référence.
+    
+    - seules les clés des préfixes configurés sont retenues, avec un nombre maximal
+      d'entrées par préfixe et une borne mémoire globale (taille du JSON lu dans Redis)
+    - éviction LRU ; expiration à min(TTL de l'entrée, L1_CACHE_TTL)
+    - invalidé par le canal pub/sub CACHE_INVALIDATION_CHANNEL : actif seulement
+      tant que l'écoute tourne (sinon un autre worker pourrait le laisser périmé)
+    
+    Les valeurs sont partagées entre requêtes : les appelants ne doivent pas les modifier.
+    """
+    
+    def __init__(self, prefix_limits: Dict[str, int], max_bytes: int, ttl: int):
+        # Préfixes les plus longs d'abord (le plus spécifique l'emporte)
+        self.prefix_limits = dict(sorted(prefix_limits.items(), key=lambda item: -len(item[0])))
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.enabled = False
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Tuple[str, float, int, Any]]" = OrderedDict()  # clé -> (préfixe, expiration, taille, valeur)
+        self._prefix_counts: Dict[str, int] = {}
+        self._bytes = 0
+        # Incrémentée à chaque invalidation : une lecture L2 commencée avant n'est pas retenue
+        self._generation = 0
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+    
+    def prefix_of(self, key: str) -> Optional[str]:
+        """Préfixe configuré de la clé, None si elle n'est pas éligible au L1"""
+        for prefix in self.prefix_limits:
+            if key.startswith(prefix):
+                return prefix
+        return None
+    
+    @property
+    def generation(self) -> int:
+        return self._generation
+    
+    def get(self, key: str) -> Any:
+        """Valeur en L1, ou _MISSING"""
+        if not self.enabled or self.prefix_of(key) is None:
+            return _MISSING
+        
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._misses += 1
+                return _MISSING
+            if entry[1] <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return _MISSING
+            self._entries.move_to_end(key)
+            self._hits += 1
+            return entry[3]
+    
+    def put(self, key: str, value: Any, size: int, ttl: int, generation: int) -> None:
+        """
+        Retient une valeur lue dans Redis.
+        
+        Args:
+            size: Taille du JSON lu (approximation de l'empreinte mémoire)
+            ttl: TTL de l'entrée Redis
+            generation: Génération relevée avant la lecture Redis
+        """
+        prefix = self.prefix_of(key)
+        if not self.enabled or prefix is None or size > self.max_bytes:
+            return
+        
+        with self._lock:
+            if generation != self._generation:
+                return  # Invalidation reçue pendant la lecture : valeur possiblement périmée
+            
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (prefix, time.monotonic() + min(ttl, self.ttl), size, value)
+            self._prefix_counts[prefix] = self._prefix_counts.get(prefix, 0) + 1
+            self._bytes += size
+            
+            # Limite par préfixe : évincer l'entrée la moins récente de ce préfixe
+            if self._prefix_counts[prefix] > self.prefix_limits[prefix]:
+                oldest = next(k for k, entry in self._entries.items() if entry[0] == prefix)
+                self._remove(oldest)
+                self._evictions += 1
+            
+            # Borne mémoire globale : LRU toutes clés confondues
+            while self._bytes > self.max_bytes and self._entries:
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+    
+    def _remove(self, key: str) -> None:
+        """Retire une entrée (verrou déjà pris)"""
+        prefix, _, size, _ = self._entries.pop(key)
+        self._prefix_counts[prefix] -= 1
+        self._bytes -= size
+    
+    def invalidate(self, keys: List[str]) -> None:
+        """Retire des clés précises"""
+        with self._lock:
+            self._generation += 1
+            for key in keys:
+                if key in self._entries:
+                    self._remove(key)
+    
+    def invalidate_pattern(self, pattern: str) -> None:
+        """Retire les clés correspondant à un pattern Redis (glob)"""
+        with self._lock:
+            self._generation += 1
+            for key in [k for k in self._entries if fnmatch.fnmatchcase(k, pattern)]:
+                self._remove(key)
+    
+    def clear(self) -> None:
+        """Vide le cache local"""
+        with self._lock:
+            self._generation += 1
+            self._entries.clear()
+            self._prefix_counts.clear()
+            self._bytes = 0
+    
+    def apply_invalidation(self, message: Dict[str, Any]) -> None:
+        """Applique un message d'invalidation reçu par pub/sub ({keys} | {pattern} | {all})"""
+        if message.get("all"):
+            self.clear()
+        elif message.get("pattern"):
+            self.invalidate_pattern(message["pattern"])
+        elif message.get("keys"):
+            self.invalidate(message["keys"])
+    
+    def stats(self) -> Dict[str, Any]:
+        """Statistiques du cache local (exposées par /health)"""
+        with self._lock:
+            lookups = self._hits + self._misses
+            return {
+                "enabled": self.enabled,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self._hits,
+                "misses": self._misses,
+                "hit_rate": round(self._hits / lookups, 3) if lookups else 0.0,
+                "evictions": self._evictions,
+            }
+
+# Instance globale du cache local, partagée par les clients sync et async du worker
+local_cache = LocalCache(L1_CACHE_PREFIX_LIMITS, L1_CACHE_MAX_BYTES, L1_CACHE_TTL)
+
+def _invalidation_message(keys: Optional[List[str]] = None, pattern: Optional[str] = None) -> Optional[str]:
+    """
+    Message pub/sub d'invalidation du L1, None si aucune clé concernée n'est éligible
+    (les écritures d'équipements, de tokens... ne coûtent aucune publication).
+    """
+    if pattern is not None:
+        return json.dumps({"pattern": pattern})
+    eligible = [key for key in keys or [] if local_cache.prefix_of(key) is not None]
+    if not eligible:
+        return None
+    return json.dumps({"keys": eligible})
+
 class RedisCache:
     """
     Gestionnaire de cache Redis pour l'application FastAPI.
@@ -16,6 +238,10 @@ class RedisCache:
     
     def __init__(self):
         """Initialise la connexion Redis avec gestion d'erreurs"""
+        self._pubsub: Any = None
+        self._listener: Any = None
+        # Canaux supplémentaires écoutés par le même thread pub/sub : canal -> (handler, reset)
+        self._channel_handlers: Dict[str, Tuple[Callable[[Dict[str, Any]], None], Optional[Callable[[], None]]]] = {}
         try:
             self.redis_client = redis.Redis(
                 host=REDIS_HOST,
@@ -81,10 +307,17 @@ class RedisCache:
         if not self.is_available or self.redis_client is None:
             return None
         
+        local_value = local_cache.get(key)
+        if local_value is not _MISSING:
+            return local_value
+        
         try:
+            generation = local_cache.generation
             value = self.redis_client.get(key)
             if value and isinstance(value, (str, bytes, bytearray)):
-                return json.loads(value)
+                entry = json.loads(value)
+                local_cache.put(key, entry, len(value), _entry_ttl(entry), generation)
+                return entry
             return None
             
         except json.JSONDecodeError as e:
@@ -97,7 +330,15 @@ class RedisCache:
             logger.error(f"❌ Erreur lecture cache {key}: {e}")
             return None
 
-    def set(self, key: str, value: Any, ttl: int = CACHE_TTL_MEDIUM) -> bool:
+    def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = CACHE_TTL_MEDIUM,
+        tags: Optional[List[str]] = None,
+        etag: bool = False,
+        stale_ttl: int = 0
+    ) -> bool:
         """
         Stocke une valeur dans le cache.
         
@@ -105,6 +346,10 @@ class RedisCache:
             key: Clé de cache
             value: Valeur à stocker
             ttl: Durée de vie en secondes
+            tags: Tags d'invalidation (ex: 'entity:SDDV'), voir invalidate_tags
+            etag: Stocker aussi l'ETag de la valeur (réponses conditionnelles, voir get_etag)
+            stale_ttl: Durée supplémentaire pendant laquelle l'entrée périmée reste
+                servie (stale-while-revalidate, voir AsyncRedisCache.get_or_refresh)
             
         Returns:
             True si succès, False sinon
@@ -113,18 +358,26 @@ class RedisCache:
             return False
         
         try:
-            # Ajouter timestamp pour debug
-            cache_data = {
-                "data": value,
-                "cached_at": datetime.now().isoformat(),
-                "ttl": ttl
-            }
+            serialized_value = _serialize_entry(value, ttl, stale_ttl)
+            hard_ttl = ttl + stale_ttl
             
-            serialized_value = json.dumps(cache_data, ensure_ascii=False, default=str)
-            result = self.redis_client.setex(key, ttl, serialized_value)
+            if tags or etag:
+                # Écriture + ETag + enregistrement dans chaque tag en un aller-retour
+                # (MULTI si ETag : la valeur et son ETag ne peuvent pas diverger).
+                # L'ETag expire avec la fraîcheur : jamais de 304 ni de corps gzip sur une entrée périmée.
+                pipe = self.redis_client.pipeline(transaction=etag)
+                pipe.setex(key, hard_ttl, serialized_value)
+                if etag:
+                    pipe.setex(_etag_key(key), ttl, compute_etag(value))
+                if tags:
+                    self._register_tags(pipe, key, tags, hard_ttl)
+                result = pipe.execute()[0]
+            else:
+                result = self.redis_client.setex(key, hard_ttl, serialized_value)
             
             if result:
                 logger.debug(f"✅ Cache mis à jour: {key} (TTL: {ttl}s)")
+                self._broadcast_invalidation(keys=[key])
             return bool(result)
             
         except Exception as e:
@@ -141,10 +394,7 @@ class RedisCache:
         Returns:
             Données ou None
         """
-        cached = self.get(key)
-        if cached and isinstance(cached, dict) and "data" in cached:
-            return cached["data"]
-        return cached
+        return _unwrap_entry(self.get(key))
 
     def delete(self, key: str) -> bool:
         """
@@ -160,7 +410,8 @@ class RedisCache:
             return False
         
         try:
-            result = self.redis_client.delete(key)
+            result = self.redis_client.delete(key, _etag_key(key), _body_key(key))
+            self._broadcast_invalidation(keys=[key])
             if result:
                 logger.debug(f"🗑️ Cache supprimé: {key}")
             return bool(result)
@@ -169,9 +420,72 @@ class RedisCache:
             logger.error(f"❌ Erreur suppression cache {key}: {e}")
             return False
 
-    def clear_pattern(self, pattern: str) -> int:  # ❌ RETIRE async
+    @staticmethod
+    def _tag_key(tag: str) -> str:
+        """Clé Redis de l'index (sorted set) des clés associées à un tag."""
+        return f"tags:{tag}"
+
+    @staticmethod
+    def _register_tags(pipe: Any, key: str, tags: List[str], ttl: int) -> None:
+        """
+        Ajoute la clé aux index de ses tags dans un pipeline.
+        
+        Index = sorted set clé -> date d'expiration : chaque écriture retire les membres
+        expirés d'eux-mêmes (ZREMRANGEBYSCORE), un tag réécrit en continu reste borné
+        à ses clés vivantes. L'index vit au moins aussi longtemps que sa clé la plus
+        durable (EXPIRE NX puis GT).
+        """
+        now = time.time()
+        for tag in tags:
+            tag_key = RedisCache._tag_key(tag)
+            pipe.zremrangebyscore(tag_key, "-inf", now)
+            pipe.zadd(tag_key, {key: now + ttl})
+            pipe.expire(tag_key, ttl, nx=True)
+            pipe.expire(tag_key, ttl, gt=True)
+
+    def invalidate_tags(self, *tags: str) -> int:
+        """
+        Supprime toutes les clés enregistrées sous les tags donnés.
+        Coût proportionnel au nombre de clés concernées (aucun parcours du keyspace).
+        
+        Args:
+            *tags: Tags à invalider (ex: 'entity:SDDV', 'feeders')
+            
+        Returns:
+            Nombre de clés supprimées
+        """
+        if not tags or not self.is_available or self.redis_client is None:
+            return 0
+        
+        try:
+            tag_keys = [self._tag_key(tag) for tag in tags]
+            pipe = self.redis_client.pipeline(transaction=False)
+            for tag_key in tag_keys:
+                pipe.zrange(tag_key, 0, -1)
+            members = pipe.execute()
+            
+            keys = set()
+            for tag_members in members:
+                keys.update(tag_members or [])
+            
+            deleted = 0
+            if keys:
+                deleted = int(self.redis_client.delete(*keys))  # type: ignore
+                self._broadcast_invalidation(keys=list(keys))
+            self.redis_client.delete(*tag_keys)
+            
+            logger.debug(f"🏷️ {deleted} clés supprimées pour tags: {list(tags)}")
+            return deleted
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur invalidation tags {list(tags)}: {e}")
+            return 0
+
+    def clear_pattern(self, pattern: str) -> int:
         """
         Supprime toutes les clés correspondant à un pattern.
+        Réservé à la maintenance : parcourt le keyspace par SCAN (non bloquant, mais O(keyspace)).
+        Sur le chemin d'écriture, utiliser invalidate_tags.
         
         Args:
             pattern: Pattern de recherche (ex: 'equipment:*')
@@ -183,12 +497,20 @@ class RedisCache:
             return 0
         
         try:
-            keys = self.redis_client.keys(pattern)
-            if keys:
-                deleted = self.redis_client.delete(*keys)  # type: ignore
+            deleted = 0
+            batch: List[str] = []
+            for key in self.redis_client.scan_iter(match=pattern, count=500):
+                batch.append(key)
+                if len(batch) >= 500:
+                    deleted += int(self.redis_client.delete(*batch))  # type: ignore
+                    batch = []
+            if batch:
+                deleted += int(self.redis_client.delete(*batch))  # type: ignore
+            self._broadcast_invalidation(pattern=pattern)
+            
+            if deleted:
                 logger.info(f"🧹 {deleted} clés supprimées pour pattern: {pattern}")
-                return int(deleted) # type: ignore
-            return 0
+            return deleted
             
         except Exception as e:
             logger.error(f"❌ Erreur suppression pattern {pattern}: {e}")
@@ -206,6 +528,7 @@ class RedisCache:
         
         try:
             self.redis_client.flushdb()
+            self._broadcast_invalidation(everything=True)
             logger.info("🧹 Cache entièrement vidé")
             return True
             
@@ -213,6 +536,118 @@ class RedisCache:
             logger.error(f"❌ Erreur vidage cache: {e}")
             return False
 
+    def _broadcast_invalidation(
+        self,
+        keys: Optional[List[str]] = None,
+        pattern: Optional[str] = None,
+        everything: bool = False
+    ) -> None:
+        """Invalide le L1 de ce worker puis celui des autres workers (pub/sub)"""
+        if not L1_CACHE_ENABLED or self.redis_client is None:
+            return
+        
+        message = json.dumps({"all": True}) if everything else _invalidation_message(keys, pattern)
+        if message is None:
+            return
+        
+        if everything:
+            local_cache.clear()
+        elif pattern is not None:
+            local_cache.invalidate_pattern(pattern)
+        else:
+            local_cache.invalidate(keys or [])
+        
+        try:
+            self.redis_client.publish(CACHE_INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.error(f"❌ Erreur publication invalidation L1: {e}")
+
+    def _on_invalidation(self, message: Dict[str, Any]) -> None:
+        """Réception d'une invalidation publiée par un worker (thread d'écoute)"""
+        try:
+            local_cache.apply_invalidation(json.loads(message["data"]))
+        except Exception as e:
+            logger.error(f"❌ Message d'invalidation L1 illisible, vidage du cache local: {e}")
+            local_cache.clear()
+
+    def _on_listener_error(self, error: BaseException, pubsub: Any, thread: Any) -> None:
+        """
+        Connexion pub/sub perdue : des invalidations ont pu être manquées, le L1 est vidé.
+        redis-py se reconnecte et se réabonne au prochain get_message.
+        """
+        logger.warning(f"⚠️ Écoute des invalidations L1 interrompue: {error}")
+        local_cache.clear()
+        self._reset_channel_handlers()
+        time.sleep(1)
+
+    def register_channel(
+        self,
+        channel: str,
+        handler: Callable[[Dict[str, Any]], None],
+        on_reset: Optional[Callable[[], None]] = None
+    ) -> None:
+        """
+        Ajoute un canal au thread d'écoute pub/sub (à appeler avant start_invalidation_listener).
+
+        Args:
+            channel: Canal Redis
+            handler: Appelé (thread d'écoute) pour chaque message reçu
+            on_reset: Appelé quand des messages ont pu être manqués (connexion perdue, arrêt)
+        """
+        self._channel_handlers[channel] = (handler, on_reset)
+
+    def _reset_channel_handlers(self) -> None:
+        for _, on_reset in self._channel_handlers.values():
+            if on_reset is not None:
+                on_reset()
+
+    @property
+    def is_listening(self) -> bool:
+        """True si le thread d'écoute pub/sub tourne"""
+        return self._listener is not None and self._listener.is_alive()
+
+    def start_invalidation_listener(self) -> bool:
+        """
+        Démarre l'écoute des invalidations (thread pub/sub) et active le cache L1.
+        Sans Redis, le L1 reste désactivé.
+        """
+        if not (L1_CACHE_ENABLED or self._channel_handlers) or not self.is_available or self.redis_client is None:
+            return False
+        
+        try:
+            handlers = {channel: handler for channel, (handler, _) in self._channel_handlers.items()}
+            if L1_CACHE_ENABLED:
+                handlers[CACHE_INVALIDATION_CHANNEL] = self._on_invalidation
+            self._pubsub = self.redis_client.pubsub(ignore_subscribe_messages=True)
+            self._pubsub.subscribe(**handlers)
+            self._listener = self._pubsub.run_in_thread(
+                sleep_time=1.0,
+                daemon=True,
+                exception_handler=self._on_listener_error
+            )
+            local_cache.enabled = L1_CACHE_ENABLED
+            logger.info(f"✅ Écoute pub/sub active: {', '.join(handlers)}")
+            return True
+            
+        except Exception as e:
+            logger.warning(f"⚠️ Cache L1 désactivé, écoute des invalidations impossible: {e}")
+            return False
+
+    def stop_invalidation_listener(self) -> None:
+        """Arrête l'écoute des invalidations et désactive le cache L1"""
+        local_cache.enabled = False
+        local_cache.clear()
+        try:
+            if self._listener is not None:
+                self._listener.stop()
+            if self._pubsub is not None:
+                self._pubsub.close()
+        except Exception as e:
+            logger.error(f"❌ Erreur arrêt écoute invalidations L1: {e}")
+        self._listener = None
+        self._pubsub = None
+        self._reset_channel_handlers()
+
     def get_cache_info(self) -> Dict[str, Any]:
         """
         Récupère les informations sur le cache.
@@ -309,6 +744,347 @@ class RedisCache:
 # Instance globale du cache
 cache = RedisCache()
 
+
+class AsyncRedisCache:
+    """
+    Client Redis asynchrone (redis.asyncio) pour les routeurs async.
+    Même format d'entrées et mêmes tags que RedisCache : les deux clients
+    lisent et invalident les mêmes clés. Un Redis lent ne bloque plus la boucle d'événements.
+    """
+    
+    def __init__(self):
+        """Prépare le pool partagé (aucune connexion ouverte avant connect())"""
+        self.pool = redis_async.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            decode_responses=True,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True,
+            max_connections=REDIS_ASYNC_MAX_CONNECTIONS
+        )
+        self.redis_client: Optional[redis_async.Redis] = redis_async.Redis(connection_pool=self.pool)
+        
+        # Pool binaire (pas de décodage) pour les corps de réponse gzip
+        self.binary_pool = redis_async.ConnectionPool(
+            host=REDIS_HOST,
+            port=REDIS_PORT,
+            db=REDIS_DB,
+            decode_responses=False,
+            socket_connect_timeout=5,
+            socket_timeout=5,
+            retry_on_timeout=True,
+            max_connections=REDIS_ASYNC_MAX_CONNECTIONS
+        )
+        self.binary_client = redis_async.Redis(connection_pool=self.binary_pool)
+        self.is_available = False
+        
+        # Recalculs en cours dans ce worker (single-flight en mémoire)
+        self._refreshing: Dict[str, "asyncio.Task[Any]"] = {}
+
+    async def connect(self) -> bool:
+        """Vérifie la connexion (appelé au démarrage de l'application)"""
+        if self.redis_client is None:
+            return False
+        
+        try:
+            await self.redis_client.ping()
+            self.is_available = True
+            logger.info(f"✅ Redis async connecté: {REDIS_HOST}:{REDIS_PORT}")
+        except Exception as e:
+            logger.warning(f"⚠️ Redis async non disponible: {e}. Lecture directe sans cache.")
+            self.is_available = False
+        return self.is_available
+
+    async def close(self) -> None:
+        """Ferme le pool de connexions (arrêt de l'application)"""
+        if self.redis_client is not None:
+            try:
+                await self.redis_client.aclose()
+                await self.pool.aclose()
+                await self.binary_client.aclose()
+                await self.binary_pool.aclose()
+            except Exception as e:
+                logger.error(f"❌ Erreur fermeture Redis async: {e}")
+        self.is_available = False
+
+    async def get(self, key: str) -> Optional[Any]:
+        """Récupère une valeur désérialisée du cache (None si absente/erreur)"""
+        if not self.is_available or self.redis_client is None:
+            return None
+        
+        local_value = local_cache.get(key)
+        if local_value is not _MISSING:
+            return local_value
+        
+        try:
+            generation = local_cache.generation
+            value = await self.redis_client.get(key)
+            if value and isinstance(value, (str, bytes, bytearray)):
+                entry = json.loads(value)
+                local_cache.put(key, entry, len(value), _entry_ttl(entry), generation)
+                return entry
+            return None
+            
+        except json.JSONDecodeError as e:
+            logger.error(f"❌ Erreur de désérialisation cache {key}: {e}")
+            await self.delete(key)
+            return None
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture cache async {key}: {e}")
+            return None
+
+    async def get_data_only(self, key: str) -> Optional[Any]:
+        """Récupère uniquement les données du cache (sans métadonnées)"""
+        return _unwrap_entry(await self.get(key))
+
+    async def set(
+        self,
+        key: str,
+        value: Any,
+        ttl: int = CACHE_TTL_MEDIUM,
+        tags: Optional[List[str]] = None,
+        etag: bool = False,
+        stale_ttl: int = 0
+    ) -> bool:
+        """Stocke une valeur dans le cache, avec tags d'invalidation, ETag et période stale optionnels"""
+        if not self.is_available or self.redis_client is None:
+            return False
+        
+        try:
+            serialized_value = _serialize_entry(value, ttl, stale_ttl)
+            hard_ttl = ttl + stale_ttl
+            
+            if tags or etag:
+                pipe = self.redis_client.pipeline(transaction=etag)
+                pipe.setex(key, hard_ttl, serialized_value)
+                if etag:
+                    pipe.setex(_etag_key(key), ttl, compute_etag(value))
+                if tags:
+                    RedisCache._register_tags(pipe, key, tags, hard_ttl)
+                result = (await pipe.execute())[0]
+            else:
+                result = await self.redis_client.setex(key, hard_ttl, serialized_value)
+            
+            if result:
+                await self._broadcast_invalidation([key])
+            return bool(result)
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture cache async {key}: {e}")
+            return False
+
+    async def get_or_refresh(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> Any:
+        """
+        Lecture avec stale-while-revalidate et single-flight.
+        
+        - entrée fraîche : retournée
+        - entrée périmée (soft_expires_at dépassé, stale_ttl non écoulé) : retournée
+          immédiatement, un seul recalcul est lancé en arrière-plan
+        - entrée absente : l'appelant attend l'unique recalcul en cours
+        
+        Un seul recalcul par clé et par worker (tâche partagée), et un seul pour
+        tous les workers (verrou Redis lock:{key}) : les autres attendent sa valeur.
+        
+        Args:
+            key: Clé de cache
+            refresh: Coroutine qui recalcule la valeur, l'écrit en cache (set avec
+                stale_ttl) et la retourne
+        """
+        entry = await self.get(key)
+        if entry is not None:
+            if _is_stale(entry):
+                self._refresh_task(key, refresh)
+            return _unwrap_entry(entry)
+        
+        # shield : l'annulation d'une requête n'annule pas le recalcul partagé
+        return await asyncio.shield(self._refresh_task(key, refresh))
+
+    def _refresh_task(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> "asyncio.Task[Any]":
+        """Tâche de recalcul de la clé, créée si aucune n'est en cours dans ce worker"""
+        task = self._refreshing.get(key)
+        if task is None or task.done():
+            task = asyncio.create_task(self._refresh_single_flight(key, refresh))
+            self._refreshing[key] = task
+            task.add_done_callback(lambda done: self._refresh_done(key, done))
+        return task
+
+    def _refresh_done(self, key: str, task: "asyncio.Task[Any]") -> None:
+        """Fin d'un recalcul : libère la clé et journalise l'échec d'un recalcul d'arrière-plan"""
+        if self._refreshing.get(key) is task:
+            del self._refreshing[key]
+        if not task.cancelled() and task.exception() is not None:
+            logger.error(f"❌ Échec du recalcul de {key}: {task.exception()}")
+
+    async def _refresh_single_flight(self, key: str, refresh: Callable[[], Awaitable[Any]]) -> Any:
+        """Recalcule sous verrou Redis, ou attend le recalcul d'un autre worker"""
+        if not self.is_available or self.redis_client is None:
+            return await refresh()
+        
+        lock_key = f"lock:{key}"
+        lock = self.redis_client.lock(lock_key, timeout=CACHE_REFRESH_LOCK_TTL, blocking=False)
+        try:
+            acquired = await lock.acquire()
+        except Exception as e:
+            logger.error(f"❌ Verrou de recalcul indisponible {key}: {e}")
+            return await refresh()
+        
+        if acquired:
+            try:
+                return await refresh()
+            finally:
+                try:
+                    await lock.release()
+                except Exception:
+                    pass  # Verrou expiré entre-temps : rien à libérer
+        
+        # Un autre worker recalcule : attendre sa valeur plutôt que de relancer la requête
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + CACHE_REFRESH_WAIT
+        while loop.time() < deadline:
+            await asyncio.sleep(0.1)
+            entry = await self.get(key)
+            if entry is not None and not _is_stale(entry):
+                return _unwrap_entry(entry)
+            if not await self.exists(lock_key):
+                break
+        
+        entry = await self.get(key)
+        if entry is not None:
+            return _unwrap_entry(entry)
+        logger.warning(f"⚠️ Recalcul de {key} non observé après {CACHE_REFRESH_WAIT}s, recalcul local")
+        return await refresh()
+
+    async def delete(self, key: str) -> bool:
+        """Supprime une clé du cache"""
+        if not self.is_available or self.redis_client is None:
+            return False
+        
+        try:
+            result = await self.redis_client.delete(key, _etag_key(key), _body_key(key))
+            await self._broadcast_invalidation([key])
+            return bool(result)
+        except Exception as e:
+            logger.error(f"❌ Erreur suppression cache async {key}: {e}")
+            return False
+
+    async def _broadcast_invalidation(self, keys: List[str]) -> None:
+        """Invalide le L1 de ce worker puis celui des autres workers (pub/sub)"""
+        if not L1_CACHE_ENABLED or self.redis_client is None:
+            return
+        
+        message = _invalidation_message(keys)
+        if message is None:
+            return
+        local_cache.invalidate(keys)
+        
+        try:
+            await self.redis_client.publish(CACHE_INVALIDATION_CHANNEL, message)
+        except Exception as e:
+            logger.error(f"❌ Erreur publication invalidation L1 async: {e}")
+
+    async def fresh_ttl(self, key: str) -> float:
+        """
+        Secondes de fraîcheur restantes d'une entrée écrite avec etag=True
+        (l'ETag expire avec la fraîcheur) ; 0 si absente ou périmée.
+        """
+        if not self.is_available or self.redis_client is None:
+            return 0.0
+        
+        try:
+            ttl_ms = await self.redis_client.pttl(_etag_key(key))
+            return max(ttl_ms, 0) / 1000
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture TTL async {key}: {e}")
+            return 0.0
+
+    async def get_etag(self, key: str) -> Optional[str]:
+        """
+        ETag de l'entrée `key`, sans lire ni désérialiser la valeur.
+        None si l'entrée n'existe plus : un ETag orphelin (clé invalidée par tag)
+        ne doit jamais produire de 304.
+        """
+        if not self.is_available or self.redis_client is None:
+            return None
+        
+        try:
+            pipe = self.redis_client.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.get(_etag_key(key))
+            exists, etag = await pipe.execute()
+            return etag if exists and etag else None
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture ETag async {key}: {e}")
+            return None
+
+    async def exists(self, key: str) -> bool:
+        """Vérifie si une clé existe"""
+        if not self.is_available or self.redis_client is None:
+            return False
+        
+        try:
+            return bool(await self.redis_client.exists(key))
+        except Exception as e:
+            logger.error(f"❌ Erreur vérification existence async {key}: {e}")
+            return False
+
+    async def get_response_body(self, key: str) -> Optional[Tuple[str, Optional[bytes]]]:
+        """
+        ETag courant de l'entrée `key` et son corps de réponse gzip, en un aller-retour,
+        sans désérialiser la valeur.
+        
+        Le corps est stocké préfixé par l'ETag dont il est issu : il n'est retourné
+        que s'il correspond à l'ETag courant (jamais de corps d'une version invalidée).
+        
+        Returns:
+            (etag, corps gzip ou None), ou None si l'entrée n'existe pas
+        """
+        if not self.is_available:
+            return None
+        
+        try:
+            pipe = self.binary_client.pipeline(transaction=False)
+            pipe.exists(key)
+            pipe.get(_etag_key(key))
+            pipe.get(_body_key(key))
+            exists, raw_etag, blob = await pipe.execute()
+            if not exists or not raw_etag:
+                return None
+            
+            etag = raw_etag.decode("utf-8")
+            body = None
+            if blob:
+                body_etag, _, gzipped = blob.partition(b"\n")
+                if body_etag == raw_etag:
+                    body = gzipped
+            return etag, body
+            
+        except Exception as e:
+            logger.error(f"❌ Erreur lecture corps de réponse {key}: {e}")
+            return None
+
+    async def set_response_body(self, key: str, etag: str, gzipped: bytes) -> bool:
+        """
+        Stocke le corps de réponse gzip de l'entrée `key` pour la durée de vie restante
+        de l'entrée (rien si elle n'est pas/plus en cache).
+        """
+        if not self.is_available:
+            return False
+        
+        try:
+            ttl_ms = await self.binary_client.pttl(key)
+            if ttl_ms <= 0:
+                return False
+            return bool(await self.binary_client.set(_body_key(key), etag.encode("utf-8") + b"\n" + gzipped, px=ttl_ms))
+        except Exception as e:
+            logger.error(f"❌ Erreur écriture corps de réponse {key}: {e}")
+            return False
+
+# Instance globale du cache asynchrone (pool partagé par tous les routeurs)
+async_cache = AsyncRedisCache()
+
 # Fonctions helper spécifiques au projet
 def cache_equipment_list(data: List[Dict], filters: Dict[str, Any] | None = None, ttl: int = CACHE_TTL_MEDIUM) -> bool:
     """
@@ -323,25 +1099,30 @@ def cache_equipment_list(data: List[Dict], filters: Dict[str, Any] | None = None
         True si mis en cache avec succès
     """
     key = cache._create_key("equipment_list", **filters or {})
-    return cache.set(key, data, ttl)
+    return cache.set(key, data, ttl, tags=[TAG_EQUIPMENT_LIST])
+
+# Tags d'invalidation partagés par les services
+TAG_EQUIPMENT_LIST = "equipment_list"
+TAG_FEEDERS = "feeders"
+TAG_ATTRIBUTE_VALUES = "attribute_values"
+
+def entity_tag(entity: str) -> str:
+    """Tag des entrées dépendant des équipements d'une entité."""
+    return f"entity:{entity}"
+
+def entity_tags(entities: List[str]) -> List[str]:
+    """Tags d'une hiérarchie d'entités (une entrée est invalidée si une de ses entités change)."""
+    return [entity_tag(entity) for entity in entities]
 
 def invalidate_equipment_insertion_cache(equipment_code: str, entity: str, famille: str):
     """Invalide spécifiquement le cache après insertion d'équipement"""
-    patterns_to_clear = [
-        f"mobile_eq_{entity}*",
-        f"equipment_attributes_{equipment_code}",
-        f"equipment_attributes_{famille}*", 
-        f"attribute_values_*",
-        "feeders_list_*",
-        "zones_list",
-        "familles_list"
-    ]
+    # Listes mobiles de toute hiérarchie contenant l'entité, feeders, valeurs d'attributs
+    total_cleared = cache.invalidate_tags(entity_tag(entity), TAG_FEEDERS, TAG_ATTRIBUTE_VALUES)
     
-    total_cleared = 0
-    for pattern in patterns_to_clear:
-        cleared = cache.clear_pattern(pattern)
-        total_cleared += cleared
-        logger.debug(f"Pattern {pattern}: {cleared} clés supprimées")
+    # Clés exactes (pas de parcours du keyspace)
+    for key in (f"equipment_attributes_{equipment_code}", f"equipment_attributes_{famille}"):
+        if cache.delete(key):
+            total_cleared += 1
     
     logger.info(f"🧹 Cache insertion invalidé: {total_cleared} clés supprimées")
     return total_cleared
@@ -385,10 +1166,10 @@ def get_cached_entities_list() -> Optional[List[str]]:
 
 def invalidate_equipment_cache():
     """Invalide tout le cache des équipements."""
-    patterns = ["equipment:*", "equipment_list:*", "zones_list", "familles_list", "entities_list"]
-    total_deleted = 0
-    for pattern in patterns:
-        total_deleted += cache.clear_pattern(pattern)
+    total_deleted = cache.invalidate_tags(TAG_EQUIPMENT_LIST)
+    for key in ("zones_list", "familles_list", "entities_list"):
+        if cache.delete(key):
+            total_deleted += 1
     
     logger.info(f"🧹 Cache équipements invalidé: {total_deleted} clés supprimées")
     return total_deleted
@@ -405,8 +1186,8 @@ async def get_cache_stats() -> Dict[str, Any]:
     # Ajouter des statistiques spécifiques au projet
     if cache.is_available and cache.redis_client is not None:
         try:
-            equipment_keys_result = await cache.redis_client.keys("equipment*")
-            equipment_keys = len(equipment_keys_result) if equipment_keys_result else 0
+            # Taille des index de tags (pas de KEYS sur le keyspace)
+            equipment_keys = int(cache.redis_client.zcard(cache._tag_key(TAG_EQUIPMENT_LIST)) or 0)  # type: ignore
             zones_cached = cache.exists("zones_list")
             familles_cached = cache.exists("familles_list")
             entities_cached = cache.exists("entities_list")
@@ -24,21 +24,99 @@ MAX_LIMIT = int(os.getenv("MAX_LIMIT", 1000))
 DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", 10))
 MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", 100))
 
+# Taille des lots pour les clauses IN (SQL Server limite une requête à 2100 paramètres)
+SQL_IN_CHUNK_SIZE = int(os.getenv("SQL_IN_CHUNK_SIZE", 2000))
+
+# Taille des lots d'archivage ensembliste (une transaction par lot)
+ARCHIVE_CHUNK_SIZE = int(os.getenv("ARCHIVE_CHUNK_SIZE", 500))
+
+# Pool de threads pour les appels DB bloquants depuis les routeurs async
+DB_EXECUTOR_TIMEOUT = float(os.getenv("DB_EXECUTOR_TIMEOUT", 30))        # secondes par appel
+DB_EXECUTOR_MAX_QUEUE = int(os.getenv("DB_EXECUTOR_MAX_QUEUE", 100))     # appels en attente au-delà des workers
+
+# Index de hiérarchie des entités en mémoire : intervalle de vérification de version (secondes)
+HIERARCHY_VERSION_CHECK_SECONDS = int(os.getenv("HIERARCHY_VERSION_CHECK_SECONDS", 60))
+
 # Configuration Redis
 REDIS_HOST = os.getenv("REDIS_HOST", "localhost")
 REDIS_PORT = int(os.getenv("REDIS_PORT", 6379))
 REDIS_DB = int(os.getenv("REDIS_DB", 0))
+REDIS_ASYNC_MAX_CONNECTIONS = int(os.getenv("REDIS_ASYNC_MAX_CONNECTIONS", 50))
 
 # Configuration du cache
 CACHE_TTL_SHORT = 300    # 5 minutes
 CACHE_TTL_MEDIUM = 1800  # 30 minutes  
 CACHE_TTL_LONG = 3600    # 1 heure
 
+# Protection contre les rafales de miss (stale-while-revalidate + single-flight)
+CACHE_STALE_TTL = int(os.getenv("CACHE_STALE_TTL", 300))  # durée pendant laquelle une entrée périmée reste servie
+CACHE_REFRESH_LOCK_TTL = int(os.getenv("CACHE_REFRESH_LOCK_TTL", 35))  # > délai d'un appel DB
+CACHE_REFRESH_WAIT = int(os.getenv("CACHE_REFRESH_WAIT", 10))  # attente max du recalcul d'un autre worker
+
+# Cache local L1 (en mémoire, par worker) devant Redis pour les données de référence
+L1_CACHE_ENABLED = os.getenv("L1_CACHE_ENABLED", "true").lower() == "true"
+L1_CACHE_MAX_BYTES = int(os.getenv("L1_CACHE_MAX_BYTES", 32 * 1024 * 1024))  # 32 Mo de JSON
+L1_CACHE_TTL = int(os.getenv("L1_CACHE_TTL", 60))  # filet de sécurité si une invalidation est perdue
+# Préfixes de clés éligibles au L1 et nombre maximal d'entrées par préfixe
+L1_CACHE_PREFIX_LIMITS = {
+    "mobile_entities": 200,
+    "entity_hierarchy_oracle_": 200,
+    "mobile_familles_": 200,
+    "mobile_zones_": 200,
+    "mobile_unites_": 200,
+    "mobile_centre_charges_": 200,
+    "attribute_values_": 500,
+}
+CACHE_INVALIDATION_CHANNEL = "cache:invalidate"
+
+# Préchauffage planifié du cache (APScheduler) pour les entités les plus demandées
+WARMUP_ENABLED = os.getenv("WARMUP_ENABLED", "true").lower() == "true"
+WARMUP_INTERVAL_SECONDS = int(os.getenv("WARMUP_INTERVAL_SECONDS", 240))  # < CACHE_TTL_SHORT : recalcul avant expiration
+WARMUP_TOP_N = int(os.getenv("WARMUP_TOP_N", 20))  # combinaisons préchauffées par passage
+WARMUP_MAX_CONCURRENCY = int(os.getenv("WARMUP_MAX_CONCURRENCY", 2))  # budget DB du préchauffage
+WARMUP_DECAY = float(os.getenv("WARMUP_DECAY", 0.9))  # atténuation des compteurs à chaque passage
+WARMUP_MAX_TRACKED = int(os.getenv("WARMUP_MAX_TRACKED", 500))
+
+# Cache des corps de réponse compressés (listes volumineuses)
+RESPONSE_CACHE_GZIP_LEVEL = int(os.getenv("RESPONSE_CACHE_GZIP_LEVEL", 6))
+
+# Boîte de réception des notifications (Redis : sorted set + hash par utilisateur)
+NOTIFICATION_INBOX_MAX = int(os.getenv("NOTIFICATION_INBOX_MAX", 200))  # non lues conservées par utilisateur
+NOTIFICATION_TTL_SECONDS = int(os.getenv("NOTIFICATION_TTL_SECONDS", 7 * 24 * 3600))
+NOTIFICATION_PAGE_SIZE = int(os.getenv("NOTIFICATION_PAGE_SIZE", 50))
+NOTIFICATION_MAX_PAGE_SIZE = int(os.getenv("NOTIFICATION_MAX_PAGE_SIZE", 200))
+
+# WebSocket : file d'envoi bornée par connexion
+WS_SEND_QUEUE_SIZE = int(os.getenv("WS_SEND_QUEUE_SIZE", 100))
+WS_SEND_TIMEOUT = float(os.getenv("WS_SEND_TIMEOUT", 10))  # secondes par envoi avant de considérer le client mort
+WS_SLOW_CONSUMER_POLICY = os.getenv("WS_SLOW_CONSUMER_POLICY", "drop_oldest")  # drop_oldest | disconnect
+WS_HEARTBEAT_INTERVAL = float(os.getenv("WS_HEARTBEAT_INTERVAL", 30))  # secondes entre deux passages du heartbeat
+WS_HEARTBEAT_MAX_MISSED = int(os.getenv("WS_HEARTBEAT_MAX_MISSED", 2))  # pings sans réponse avant éviction
+WS_BATCH_WINDOW_MS = int(os.getenv("WS_BATCH_WINDOW_MS", 25))  # fenêtre de regroupement (clients ?batch=true), 0 = désactivé
+WS_BATCH_MAX_MESSAGES = int(os.getenv("WS_BATCH_MAX_MESSAGES", 50))  # messages max par trame regroupée
+WS_PER_MESSAGE_DEFLATE = os.getenv("WS_PER_MESSAGE_DEFLATE", "true").lower() == "true"  # extension permessage-deflate (uvicorn)
+
+# WebSocket : diffusion entre workers (Redis pub/sub), chaque worker relaie à ses sockets locales
+WS_BACKPLANE_ENABLED = os.getenv("WS_BACKPLANE_ENABLED", "true").lower() == "true"
+WS_USER_CHANNEL_PREFIX = "ws:user:"
+WS_BROADCAST_CHANNEL = "ws:broadcast"
+WS_TOPIC_CHANNEL_PREFIX = "ws:topic:"
+WS_MAX_TOPICS_PER_CONNECTION = int(os.getenv("WS_MAX_TOPICS_PER_CONNECTION", 50))
+
 # Configuration JWT
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key-change-in-prod")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
 JWT_ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("JWT_ACCESS_TOKEN_EXPIRE_MINUTES", 30))
 JWT_REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("JWT_REFRESH_TOKEN_EXPIRE_DAYS", 7))
+JWT_CLAIMS_CACHE_SIZE = int(os.getenv("JWT_CLAIMS_CACHE_SIZE", 10000))  # tokens décodés gardés en mémoire par worker
+JWT_BLACKLIST_CHANNEL = "auth:blacklist"  # révocations diffusées aux miroirs locaux des workers
+JWT_BLACKLIST_RESYNC_DELAY = int(os.getenv("JWT_BLACKLIST_RESYNC_DELAY", 5))  # secondes avant rechargement du miroir après coupure
+
+# Hachage des mots de passe (bcrypt) dans un pool de processus dédié
+PASSWORD_POOL_WORKERS = int(os.getenv("PASSWORD_POOL_WORKERS", os.cpu_count() or 2))
+PASSWORD_MAX_PENDING = int(os.getenv("PASSWORD_MAX_PENDING", 64))  # hachages en attente au-delà des workers
+PASSWORD_MAX_ATTEMPTS = int(os.getenv("PASSWORD_MAX_ATTEMPTS", 10))  # tentatives de connexion par utilisateur et par fenêtre
+PASSWORD_ATTEMPT_WINDOW = int(os.getenv("PASSWORD_ATTEMPT_WINDOW", 300))  # secondes
 
 # Configuration mot de passe par défaut pour les prestataires
 DEFAULT_PASSWORD_PRESTATAIRE = os.getenv("DEFAULT_PASSWORD_PRESTATAIRE", "changeMe123!")
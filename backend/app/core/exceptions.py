@@ -33,4 +33,58 @@ class DatabaseError(AuthenticationError):
             message=message,
             status_code=500,
             error_code="DATABASE_ERROR"
-        )
\ No newline at end of file
+        )
+
+class DatabaseExecutorError(Exception):
+    """Exception de base du pool de threads DB (saturation, délai dépassé)."""
+    def __init__(self, message: str, status_code: int = 503, error_code: Optional[str] = None):
+        self.message = message
+        self.status_code = status_code
+        self.error_code = error_code
+        super().__init__(self.message)
+
+class DatabaseBusyError(DatabaseExecutorError):
+    """File d'attente du pool DB pleine : la requête est refusée immédiatement."""
+    def __init__(self, pending: int):
+        super().__init__(
+            message=f"Base de données saturée ({pending} appels en cours), réessayez plus tard.",
+            status_code=503,
+            error_code="DATABASE_BUSY"
+        )
+
+class DatabaseTimeoutError(DatabaseExecutorError):
+    """Appel DB non terminé dans le délai imparti."""
+    def __init__(self, operation: str, timeout: float):
+        super().__init__(
+            message=f"Délai dépassé ({timeout:.0f}s) pour l'opération '{operation}'.",
+            status_code=504,
+            error_code="DATABASE_TIMEOUT"
+        )
+
+class PasswordServiceError(Exception):
+    """Exception de base du pool de hachage des mots de passe (saturation, limitation)."""
+    def __init__(self, message: str, status_code: int = 503, error_code: Optional[str] = None, retry_after: int = 5):
+        self.message = message
+        self.status_code = status_code
+        self.error_code = error_code
+        self.retry_after = retry_after
+        super().__init__(self.message)
+
+class PasswordServiceBusyError(PasswordServiceError):
+    """File d'attente du pool de hachage pleine : la requête est refusée immédiatement."""
+    def __init__(self, pending: int):
+        super().__init__(
+            message=f"Service d'authentification saturé ({pending} vérifications en cours), réessayez plus tard.",
+            status_code=503,
+            error_code="PASSWORD_SERVICE_BUSY"
+        )
+
+class TooManyAttemptsError(PasswordServiceError):
+    """Trop de tentatives de connexion pour un utilisateur sur la fenêtre courante."""
+    def __init__(self, username: str, retry_after: int):
+        super().__init__(
+            message=f"Trop de tentatives de connexion pour '{username}', réessayez dans {retry_after}s.",
+            status_code=429,
+            error_code="TOO_MANY_ATTEMPTS",
+            retry_after=retry_after
+        )
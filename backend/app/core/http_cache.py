@@ -0,0 +1,182 @@
+import asyncio
+import gzip
+import json
+import logging
+import zlib
+from typing import Any, Awaitable, Callable, Iterator, Optional, Tuple
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+
+from app.core.cache import async_cache, compute_etag
+from app.core.config import RESPONSE_CACHE_GZIP_LEVEL
+
+logger = logging.getLogger(__name__)
+
+# Le client garde sa copie mais doit la revalider (If-None-Match) à chaque usage
+ETAG_CACHE_CONTROL = "private, no-cache"
+
+# Taille des blocs de décompression pour les clients sans gzip
+GUNZIP_CHUNK_SIZE = 64 * 1024
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Compare l'en-tête If-None-Match à un ETag (comparaison faible, RFC 9110 §13.1.2).
+
+    Args:
+        if_none_match: Valeur brute de l'en-tête (liste séparée par des virgules ou '*')
+        etag: ETag courant, entre guillemets
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate == etag:
+            return True
+    return False
+
+
+def not_modified_response(etag: str) -> Response:
+    """Réponse 304 sans corps"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL})
+
+
+async def check_not_modified(request: Request, cache_key: str) -> Optional[Response]:
+    """
+    Court-circuit des requêtes conditionnelles : si l'ETag envoyé par le client
+    correspond à celui de l'entrée `cache_key`, retourne un 304 sans charger,
+    reconstruire ni resérialiser la donnée (un seul aller-retour Redis).
+
+    Returns:
+        La réponse 304, ou None s'il faut construire la réponse complète
+    """
+    if_none_match = request.headers.get("if-none-match")
+    if not if_none_match:
+        return None
+
+    etag = await async_cache.get_etag(cache_key)
+    if etag and etag_matches(if_none_match, etag):
+        logger.debug(f"♻️ 304 Not Modified: {cache_key}")
+        return not_modified_response(etag)
+    return None
+
+
+def etag_json_response(request: Request, content: Any, data: Any) -> Response:
+    """
+    Réponse JSON complète portant l'ETag de `data` (la donnée de service mise en cache,
+    `content` étant l'enveloppe retournée au client).
+
+    Un 304 reste possible ici quand le cache était froid mais que la donnée
+    reconstruite est identique à la copie du client.
+    """
+    etag = compute_etag(data)
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return not_modified_response(etag)
+
+    return JSONResponse(
+        content=jsonable_encoder(content),
+        headers={"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL}
+    )
+
+
+def accepts_gzip(request: Request) -> bool:
+    """True si l'en-tête Accept-Encoding autorise gzip (q=0 exclu)"""
+    for coding in request.headers.get("accept-encoding", "").split(","):
+        name, _, params = coding.strip().partition(";")
+        if name.strip().lower() not in ("gzip", "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def _gunzip_chunks(gzipped: bytes) -> Iterator[bytes]:
+    """Décompresse un corps gzip par blocs (pas de copie décompressée complète en mémoire)"""
+    decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+    for start in range(0, len(gzipped), GUNZIP_CHUNK_SIZE):
+        chunk = decompressor.decompress(gzipped[start:start + GUNZIP_CHUNK_SIZE])
+        if chunk:
+            yield chunk
+    tail = decompressor.flush()
+    if tail:
+        yield tail
+
+
+def _encode_body(content: Any) -> Tuple[bytes, bytes]:
+    """Sérialise l'enveloppe comme JSONResponse puis la compresse : (json, json gzip)"""
+    body = json.dumps(
+        jsonable_encoder(content),
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":")
+    ).encode("utf-8")
+    return body, gzip.compress(body, compresslevel=RESPONSE_CACHE_GZIP_LEVEL)
+
+
+def gzip_body_response(request: Request, etag: str, gzipped: bytes, body: Optional[bytes] = None) -> Response:
+    """
+    Réponse à partir d'un corps gzip : envoyé tel quel si le client accepte gzip,
+    sinon décompressé à la volée (ou `body` s'il est déjà disponible).
+    """
+    headers = {"ETag": etag, "Cache-Control": ETAG_CACHE_CONTROL, "Vary": "Accept-Encoding"}
+
+    if accepts_gzip(request):
+        headers["Content-Encoding"] = "gzip"
+        return Response(content=gzipped, media_type="application/json", headers=headers)
+    if body is not None:
+        return Response(content=body, media_type="application/json", headers=headers)
+    return StreamingResponse(_gunzip_chunks(gzipped), media_type="application/json", headers=headers)
+
+
+async def cached_json_response(
+    request: Request,
+    cache_key: str,
+    build: Callable[[], Awaitable[Tuple[Any, Any]]]
+) -> Response:
+    """
+    Réponse JSON servie depuis le cache de corps compressés.
+
+    - ETag du client identique : 304
+    - corps gzip en cache pour l'ETag courant : octets Redis renvoyés tels quels,
+      sans désérialiser ni resérialiser la donnée
+    - sinon : `build()` retourne (enveloppe, donnée de service) ; l'enveloppe est
+      sérialisée et compressée une seule fois (hors boucle), puis mise en cache
+      pour la durée de vie restante de l'entrée `cache_key`
+
+    Args:
+        request: Requête (If-None-Match, Accept-Encoding)
+        cache_key: Clé de cache de la donnée de service (porte l'ETag)
+        build: Coroutine construisant (contenu de la réponse, donnée de service)
+    """
+    if_none_match = request.headers.get("if-none-match")
+
+    cached_body = await async_cache.get_response_body(cache_key)
+    if cached_body:
+        etag, gzipped = cached_body
+        if etag_matches(if_none_match, etag):
+            return not_modified_response(etag)
+        if gzipped is not None:
+            logger.debug(f"📦 Corps de réponse servi depuis le cache: {cache_key}")
+            return gzip_body_response(request, etag, gzipped)
+
+    content, data = await build()
+    etag = await asyncio.to_thread(compute_etag, data)
+    if etag_matches(if_none_match, etag):
+        return not_modified_response(etag)
+
+    body, gzipped = await asyncio.to_thread(_encode_body, content)
+    await async_cache.set_response_body(cache_key, etag, gzipped)
+    return gzip_body_response(request, etag, gzipped, body)
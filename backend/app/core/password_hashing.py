@@ -0,0 +1,18 @@
+import bcrypt
+
+# Fonctions exécutées dans les processus du pool de hachage (app.services.password_service).
+# Module volontairement sans dépendance applicative : un processus fils l'importe seul
+# (aucune connexion Redis/DB ouverte au démarrage d'un worker).
+
+
+def hash_password(password: str) -> str:
+    """Hache un mot de passe (bcrypt, sel aléatoire)"""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
+
+
+def check_password(password: str, hashed_password: str) -> bool:
+    """Vérifie un mot de passe contre son hash bcrypt (False si le hash est invalide)"""
+    try:
+        return bcrypt.checkpw(password.encode('utf-8'), hashed_password.encode('utf-8'))
+    except ValueError:
+        return False
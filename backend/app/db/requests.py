@@ -64,6 +64,18 @@ SELECT chen_code AS entity_code
 FROM sn_hierarchie_ancetres(:entity)
 """
 
+# Arbre complet des entités (chargé une fois par l'index de hiérarchie en mémoire)
+ENTITY_TREE_QUERY = """
+SELECT chen_code, chen_parent_entity
+FROM entity
+"""
+
+# Empreinte de la table entity : un changement de version déclenche le rechargement de l'index
+ENTITY_TREE_VERSION_QUERY = """
+SELECT COUNT(*), CHECKSUM_AGG(BINARY_CHECKSUM(chen_code, chen_parent_entity))
+FROM entity
+"""
+
 #   ================================================================================
 #   REQUÊTES DE Centre de charges
 #   ================================================================================
@@ -124,6 +136,76 @@ LEFT JOIN attribute a ON (s.timestamp = a.cwat_specification AND ea.INDX = a.CWA
 WHERE 1=1
 """
 
+# Chargement en deux phases : têtes d'équipements (une ligne par équipement),
+# puis attributs des codes de la page via EQUIPMENT_ATTRIBUTES_BY_CODES_QUERY.
+# La dernière colonne (pk_equipment) sert de clé keyset.
+EQUIPMENT_HEAD_QUERY = """
+SELECT 
+    e.timestamp, 
+    e.ereq_parent_equipment, 
+    e.ereq_code, 
+    e.ereq_category, 
+    e.ereq_zone, 
+    e.ereq_entity, 
+    e.ereq_function,
+    COALESCE(cc.mdcc_description, '') as ereq_costcentre, 
+    e.ereq_description, 
+    e.ereq_longitude, 
+    e.ereq_latitude,
+    f.timestamp as feeder,
+    f.ereq_description as feeder_description,
+    e.pk_equipment
+FROM equipment e
+LEFT JOIN costcentre cc ON e.ereq_costcentre = cc.mdcc_code
+LEFT JOIN equipment f ON e.ereq_string2 = f.ereq_code
+WHERE 1=1
+"""
+
+# Même sélection que EQUIPMENT_HEAD_QUERY limitée à une page (pagination keyset)
+EQUIPMENT_HEAD_PAGE_QUERY = """
+SELECT TOP (:page_limit)
+    e.timestamp, 
+    e.ereq_parent_equipment, 
+    e.ereq_code, 
+    e.ereq_category, 
+    e.ereq_zone, 
+    e.ereq_entity, 
+    e.ereq_function,
+    COALESCE(cc.mdcc_description, '') as ereq_costcentre, 
+    e.ereq_description, 
+    e.ereq_longitude, 
+    e.ereq_latitude,
+    f.timestamp as feeder,
+    f.ereq_description as feeder_description,
+    e.pk_equipment
+FROM equipment e
+LEFT JOIN costcentre cc ON e.ereq_costcentre = cc.mdcc_code
+LEFT JOIN equipment f ON e.ereq_string2 = f.ereq_code
+WHERE 1=1
+"""
+
+# Marqueur de changement de la DB principale (synchronisation incrémentale)
+EQUIPMENT_MAX_PK_QUERY = """
+SELECT MAX(pk_equipment) FROM equipment
+"""
+
+# Attributs d'un lot de codes équipements ({codes} = placeholders :code_0, :code_1, ...)
+EQUIPMENT_ATTRIBUTES_BY_CODES_QUERY = """
+SELECT
+    es.etes_equipment as equipment_code,
+    a.pk_attribute as attr_id,
+    a.cwat_specification as attr_specification,
+    a.cwat_index as attr_index,
+    a.cwat_name as attr_name,
+    ea.etat_value as attr_value
+FROM equipment_specs es
+JOIN equipment_attribute ea ON es.timestamp_specs = ea.commonkey
+JOIN specification s ON es.etes_specification = s.cwsp_code
+JOIN attribute a ON (s.timestamp = a.cwat_specification AND ea.INDX = a.CWAT_INDEX)
+WHERE es.etes_equipment IN ({codes})
+ORDER BY es.etes_equipment, a.cwat_index
+"""
+
 ATTRIBUTE_VALUES_QUERY = """
 SELECT
     pk_attribute_values, 
@@ -390,4 +472,56 @@ SELECT TOP 1
     cwcu_is_absent
 FROM coswin_user
 WHERE (cwcu_signature = :username OR cwcu_email = :username)
-"""
\ No newline at end of file
+"""
+# Archivage ensembliste d'un lot d'équipements ClicClac (DB temporaire MSSQL).
+# {ids} : placeholders des IDs du lot (:id_0, :id_1, ...).
+# Copie équipements et attributs vers l'historique, supprime les originaux,
+# puis renvoie les IDs effectivement archivés (avec code, entité, zone et famille
+# pour les événements de changement). Les attributs d'un code présent
+# plusieurs fois dans le lot sont rattachés au premier historique de ce code.
+ARCHIVE_EQUIPMENTS_BATCH_QUERY = """
+SET NOCOUNT ON;
+
+DECLARE @archived TABLE (
+    history_id INT NOT NULL, equipment_id INT NOT NULL, code NVARCHAR(255) NULL,
+    entity NVARCHAR(255) NULL, zone NVARCHAR(255) NULL, famille NVARCHAR(255) NULL
+);
+
+INSERT INTO dbo.history_equipment (
+    commentaire, date_history_created_at, equipment_id, code_parent, code, famille, zone, entity,
+    unite, centre_charge, description, longitude, latitude, feeder, feeder_description, info,
+    etat, type, localisation, niveau, n_serie, created_at, updated_at, created_by, judged_by,
+    is_update, is_new, is_approved, is_rejected, is_deleted
+)
+OUTPUT inserted.id, inserted.equipment_id, inserted.code, inserted.entity, inserted.zone, inserted.famille
+    INTO @archived (history_id, equipment_id, code, entity, zone, famille)
+SELECT
+    e.commentaire, CAST(GETDATE() AS DATE), e.id, e.code_parent, e.code, e.famille, e.zone, e.entity,
+    e.unite, e.centre_charge, e.description, e.longitude, e.latitude, e.feeder, e.feeder_description, e.info,
+    e.etat, e.type, e.localisation, e.niveau, e.n_serie, e.created_at, e.updated_at, e.created_by, e.judged_by,
+    e.is_update, e.is_new, e.is_approved, e.is_rejected, e.is_deleted
+FROM dbo.equipment e
+WHERE e.id IN ({ids});
+
+INSERT INTO dbo.history_attribute (
+    history_id, specification, famille, indx, attribute_name, value, code, description,
+    created_at, updated_at, is_copy_ot, date_history_created_at
+)
+SELECT
+    h.history_id, a.specification, a.famille, a.indx, a.attribute_name, a.value, a.code, a.description,
+    COALESCE(a.created_at, CAST(GETDATE() AS DATE)), COALESCE(a.updated_at, CAST(GETDATE() AS DATE)),
+    a.is_copy_ot, CAST(GETDATE() AS DATE)
+FROM (
+    SELECT code, MIN(history_id) AS history_id
+    FROM @archived
+    WHERE code IS NOT NULL
+    GROUP BY code
+) h
+INNER JOIN dbo.attribute a ON a.code = h.code;
+
+DELETE a FROM dbo.attribute a WHERE a.code IN (SELECT code FROM @archived WHERE code IS NOT NULL);
+
+DELETE e FROM dbo.equipment e WHERE e.id IN (SELECT equipment_id FROM @archived);
+
+SELECT equipment_id, code, entity, zone, famille FROM @archived;
+"""
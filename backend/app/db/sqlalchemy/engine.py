@@ -11,6 +11,12 @@ from app.core.config import (
 
 logger = logging.getLogger(__name__)
 
+# ===== TAILLES DES POOLS (réutilisées par le pool de threads DB) =====
+MAIN_POOL_SIZE = 10
+MAIN_MAX_OVERFLOW = 20
+TEMP_POOL_SIZE = 5
+TEMP_MAX_OVERFLOW = 10
+
 # ===== DEUX BASES DÉCLARATIVES SÉPARÉES =====
 # Base pour gmao_backend (lecture principale)
 Base = declarative_base()
@@ -30,8 +36,8 @@ def create_main_engine():
     engine = create_engine(
         url,
         poolclass=QueuePool,
-        pool_size=10,
-        max_overflow=20,
+        pool_size=MAIN_POOL_SIZE,
+        max_overflow=MAIN_MAX_OVERFLOW,
         pool_pre_ping=True,
         echo=False,
         future=True
@@ -47,8 +53,8 @@ def create_temp_engine():
     engine = create_engine(
         url,
         poolclass=QueuePool,
-        pool_size=5,
-        max_overflow=10,
+        pool_size=TEMP_POOL_SIZE,
+        max_overflow=TEMP_MAX_OVERFLOW,
         pool_pre_ping=True,
         echo=False,
         future=True
@@ -0,0 +1,169 @@
+import asyncio
+import functools
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.config import DB_EXECUTOR_MAX_QUEUE, DB_EXECUTOR_TIMEOUT
+from app.core.exceptions import DatabaseBusyError, DatabaseTimeoutError
+from app.db.sqlalchemy.engine import MAIN_MAX_OVERFLOW, MAIN_POOL_SIZE, TEMP_MAX_OVERFLOW, TEMP_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+
+class DBExecutor:
+    """
+    Pool de threads borné pour les appels SQLAlchemy/ODBC bloquants.
+
+    Les routeurs async y délèguent les fonctions de service synchrones : la boucle
+    d'événements (requêtes, websockets) reste libre pendant les requêtes pyodbc.
+
+    - workers = connexions des deux engines (principal 10+20, temporaire 5+10) :
+      le pool ne lance pas plus d'appels que les bases ne peuvent en servir ensemble.
+      La répartition n'est pas garantie : au-delà de 15 appels simultanés sur la base
+      temporaire, les suivants attendent une connexion (pool_timeout, 30 s) en
+      occupant un worker, retiré d'autant aux appels sur la base principale
+    - au-delà de `max_queue` appels en attente, refus immédiat (DatabaseBusyError → 503)
+    - délai par appel (DatabaseTimeoutError → 504) ; le thread termine sa requête
+      en arrière-plan mais reste compté tant qu'il occupe un worker
+    """
+
+    def __init__(self, max_workers: int, max_queue: int, default_timeout: float):
+        self.max_workers = max_workers
+        self.max_queue = max_queue
+        self.default_timeout = default_timeout
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="db-worker")
+        self._lock = threading.Lock()
+
+        # Métriques
+        self._pending = 0       # soumis et non terminés (en cours + en file)
+        self._active = 0        # en cours d'exécution dans un worker
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._timeouts = 0
+        self._max_pending = 0
+        self._max_wait_ms = 0.0
+        self._total_wait_ms = 0.0
+
+    def _execute(self, func: Callable[..., T], submitted_at: float) -> T:
+        """Exécuté dans un worker : mesure l'attente en file puis appelle la fonction."""
+        wait_ms = (time.perf_counter() - submitted_at) * 1000
+        with self._lock:
+            self._active += 1
+            self._total_wait_ms += wait_ms
+            self._max_wait_ms = max(self._max_wait_ms, wait_ms)
+
+        try:
+            result = func()
+            with self._lock:
+                self._completed += 1
+            return result
+        except Exception:
+            with self._lock:
+                self._failed += 1
+            raise
+        finally:
+            with self._lock:
+                self._active -= 1
+                self._pending -= 1
+
+    async def run(self, func: Callable[..., T], *args: Any, timeout: Optional[float] = None, **kwargs: Any) -> T:
+        """
+        Exécute une fonction bloquante dans le pool et attend son résultat.
+
+        Args:
+            func: Fonction de service synchrone
+            *args, **kwargs: Arguments de la fonction
+            timeout: Délai en secondes (défaut: DB_EXECUTOR_TIMEOUT)
+
+        Returns:
+            Résultat de la fonction
+
+        Raises:
+            DatabaseBusyError: Si la file d'attente est pleine
+            DatabaseTimeoutError: Si l'appel dépasse le délai
+        """
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_queue:
+                self._rejected += 1
+                pending = self._pending
+                reject = True
+            else:
+                self._pending += 1
+                self._submitted += 1
+                self._max_pending = max(self._max_pending, self._pending)
+                reject = False
+
+        if reject:
+            logger.warning(f"⚠️ Pool DB saturé ({pending} appels), refus de {getattr(func, '__name__', func)}")
+            raise DatabaseBusyError(pending)
+
+        call = functools.partial(func, *args, **kwargs)
+        try:
+            future = self._pool.submit(self._execute, call, time.perf_counter())
+        except BaseException:
+            self._release_slot()
+            raise
+        # Appel annulé avant d'avoir démarré (délai, annulation de l'appelant, arrêt) :
+        # _execute ne tournera jamais, la place est libérée ici (une seule fois)
+        future.add_done_callback(lambda done: self._release_slot() if done.cancelled() else None)
+        delay = self.default_timeout if timeout is None else timeout
+
+        try:
+            return await asyncio.wait_for(asyncio.wrap_future(future), timeout=delay)
+        except asyncio.TimeoutError:
+            # Annule l'appel s'il est encore en file ; sinon il se termine en arrière-plan
+            future.cancel()
+            with self._lock:
+                self._timeouts += 1
+            operation = getattr(func, '__name__', str(func))
+            logger.error(f"⏱️ Délai DB dépassé ({delay}s) pour {operation}")
+            raise DatabaseTimeoutError(operation, delay)
+
+    def _release_slot(self) -> None:
+        """Libère la place d'un appel qui ne passera jamais par _execute"""
+        with self._lock:
+            self._pending -= 1
+
+    def metrics(self) -> Dict[str, Any]:
+        """Métriques du pool (exposées par /health)"""
+        with self._lock:
+            started = self._completed + self._failed + self._active
+            return {
+                "max_workers": self.max_workers,
+                "max_queue": self.max_queue,
+                "active": self._active,
+                "queued": max(self._pending - self._active, 0),
+                "max_pending": self._max_pending,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "rejected": self._rejected,
+                "timeouts": self._timeouts,
+                "avg_wait_ms": round(self._total_wait_ms / started, 2) if started else 0.0,
+                "max_wait_ms": round(self._max_wait_ms, 2),
+            }
+
+    def shutdown(self) -> None:
+        """Arrête le pool (les appels en cours se terminent)"""
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        logger.info("🛑 Pool de threads DB arrêté")
+
+
+# Instance globale, dimensionnée sur les QueuePool des deux engines
+db_executor = DBExecutor(
+    max_workers=MAIN_POOL_SIZE + MAIN_MAX_OVERFLOW + TEMP_POOL_SIZE + TEMP_MAX_OVERFLOW,
+    max_queue=DB_EXECUTOR_MAX_QUEUE,
+    default_timeout=DB_EXECUTOR_TIMEOUT
+)
+
+
+async def run_db(func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+    """Raccourci : exécute une fonction de service bloquante dans le pool DB."""
+    return await db_executor.run(func, *args, **kwargs)
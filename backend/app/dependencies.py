@@ -4,12 +4,12 @@ from app.services.jwt_service import jwt_service
 
 security = HTTPBearer()
 
-def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
+async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security)) -> dict:
     """Dépendance pour récupérer l'utilisateur actuel depuis le JWT"""
     try:
         token = credentials.credentials
         payload = jwt_service.verify_token(token)
-        if not payload:
+        if not payload or await jwt_service.is_token_blacklisted(token):
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED,
                 detail="Token invalide",
@@ -1,7 +1,8 @@
 from fastapi import FastAPI, Request
-from fastapi.responses import FileResponse
+from fastapi.responses import FileResponse, JSONResponse
 from fastapi.middleware.cors import CORSMiddleware
 from contextlib import asynccontextmanager
+import asyncio
 import time
 import logging
 import os
@@ -20,7 +21,16 @@ from app.routers.mobile.entity_router import entity_router
 from app.routers.web.entity_router import entity_router_web
 from app.routers.mobile.unite_router import unite_router
 from app.routers.mobile.zone_router import zone_router
-from app.core.cache import cache
+from app.core.cache import cache, async_cache, local_cache
+from app.core.config import WS_PER_MESSAGE_DEFLATE
+from app.core.exceptions import DatabaseExecutorError, PasswordServiceError
+from app.db.sqlalchemy.executor import db_executor, run_db
+from app.services.hierarchy_index import hierarchy_index
+from app.services.jwt_service import jwt_service
+from app.services.password_service import password_service
+from app.services.warmup_service import warmup_service
+from app.services.notification_service import bind_event_loop
+from app.services.websocket_service import manager as websocket_manager
 from app.routers.websocket_router import router_ws
 from app.routers.notification_router import router_notification
 from app.routers.web.statistique_router import statistique_router_web
@@ -52,11 +62,32 @@ async def lifespan(app: FastAPI):
     except Exception:
         db_connected = False
     logger.info(f"✅ Redis: {'OK' if cache.is_available else 'KO'}")
+    await async_cache.connect()
+    jwt_service.register_blacklist_mirror()
+    cache.start_invalidation_listener()
+    jwt_service.load_blacklist_mirror()
+    bind_event_loop(asyncio.get_running_loop())
+    try:
+        await run_db(hierarchy_index.refresh)
+    except Exception as e:
+        logger.error(f"❌ Index de hiérarchie non chargé au démarrage: {e}")
+    logger.info(f"✅ Pool DB: {db_executor.max_workers} workers, file max {db_executor.max_queue}")
+    warmup_service.start()
+    password_service.start()
+    await websocket_manager.start_backplane()
+    websocket_manager.start_heartbeat()
     
     yield
     
     # Arrêt
     logger.info("🛑 Arrêt Equipment Mobile API")
+    await websocket_manager.stop_heartbeat()
+    await websocket_manager.stop_backplane()
+    warmup_service.shutdown()
+    password_service.shutdown()
+    cache.stop_invalidation_listener()
+    await async_cache.close()
+    db_executor.shutdown()
 
 # App FastAPI minimale
 app = FastAPI(
@@ -107,6 +138,24 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+@app.exception_handler(DatabaseExecutorError)
+async def database_executor_error_handler(request: Request, exc: DatabaseExecutorError):
+    """Pool DB saturé (503) ou délai dépassé (504)"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.message, "error_code": exc.error_code},
+        headers={"Retry-After": "5"} if exc.status_code == 503 else None
+    )
+
+@app.exception_handler(PasswordServiceError)
+async def password_service_error_handler(request: Request, exc: PasswordServiceError):
+    """Pool de hachage saturé (503) ou trop de tentatives de connexion (429)"""
+    return JSONResponse(
+        status_code=exc.status_code,
+        content={"detail": exc.message, "error_code": exc.error_code},
+        headers={"Retry-After": str(exc.retry_after)}
+    )
+
 @app.middleware("http")
 async def log_requests(request: Request, call_next):
     start_time = time.time()
@@ -179,8 +228,6 @@ async def root():
 async def health():
     """Health check global simple"""
     try:
-        from app.core.cache import cache
-        
         # Test DB simple
         db_ok = True
         try:
@@ -195,6 +242,14 @@ async def health():
             "status": "healthy" if db_ok else "degraded",
             "database": db_ok,
             "cache": cache.is_available,
+            "cache_async": async_cache.is_available,
+            "cache_l1": local_cache.stats(),
+            "db_executor": db_executor.metrics(),
+            "hierarchy_index": hierarchy_index.stats(),
+            "cache_warmup": warmup_service.stats(),
+            "websocket": websocket_manager.stats(),
+            "auth": jwt_service.stats(),
+            "password_hashing": password_service.stats(),
             "tables_status": "checking tables requires equipment health endpoint"
         }
     except Exception as e:
@@ -232,4 +287,4 @@ app.include_router(router_notification, tags=["Notifications"])
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    uvicorn.run(app, host="0.0.0.0", port=8000, ws_per_message_deflate=WS_PER_MESSAGE_DEFLATE)
\ No newline at end of file
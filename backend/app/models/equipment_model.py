@@ -127,6 +127,40 @@ class EquipmentWithAttributesBuilder:
         
         return list(equipment_dict.values())
 
+    @staticmethod
+    def build_from_heads_and_attributes(head_rows: List[tuple], attribute_rows: List[tuple]) -> List[EquipmentModel]:
+        """
+        Construit les équipements depuis un chargement en deux phases.
+        head_rows: lignes de EQUIPMENT_HEAD_QUERY (13 premiers champs = équipement)
+        attribute_rows: lignes de EQUIPMENT_ATTRIBUTES_BY_CODES_QUERY
+        (equipment_code, attr_id, attr_specification, attr_index, attr_name, attr_value)
+        L'ordre des têtes est conservé.
+        """
+        equipment_dict = {}
+        equipments_by_code: Dict[str, List[EquipmentModel]] = {}
+        
+        for row in head_rows:
+            equipment_id = str(row[0])
+            if equipment_id in equipment_dict:
+                continue
+            equipment = EquipmentModel.from_db_row(row[:13])
+            equipment_dict[equipment_id] = equipment
+            equipments_by_code.setdefault(str(equipment.code), []).append(equipment)
+        
+        for row in attribute_rows:
+            if row[1] is None:
+                continue
+            for equipment in equipments_by_code.get(str(row[0]), []):
+                equipment.attributes.append({
+                    'id': str(row[1]),
+                    'specification': row[2],
+                    'index': row[3],
+                    'name': row[4],
+                    'value': row[5]
+                })
+        
+        return list(equipment_dict.values())
+
     @staticmethod
     def build_single_from_query_results(results: List[tuple]) -> Optional[EquipmentModel]:
         """Construit un seul équipement avec ses attributs"""
@@ -1,6 +1,6 @@
 from typing import Any, Dict
 from fastapi import APIRouter, HTTPException
-from app.core.exceptions import DatabaseError, InvalidPasswordError, UserNotFoundError
+from app.core.exceptions import DatabaseError, DatabaseExecutorError, InvalidPasswordError, PasswordServiceError, UserNotFoundError
 from app.schemas.responses.auth_response import AuthResponse
 from app.services.jwt_service import jwt_service
 from app.services.auth_service import (
@@ -9,6 +9,7 @@ from app.services.auth_service import (
 )
 from app.schemas.requests.auth_request import (LoginRequest, LogoutRequest)
 import logging
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -38,13 +39,13 @@ async def login_user(
             logger.warning("Username ou mot de passe manquant.")
             raise HTTPException(status_code=400, detail="Username et mot de passe requis")
 
-        user = authenticate_user(username, password)
+        user = await authenticate_user(username, password)
         
         if not user:
             raise HTTPException(status_code=401, detail="Identifiants invalides")
         
         # Créer les tokens
-        user_data = {"sub": str(user.id), "username": user.username, "role": user.role}
+        user_data = {"sub": str(user.id), "username": user.username, "role": user.role, "entity": user.entity}
         access_token = jwt_service.create_access_token(user_data)
         refresh_token = jwt_service.create_refresh_token(user_data)
         
@@ -73,6 +74,10 @@ async def login_user(
         raise HTTPException(status_code=e.status_code, detail={"error_code": e.error_code, "message": e.message})
     except ValueError as e:
         raise HTTPException(status_code=400, detail={"status": 400, "error_code": "VALIDATION_ERROR", "message": str(e)})
+    except DatabaseExecutorError:
+        raise
+    except PasswordServiceError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail={"status": 500, "error_code": "UNKNOWN_ERROR", "message": "Erreur lors de l'authentification"})
@@ -96,7 +101,7 @@ async def logout_user_endpoint(
         # Révoquer le refresh token
         jwt_service.revoke_refresh_token(username)
         
-        success = logout_user(username)
+        success = await run_db(logout_user, username)
         
         if not success:
             logger.warning(f"Échec de la déconnexion pour {username}.")
@@ -104,6 +109,8 @@ async def logout_user_endpoint(
         
         logger.info(f"Utilisateur {username} déconnecté avec succès")
         return {"status": "success", "message": "Déconnexion réussie"}
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur de déconnexion: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la déconnexion")
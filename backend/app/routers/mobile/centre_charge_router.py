@@ -1,10 +1,12 @@
-from typing import Any, Dict
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 import pymssql
-from app.services.centre_charge_service import get_centre_charges
+from app.services.centre_charge_service import centre_charges_cache_key, get_centre_charges
+from app.core.http_cache import check_not_modified, etag_json_response
 import logging
 
-from app.services.entity_service import get_hierarchy
+from app.services.entity_service import get_hierarchy_async
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -20,15 +22,21 @@ centre_charge_router = APIRouter(
     description="Récupère la liste des centres de charge pour mobile"
 )
 async def get_centre_charge_mobile(
+    request: Request,
     entity: str = Query(..., description="Entité obligatoire (hiérarchie automatique)")
-) -> Dict[str, Any]:
+) -> Response:
     """Liste des centres de charge pour mobile"""
     try:
+        # Copie du client encore valide : 304 sans toucher à la base
+        not_modified = await check_not_modified(request, centre_charges_cache_key(entity))
+        if not_modified:
+            return not_modified
+
         # Récupérer la hiérarchie dans la fonction
-        hierarchy_result = get_hierarchy(entity)
-        result = get_centre_charges(entity=entity)
+        hierarchy_result = await get_hierarchy_async(entity)
+        result = await run_db(get_centre_charges, entity=entity)
         
-        return {
+        return etag_json_response(request, {
             "status": "success",
             "message": "Centres de charge récupérés avec succès",
             "data": {
@@ -38,11 +46,13 @@ async def get_centre_charge_mobile(
                     "total_available": result.get("total_available", result["count"])
                 }
             }
-        }
+        }, result)
 
     except pymssql.DatabaseError as e:
         logger.error(f"❌ Erreur base de données: {e}")
         raise HTTPException(status_code=500, detail="Erreur base de données")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des centres de charge")
\ No newline at end of file
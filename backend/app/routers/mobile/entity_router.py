@@ -1,11 +1,15 @@
 from typing import Any, Dict
-from fastapi import APIRouter, Query, HTTPException, Path
+from fastapi import APIRouter, Query, HTTPException, Path, Request, Response
 import pymssql
 from app.services.entity_service import (
+    entities_cache_key,
     get_entities,
-    get_hierarchy
+    get_hierarchy_async
 )
+from app.core.http_cache import check_not_modified, etag_json_response
 import logging
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -20,23 +24,31 @@ entity_router = APIRouter(
     description="Récupère la liste des entités pour mobile"
 )
 async def get_entity_mobile(
+    request: Request,
     entity: str = Query(..., description="Entité de l'entité à récupérer"),
-) -> Dict[str, Any]:
+) -> Response:
     """Liste des entités pour mobile"""
     try:
+        # Copie du client encore valide : 304 sans toucher à la base
+        not_modified = await check_not_modified(request, entities_cache_key(entity))
+        if not_modified:
+            return not_modified
+
         # Récupérer la hiérarchie dans la fonction
-        hierarchy_result = get_hierarchy(entity)
-        result = get_entities(entity=entity, hierarchy_result=hierarchy_result)
+        hierarchy_result = await get_hierarchy_async(entity)
+        result = await run_db(get_entities, entity=entity, hierarchy_result=hierarchy_result)
 
-        return {
+        return etag_json_response(request, {
             "status": "success",
             "message": "Entités récupérées avec succès",
             "data": result
-        }
+        }, result)
 
     except pymssql.DatabaseError as e:
         logger.error(f"❌ Erreur base de données: {e}")
         raise HTTPException(status_code=500, detail="Erreur base de données")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des entités")
@@ -50,7 +62,7 @@ async def get_oracle_hierarchy(
 ) -> Dict[str, Any]:
     """Hiérarchie Oracle d'une entité"""
     try:
-        result = get_hierarchy(entity_code=entity_code)
+        result = await get_hierarchy_async(entity_code)
         
         return {
             "status": "success",
@@ -58,6 +70,8 @@ async def get_oracle_hierarchy(
             "data": result
         }
         
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur hiérarchie Oracle: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
\ No newline at end of file
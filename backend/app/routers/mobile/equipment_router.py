@@ -1,13 +1,16 @@
-from fastapi import APIRouter, Query, HTTPException, Depends
+from datetime import date
+from fastapi import APIRouter, Query, HTTPException, Depends, Request, Response
 from typing import Optional, Dict, Any
 import logging
 
 from pydantic import ValidationError
 
+from app.core.config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
 from app.models.equipment_model import EquipmentClicClac
 from app.schemas.responses.equipment_response import (
     AttributeResponse, 
     AttributeValueResponse, 
+    EquipmentChangesResponse,
     EquipmentResponse,
     EquipmentListResponse,
     PrestataireHistoryResponse,  # ✅ AJOUT
@@ -17,19 +20,25 @@ from app.services.equipment_service import (
     get_attribute_values,
     get_equipment_attributes_by_code,
     get_equipment_by_id,
-    get_equipments_infinite,
-    get_feeders,
+    equipment_list_cache_key,
+    get_equipment_changes,
+    get_equipment_values_bundle,
+    get_equipments_infinite_async,
+    get_equipments_page_async,
     insert_equipment,
     update_equipment_mobile,
-    get_all_equipment_histories_prestataire  # ✅ AJOUT
+    values_bundle_cache_key,
+    get_all_equipment_histories_prestataire,  # ✅ AJOUT
+    _parse_history_position,
+    _parse_page_position,
+    _parse_watermark
 )
-from app.services.centre_charge_service import get_centre_charges
-from app.services.entity_service import get_entities
-from app.services.famille_service import get_familles
-from app.services.unite_service import get_unites
-from app.services.zone_service import get_zones
 from app.schemas.requests.equipment_request import AddEquipmentRequest, UpdateEquipmentRequest
 from app.dependencies import get_current_user  # ✅ AJOUT
+from app.core.exceptions import DatabaseExecutorError
+from app.core.http_cache import cached_json_response
+from app.services.warmup_service import warmup_service
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -47,25 +56,85 @@ equipment_router = APIRouter(
     response_model=EquipmentListResponse  # ✅ CORRECTION: Type de réponse cohérent
 )
 async def get_equipments_mobile(
+    request: Request,
     entity: str = Query(..., description="Entité obligatoire (hiérarchie automatique)"),
     zone: Optional[str] = Query(None, description="Filtre zone"),
     famille: Optional[str] = Query(None, description="Filtre famille"),
-    search: Optional[str] = Query(None, description="Recherche textuelle")
-) -> EquipmentListResponse:
-    """Endpoint principal optimisé pour mobile avec infinite scroll et hiérarchie"""
+    search: Optional[str] = Query(None, description="Recherche textuelle"),
+    cursor: Optional[str] = Query(None, description="Curseur opaque de la page suivante (mode paginé)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Taille de page (active le mode paginé)")
+) -> Response:
+    """
+    Endpoint principal optimisé pour mobile avec infinite scroll et hiérarchie.
+    
+    Sans `limit` ni `cursor`, la liste complète est retournée (compatibilité).
+    Avec `limit` et/ou `cursor`, pagination keyset sur pk_equipment DESC.
+    Réponse conditionnelle (ETag + 304) ; sur hit, le corps gzip en cache est
+    renvoyé tel quel.
+    """
+    async def build():
+        if limit is not None or cursor is not None:
+            result = await get_equipments_page_async(
+                entity=entity,
+                zone=zone,
+                famille=famille,
+                search_term=search,
+                cursor=cursor,
+                limit=limit or DEFAULT_PAGE_SIZE
+            )
+        else:
+            result = await get_equipments_infinite_async(
+                entity=entity,
+                zone=zone,
+                famille=famille,
+                search_term=search
+            )
+        return EquipmentListResponse(**result), result
+
+    # Seul un curseur invalide est une erreur client (400) ; une erreur de
+    # validation ou de sérialisation de la réponse reste une erreur serveur (500)
+    if cursor is not None:
+        try:
+            _parse_page_position(cursor, limit or DEFAULT_PAGE_SIZE)
+        except ValueError as e:
+            logger.warning(f"⚠️ Paramètre de pagination invalide: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        result = get_equipments_infinite(
-            entity=entity,
-            zone=zone,
-            famille=famille,
-            search_term=search
-        )
-        
-        return EquipmentListResponse(**result)
+        cache_key = equipment_list_cache_key(entity, zone, famille, search, cursor, limit)
+        warmup_service.record_equipment_list(entity, zone, famille, search, cursor, limit)
+        return await cached_json_response(request, cache_key, build)
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
 
+@equipment_router.get("/changes",
+    summary="Synchronisation incrémentale",
+    description="Retourne uniquement les équipements ajoutés, modifiés ou archivés depuis le watermark du client",
+    response_model=EquipmentChangesResponse
+)
+async def get_equipment_changes_mobile(
+    entity: str = Query(..., description="Entité obligatoire (hiérarchie automatique)"),
+    since: Optional[str] = Query(None, description="Watermark opaque retourné par la synchronisation précédente")
+) -> EquipmentChangesResponse:
+    """Changements depuis la dernière synchronisation du client"""
+    try:
+        _parse_watermark(since)
+    except ValueError as e:
+        logger.warning(f"⚠️ Watermark invalide: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
+    try:
+        result = await run_db(get_equipment_changes, entity=entity, since=since)
+        return EquipmentChangesResponse(**result)
+    except DatabaseExecutorError:
+        raise
+    except Exception as e:
+        logger.error(f"❌ Erreur synchronisation incrémentale: {e}")
+        raise HTTPException(status_code=500, detail=f"Erreur: {str(e)}")
+
 @equipment_router.post("",
     summary="Ajouter un équipement",
     description="Ajoute un nouvel équipement dans la base"
@@ -120,7 +189,7 @@ async def add_equipment_mobile(request: AddEquipmentRequest) -> Dict[str, Any]:
         
         equipment.attributes = attributes_converted
         
-        success, equipment_id = insert_equipment(equipment)
+        success, equipment_id = await run_db(insert_equipment, equipment)
         
         if success:
             
@@ -136,6 +205,8 @@ async def add_equipment_mobile(request: AddEquipmentRequest) -> Dict[str, Any]:
     except ValidationError as e:
         logger.error(f"❌ Erreur validation Pydantic: {e}")
         raise HTTPException(status_code=422, detail=f"Données invalides: {e}")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur ajout équipement: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur ajout équipement: {str(e)}")
@@ -158,11 +229,11 @@ async def update_equipment_mobile_partial_endpoint(
             raise HTTPException(status_code=400, detail="Aucun champ à mettre à jour fourni")
         
         # Effectuer la mise à jour
-        success = update_equipment_mobile(equipment_id, updates)
+        success = await run_db(update_equipment_mobile, equipment_id, updates)
         
         if success:
             # Récupérer l'équipement mis à jour pour la réponse
-            updated_equipment = get_equipment_by_id(equipment_id)
+            updated_equipment = await run_db(get_equipment_by_id, equipment_id)
             
             return {
                 "status": "success", 
@@ -176,6 +247,8 @@ async def update_equipment_mobile_partial_endpoint(
             
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur PATCH équipement: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur PATCH: {str(e)}")
@@ -184,38 +257,30 @@ async def update_equipment_mobile_partial_endpoint(
     summary="Récupérer les valeurs des équipements",
     description="Récupère les valeurs des équipements pour l'entité spécifiée"
 )
-async def get_equipment_values(entity: str) -> Dict[str, Any]:
+async def get_equipment_values(request: Request, entity: str) -> Response:
     """Récupération des valeurs des équipements"""
     
-    # Import local pour éviter les imports circulaires
-    from app.services.entity_service import get_hierarchy
-    
-    try:
-        hierarchy_result = get_hierarchy(entity)
-        cost_charges_result = get_centre_charges(entity)
-        entities_result = get_entities(entity, hierarchy_result)
-        familles_result = get_familles(entity, hierarchy_result)
-        unites_result = get_unites(entity, hierarchy_result)
-        zones_result = get_zones(entity, hierarchy_result)
-        feeder_result = get_feeders(entity, hierarchy_result)
+    async def build():
+        bundle = await get_equipment_values_bundle(entity)
 
         # Vérification des résultats
-        if not cost_charges_result or not entities_result or not familles_result or not unites_result or not zones_result:
+        if not bundle:
             raise HTTPException(status_code=404, detail="Aucune donnée trouvée pour l'entité spécifiée")
         
         return {
             "status": "success",
             "message": f"Valeurs récupérées pour l'entité {entity}",
-            "data": {
-                "entities": entities_result.get('entities', []),
-                "unites": unites_result.get('unites', []),
-                "zones": zones_result.get('zones', []),
-                "familles": familles_result.get('familles', []),
-                "cost_charges": cost_charges_result.get('centre_charges', []),
-                "feeders": feeder_result.get('feeders', [])
-            }
-        }
+            "data": bundle
+        }, bundle
+
+    try:
+        warmup_service.record_values(entity)
+        return await cached_json_response(request, values_bundle_cache_key(entity), build)
     
+    except HTTPException:
+        raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération valeurs: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur récupération valeurs: {str(e)}")
@@ -231,7 +296,7 @@ async def get_equipment_attribute_values(
     ) -> AttributeValueResponse:
     """Récupération des valeurs d'attributs d'un équipement"""
     try:
-        attributes = get_attribute_values(specification, attribute_index)
+        attributes = await run_db(get_attribute_values, specification, attribute_index)
 
         if not attributes:
             raise HTTPException(status_code=404, detail="Aucun attribut trouvé pour cette spécification")
@@ -253,6 +318,8 @@ async def get_equipment_attribute_values(
         
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération valeurs attributs: {e}")
         raise HTTPException(status_code=500, detail="Erreur récupération valeurs attributs")
@@ -268,7 +335,7 @@ async def get_equipment_attribute_values_by_code(
     """Récupération des attributs d'un équipement par son code"""
     try:
         # ✅ CORRECTION: Utiliser la fonction qui existe réellement
-        attributes = get_equipment_attributes_by_code(equipment_code)
+        attributes = await run_db(get_equipment_attributes_by_code, equipment_code)
         
         if not attributes:
             raise HTTPException(status_code=404, detail=f"Aucun attribut trouvé pour l'équipement {equipment_code}")
@@ -281,6 +348,8 @@ async def get_equipment_attribute_values_by_code(
         
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération attributs pour {equipment_code}: {e}")
         raise HTTPException(status_code=500, detail="Erreur récupération attributs")
@@ -293,7 +362,7 @@ async def get_equipment_attribute_values_by_code(
 async def get_equipment_by_id_endpoint(equipment_id: str) -> EquipmentResponse:
     """Récupération d'un équipement par son ID"""
     try:
-        equipment = get_equipment_by_id(equipment_id)
+        equipment = await run_db(get_equipment_by_id, equipment_id)
         
         if not equipment:
             raise HTTPException(status_code=404, detail=f"Équipement {equipment_id} non trouvé")
@@ -304,6 +373,8 @@ async def get_equipment_by_id_endpoint(equipment_id: str) -> EquipmentResponse:
         
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération équipement {equipment_id}: {e}")
         raise HTTPException(status_code=500, detail=f"Erreur récupération équipement: {str(e)}")
@@ -316,6 +387,11 @@ async def get_equipment_by_id_endpoint(equipment_id: str) -> EquipmentResponse:
 )
 async def get_prestataire_history_by_username(
     username: str,
+    cursor: Optional[str] = Query(None, description="Curseur opaque de la page suivante (mode paginé)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Taille de page (active le mode paginé)"),
+    date_from: Optional[date] = Query(None, description="Date d'archivage minimale (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date d'archivage maximale (YYYY-MM-DD)"),
+    entity: Optional[str] = Query(None, description="Filtre entité")
 ) -> PrestataireHistoryResponse:
     """
     Récupère l'historique complet d'un prestataire spécifique (réservé aux admins)
@@ -323,10 +399,27 @@ async def get_prestataire_history_by_username(
     - **Équipements archivés** : status = "archived"
     - **Équipements en cours** : status = "in_progress"
     """
+    # Seul un curseur invalide est une erreur client (400) ; une erreur de
+    # validation des historiques retournés reste une erreur serveur (500)
+    try:
+        _parse_history_position(cursor, limit)
+    except ValueError as e:
+        logger.warning(f"⚠️ Paramètre de pagination invalide: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         
         # Appeler le service
-        history_data = get_all_equipment_histories_prestataire(username)
+        result = await run_db(
+            get_all_equipment_histories_prestataire,
+            username,
+            cursor=cursor,
+            limit=limit,
+            date_from=date_from,
+            date_to=date_to,
+            entity=entity
+        )
+        history_data = result['histories']
         
         if not history_data:
             return PrestataireHistoryResponse(
@@ -345,11 +438,15 @@ async def get_prestataire_history_by_username(
             message=f"{len(history_items)} historiques récupérés pour {username}",
             data=history_items,
             count=len(history_items),
-            prestataire=username
+            prestataire=username,
+            next_cursor=result['next_cursor'],
+            has_more=result['has_more']
         )
         
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération historique prestataire {username}: {e}")
         raise HTTPException(
@@ -1,9 +1,11 @@
-from typing import Any, Dict
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 import pymssql
 from app.schemas.rest_response import create_simple_response
-from app.services.famille_service import get_familles
+from app.services.famille_service import familles_cache_key, get_familles
+from app.core.http_cache import check_not_modified, etag_json_response
 import logging
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -19,24 +21,32 @@ famille_router = APIRouter(
     description="Récupère la liste des familles pour mobile"
 )
 async def get_familles_mobile(
+    request: Request,
     entity: str = Query(..., description="Entité obligatoire (hiérarchie automatique)")
-) -> Dict[str, Any]:
+) -> Response:
     """Liste des familles pour mobile"""
     try:
+        # Copie du client encore valide : 304 sans toucher à la base
+        not_modified = await check_not_modified(request, familles_cache_key(entity))
+        if not_modified:
+            return not_modified
+
         # Récupérer la hiérarchie dans la fonction
-        from app.services.entity_service import get_hierarchy
-        hierarchy_result = get_hierarchy(entity)
-        result = get_familles(entity=entity, hierarchy_result=hierarchy_result)
+        from app.services.entity_service import get_hierarchy_async
+        hierarchy_result = await get_hierarchy_async(entity)
+        result = await run_db(get_familles, entity=entity, hierarchy_result=hierarchy_result)
 
-        return {
+        return etag_json_response(request, {
             "status": "success",
             "message": "Familles récupérées avec succès",
             "data": result
-        }
+        }, result)
 
     except pymssql.DatabaseError as e:
         logger.error(f"❌ Erreur base de données: {e}")
         raise HTTPException(status_code=500, detail="Erreur base de données")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des familles")
\ No newline at end of file
@@ -1,8 +1,10 @@
-from typing import Any, Dict
-from fastapi import APIRouter, Query, HTTPException
+from fastapi import APIRouter, Query, HTTPException, Request, Response
 import pymssql
-from app.services.zone_service import get_zones
+from app.services.zone_service import get_zones, zones_cache_key
+from app.core.http_cache import check_not_modified, etag_json_response
 import logging
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -18,24 +20,32 @@ zone_router = APIRouter(
     description="Récupère la liste des zones pour mobile"
 )
 async def get_zone_mobile(
+    request: Request,
     entity: str = Query(..., description="Entité obligatoire (hiérarchie automatique)")
-) -> Dict[str, Any]:
+) -> Response:
     """Liste des zones pour mobile"""
     try:
+        # Copie du client encore valide : 304 sans toucher à la base
+        not_modified = await check_not_modified(request, zones_cache_key(entity))
+        if not_modified:
+            return not_modified
+
         # Récupérer la hiérarchie dans la fonction
-        from app.services.entity_service import get_hierarchy
-        hierarchy_result = get_hierarchy(entity)
-        result = get_zones(entity=entity, hierarchy_result=hierarchy_result)
+        from app.services.entity_service import get_hierarchy_async
+        hierarchy_result = await get_hierarchy_async(entity)
+        result = await run_db(get_zones, entity=entity, hierarchy_result=hierarchy_result)
 
-        return {
+        return etag_json_response(request, {
             "status": "success",
             "message": "Zones récupérées avec succès",
             "data": result
-        }
+        }, result)
 
     except pymssql.DatabaseError as e:
         logger.error(f"❌ Erreur base de données: {e}")
         raise HTTPException(status_code=500, detail="Erreur base de données")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des zones")
\ No newline at end of file
@@ -1,6 +1,12 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from typing import Optional
+from fastapi import APIRouter, Depends, HTTPException, Query, status
+from app.core.config import NOTIFICATION_MAX_PAGE_SIZE
 from app.dependencies import get_current_user
-from app.services.notification_service import get_unread_notifications, mark_notification_as_read
+from app.services.notification_service import (
+    get_unread_notifications,
+    mark_all_notifications_as_read,
+    mark_notification_as_read
+)
 from app.schemas.requests.mark_read_request import MarkReadRequest
 import logging
 
@@ -9,17 +15,21 @@ logger = logging.getLogger(__name__)
 router_notification = APIRouter()
 
 @router_notification.get("/notifications/unread")
-async def get_notifications(current_user: dict = Depends(get_current_user)):
-    """Récupère les notifications non lues de l'utilisateur connecté"""
+async def get_notifications(
+    limit: Optional[int] = Query(None, ge=1, le=NOTIFICATION_MAX_PAGE_SIZE, description="Taille de page (plus récentes d'abord)"),
+    before: Optional[int] = Query(None, description="Curseur : next_cursor de la page précédente"),
+    current_user: dict = Depends(get_current_user)
+):
+    """
+    Récupère les notifications non lues de l'utilisateur connecté.
+    Sans `limit`, toute la boîte en ordre chronologique (compatibilité).
+    """
     user_id = str(current_user.get("id") or current_user.get("code"))
     
-    notifications = get_unread_notifications(user_id)
-    logger.info(f"📬 {len(notifications)} notifications non lues pour user_id={user_id}")
+    result = await get_unread_notifications(user_id, limit=limit, before=before)
+    logger.debug(f"📬 {result['count']} notifications non lues pour user_id={user_id}")
     
-    return {
-        "count": len(notifications),
-        "notifications": notifications
-    }
+    return result
 
 @router_notification.post("/notifications/mark-read")
 async def mark_read(
@@ -37,7 +47,7 @@ async def mark_read(
             detail="notification_id est requis"
         )
     
-    success = mark_notification_as_read(user_id, request.notification_id)
+    success = await mark_notification_as_read(user_id, request.notification_id)
     
     if not success:
         logger.warning(f"⚠️ Notification {request.notification_id} non trouvée pour {user_id}")
@@ -56,11 +66,7 @@ async def mark_all_read(current_user: dict = Depends(get_current_user)):
     """Marque toutes les notifications comme lues"""
     user_id = str(current_user.get("id") or current_user.get("code"))
     
-    from app.core.cache import cache
-    cache_key = f"notifications:{user_id}"
-    cache.delete(cache_key)
-    
-    logger.info(f"✅ Toutes les notifications marquées comme lues pour {user_id}")
+    await mark_all_notifications_as_read(user_id)
     
     return {
         "success": True,
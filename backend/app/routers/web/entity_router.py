@@ -5,6 +5,8 @@ from fastapi import APIRouter, HTTPException
 import pymssql
 
 from app.services.entity_service import get_all_entities
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -21,7 +23,7 @@ entity_router_web  = APIRouter(
 async def get_all_entity_web() -> Dict[str, Any]:
     """Liste des entités pour mobile"""
     try:
-        result = get_all_entities()
+        result = await run_db(get_all_entities)
 
         return {
             "status": "success",
@@ -31,6 +33,8 @@ async def get_all_entity_web() -> Dict[str, Any]:
     except pymssql.DatabaseError as e:
         logger.error(f"❌ Erreur base de données: {e}")
         raise HTTPException(status_code=500, detail="Erreur base de données")
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue: {e}")
         raise HTTPException(status_code=500, detail="Erreur lors de la récupération des entités")
\ No newline at end of file
@@ -1,10 +1,15 @@
+from datetime import date
 import logging
+from typing import Optional
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Query
 
-from app.services.equipment_service import archive_equipments, get_all_equipment_histories, get_all_equipment_histories_prestataire, get_all_equipment_web, update_equipment_web
+from app.services.equipment_service import _parse_history_position, archive_equipments, get_all_equipment_histories, get_all_equipment_histories_prestataire, get_all_equipment_web, update_equipment_web
 from app.schemas.requests.equipment_request import ArchiveEquipmentRequest, UpdateEquipmentWebRequest 
 from app.schemas.responses.equipment_response import AllEquipmentHistoriesResponse, ArchiveEquipmentResponse, EquipmentHistoryItem, PrestataireHistoryResponse, UpdateEquipmentResponse
+from app.core.config import MAX_LIMIT, MAX_PAGE_SIZE
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 
 logger = logging.getLogger(__name__)
@@ -19,19 +24,52 @@ equipment_router_web = APIRouter(
     summary="Liste des équipements (web)",
     description="Récupère tous les équipements avec leurs attributs pour l'interface web",
 )
-async def get_equipments():
-    """Récupère tous les équipements pour l'interface web"""
+async def get_equipments(
+    page: Optional[int] = Query(None, ge=1, description="Numéro de page (mode paginé)"),
+    page_size: Optional[int] = Query(None, ge=1, le=MAX_LIMIT, description="Taille de page (active la pagination)"),
+    sort_by: str = Query("id", description="Colonne de tri (id, code, famille, zone, entity, created_at, updated_at, created_by)"),
+    sort_order: str = Query("desc", description="Ordre de tri (asc ou desc)"),
+    entity: Optional[str] = Query(None, description="Filtre entité"),
+    famille: Optional[str] = Query(None, description="Filtre famille"),
+    zone: Optional[str] = Query(None, description="Filtre zone"),
+    status: Optional[str] = Query(None, description="Filtre statut (new, updated, approved, rejected, pending)"),
+    search: Optional[str] = Query(None, description="Recherche sur code, description ou créateur")
+):
+    """
+    Récupère les équipements pour l'interface web.
+    
+    Sans `page_size`, toute la liste filtrée est retournée (compatibilité).
+    """
     try:
         # Appeler la fonction service
-        result = get_all_equipment_web()
+        result = await run_db(
+            get_all_equipment_web,
+            page=page,
+            page_size=page_size,
+            sort_by=sort_by,
+            sort_order=sort_order,
+            entity=entity,
+            famille=famille,
+            zone=zone,
+            status=status,
+            search=search
+        )
         
         # Retourner directement le résultat
-        return {
+        response = {
             "success": True,
             "data": result["equipments"],
             "count": result["count"],
             "message": "Équipements récupérés avec succès"
         }
+        if "pagination" in result:
+            response["pagination"] = result["pagination"]
+        return response
+    except ValueError as e:
+        logger.warning(f"⚠️ Paramètre de liste invalide: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur lors de la récupération des équipements: {e}")
         return {
@@ -48,7 +86,7 @@ async def get_equipments():
 async def archive_equipments_endpoint(request: ArchiveEquipmentRequest):
     """Archive les équipements spécifiés"""
     try:
-        success, message, archived_count, failed_ids = archive_equipments(
+        success, message, archived_count, failed_ids, chunk_reports = await run_db(archive_equipments,
             request.equipment_ids
         )
         
@@ -58,6 +96,7 @@ async def archive_equipments_endpoint(request: ArchiveEquipmentRequest):
                 message=message,
                 archived_count=archived_count,
                 failed_ids=failed_ids if failed_ids else None,
+                chunk_reports=chunk_reports,
                 error_code=None
             )
         else:
@@ -66,8 +105,11 @@ async def archive_equipments_endpoint(request: ArchiveEquipmentRequest):
                 message=message,
                 archived_count=archived_count,
                 error_code="ARCHIVE_FAILED",
-                failed_ids=failed_ids if failed_ids else None
+                failed_ids=failed_ids if failed_ids else None,
+                chunk_reports=chunk_reports
             )
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur dans archive_equipments_endpoint: {e}")
         return ArchiveEquipmentResponse(
@@ -82,16 +124,44 @@ async def archive_equipments_endpoint(request: ArchiveEquipmentRequest):
     summary="Liste des historiques d'équipements",
     description="Récupère tous les historiques d'archivage d'équipements, y compris leurs attributs",
 )
-async def get_all_equipment_histories_endpoint():
-    """Récupère tous les historiques d'équipements"""
+async def get_all_equipment_histories_endpoint(
+    cursor: Optional[str] = Query(None, description="Curseur opaque de la page suivante (mode paginé)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Taille de page (active le mode paginé)"),
+    date_from: Optional[date] = Query(None, description="Date d'archivage minimale (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date d'archivage maximale (YYYY-MM-DD)"),
+    entity: Optional[str] = Query(None, description="Filtre entité")
+):
+    """
+    Récupère les historiques d'équipements.
+    
+    Sans `cursor` ni `limit`, toute l'archive filtrée est retournée (compatibilité).
+    """
+    try:
+        _parse_history_position(cursor, limit)
+    except ValueError as e:
+        logger.warning(f"⚠️ Paramètre de pagination invalide: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
-        histories = get_all_equipment_histories()
+        result = await run_db(
+            get_all_equipment_histories,
+            cursor=cursor,
+            limit=limit,
+            date_from=date_from,
+            date_to=date_to,
+            entity=entity
+        )
+        histories = result['histories']
         return AllEquipmentHistoriesResponse(
             data=histories,
             count=len(histories),
+            next_cursor=result['next_cursor'],
+            has_more=result['has_more'],
             status="success",
             message=f"{len(histories)} historiques trouvés" if histories else "Aucun historique trouvé"
         )
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération tous les historiques: {e}")
         return AllEquipmentHistoriesResponse(
@@ -109,7 +179,7 @@ async def get_all_equipment_histories_endpoint():
 async def update_equipment(equipment_id: str, request: UpdateEquipmentWebRequest):
     """Met à jour un équipement existant avec POST"""
     try:
-        success, message = update_equipment_web(equipment_id, request.model_dump())
+        success, message = await run_db(update_equipment_web, equipment_id, request.model_dump())
         
         if success:
             return UpdateEquipmentResponse(
@@ -125,6 +195,8 @@ async def update_equipment(equipment_id: str, request: UpdateEquipmentWebRequest
                 error_code="UPDATE_FAILED",
                 data=None
             )
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur dans PATCH update_equipment: {e}")
         return UpdateEquipmentResponse(
@@ -142,6 +214,11 @@ async def update_equipment(equipment_id: str, request: UpdateEquipmentWebRequest
 )
 async def get_prestataire_history_by_username(
     username: str,
+    cursor: Optional[str] = Query(None, description="Curseur opaque de la page suivante (mode paginé)"),
+    limit: Optional[int] = Query(None, ge=1, le=MAX_PAGE_SIZE, description="Taille de page (active le mode paginé)"),
+    date_from: Optional[date] = Query(None, description="Date d'archivage minimale (YYYY-MM-DD)"),
+    date_to: Optional[date] = Query(None, description="Date d'archivage maximale (YYYY-MM-DD)"),
+    entity: Optional[str] = Query(None, description="Filtre entité")
 ) -> PrestataireHistoryResponse:
     """
     Récupère l'historique complet d'un prestataire spécifique (réservé aux admins)
@@ -149,10 +226,27 @@ async def get_prestataire_history_by_username(
     - **Équipements archivés** : status = "archived"
     - **Équipements en cours** : status = "in_progress"
     """
+    # Seul un curseur invalide est une erreur client (400) ; une erreur de
+    # validation des historiques retournés reste une erreur serveur (500)
+    try:
+        _parse_history_position(cursor, limit)
+    except ValueError as e:
+        logger.warning(f"⚠️ Paramètre de pagination invalide: {e}")
+        raise HTTPException(status_code=400, detail=str(e))
+
     try:
         
         # Appeler le service
-        history_data = get_all_equipment_histories_prestataire(username)
+        result = await run_db(
+            get_all_equipment_histories_prestataire,
+            username,
+            cursor=cursor,
+            limit=limit,
+            date_from=date_from,
+            date_to=date_to,
+            entity=entity
+        )
+        history_data = result['histories']
         
         if not history_data:
             return PrestataireHistoryResponse(
@@ -171,11 +265,15 @@ async def get_prestataire_history_by_username(
             message=f"{len(history_items)} historiques récupérés pour {username}",
             data=history_items,
             count=len(history_items),
-            prestataire=username
+            prestataire=username,
+            next_cursor=result['next_cursor'],
+            has_more=result['has_more']
         )
         
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur récupération historique prestataire {username}: {e}")
         raise HTTPException(
@@ -5,6 +5,8 @@ from fastapi import APIRouter, Depends, Query
 from app.dependencies import get_current_user
 from app.services.statistique_service import get_statistics_cockpit_web, get_statistics_summary
 from app.schemas.responses.statistics_response import DashboardStatisticsResponse, EquipmentStats
+from app.core.exceptions import DatabaseExecutorError
+from app.db.sqlalchemy.executor import run_db
 
 logger = logging.getLogger(__name__)
 
@@ -46,10 +48,12 @@ async def get_dashboard_statistics(
     try:
         logger.info(f"📊 Requête de statistiques (details={include_details}) par user {current_user.get('username')}")
         
-        stats = get_statistics_cockpit_web(include_details=include_details)
+        stats = await run_db(get_statistics_cockpit_web, include_details=include_details)
         
         return stats
         
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur endpoint statistiques: {e}")
         return DashboardStatisticsResponse(
@@ -80,10 +84,12 @@ async def get_statistics_summary_endpoint(
     try:
         logger.info(f"📊 Requête de résumé statistiques par user {current_user.get('username')}")
         
-        stats = get_statistics_summary()
+        stats = await run_db(get_statistics_summary)
         
         return stats
         
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur endpoint résumé statistiques: {e}")
         return {
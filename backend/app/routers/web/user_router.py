@@ -6,6 +6,10 @@ from app.schemas.responses.user_response import (
     AddUserResponse, GetAllUsersResponse, UpdateUserResponse, DeleteUserResponse
 )
 import logging
+from app.core.config import DEFAULT_PASSWORD_PRESTATAIRE
+from app.core.exceptions import DatabaseExecutorError, PasswordServiceError
+from app.db.sqlalchemy.executor import run_db
+from app.services.password_service import password_service
 
 logger = logging.getLogger(__name__)
 
@@ -25,12 +29,14 @@ async def get_users(
 ):
     """Récupère tous les utilisateurs"""
     try:
-        result = get_all_users(supervisor_id)
+        result = await run_db(get_all_users, supervisor_id)
         if not result.success:
             raise HTTPException(status_code=500, detail=result.model_dump())
         return result
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue dans get_users: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -47,7 +53,9 @@ async def update_user_endpoint(
     try:
         if request is None:
             raise HTTPException(status_code=400, detail="Aucune donnée fournie pour la mise à jour")
-        result = update_user(user_id, request)
+        # Hachage dans le pool de processus, avant de prendre un thread DB
+        hashed_password = await password_service.hash_password(request.password) if request.password else None
+        result = await run_db(update_user, user_id, request, hashed_password)
         if not result.success:
             if result.error_code == "USER_NOT_FOUND":
                 raise HTTPException(status_code=404, detail=result.model_dump())
@@ -55,6 +63,10 @@ async def update_user_endpoint(
         return result
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
+    except PasswordServiceError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue dans update_user_endpoint: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -67,7 +79,7 @@ async def update_user_endpoint(
 async def delete_user_endpoint(user_id: int = Path(..., description="ID de l'utilisateur")):
     """Supprime un utilisateur"""
     try:
-        result = delete_user(user_id)
+        result = await run_db(delete_user, user_id)
         if not result.success:
             if result.error_code == "USER_NOT_FOUND":
                 raise HTTPException(status_code=404, detail=result.model_dump())
@@ -75,6 +87,8 @@ async def delete_user_endpoint(user_id: int = Path(..., description="ID de l'uti
         return result
     except HTTPException:
         raise
+    except DatabaseExecutorError:
+        raise
     except Exception as e:
         logger.error(f"❌ Erreur inattendue dans delete_user_endpoint: {e}")
         raise HTTPException(status_code=500, detail="Erreur interne du serveur")
@@ -87,7 +101,8 @@ async def delete_user_endpoint(user_id: int = Path(..., description="ID de l'uti
 async def create_user(request: AddUserRequest) -> AddUserResponse:
     """Ajoute un utilisateur"""
     try:
-        result = add_user(request)
+        hashed_password = await password_service.hash_password(DEFAULT_PASSWORD_PRESTATAIRE)
+        result = await run_db(add_user, request, hashed_password)
         if not result.success:
             # Lever une HTTPException pour les erreurs métier (400)
             raise HTTPException(status_code=400, detail=result.model_dump())
@@ -95,6 +110,10 @@ async def create_user(request: AddUserRequest) -> AddUserResponse:
     except HTTPException:
         # Re-lancer les HTTPException (comme 400) sans les masquer
         raise
+    except DatabaseExecutorError:
+        raise
+    except PasswordServiceError:
+        raise
     except Exception as e:
         # Capturer seulement les erreurs inattendues (pas les HTTPException)
         logger.error(f"❌ Erreur inattendue dans l'endpoint create_user: {e}")
@@ -1,4 +1,8 @@
+from typing import Any, Dict, Set
 from fastapi import APIRouter, WebSocket, WebSocketDisconnect, Query
+from app.db.sqlalchemy.executor import run_db
+from app.services.auth_service import get_user_connect
+from app.services.entity_service import get_hierarchy_async
 from app.services.websocket_service import manager
 from app.services.jwt_service import jwt_service
 import logging
@@ -7,69 +11,135 @@ import json
 logger = logging.getLogger(__name__)
 router_ws = APIRouter()
 
+async def _user_entities(payload: Dict[str, Any]) -> Set[str]:
+    """
+    Entité de l'utilisateur (claim "entity", sinon base pour les anciens tokens) et ses
+    sous-entités : seuls sujets d'équipements que la connexion peut recevoir.
+    En cas d'échec, aucune entité (la connexion reste ouverte pour les notifications).
+    """
+    entity = payload.get("entity")
+    try:
+        if not entity and payload.get("username"):
+            user = await run_db(get_user_connect, str(payload["username"]))
+            entity = getattr(user, "entity", None) if user else None
+        if not entity:
+            return set()
+        hierarchy = await get_hierarchy_async(str(entity))
+        return set(hierarchy.get("hierarchy") or []) | {str(entity)}
+    except Exception as e:
+        logger.error(f"❌ Erreur résolution des entités de {payload.get('sub')}: {e}")
+        return set()
+
 @router_ws.websocket("/ws/notifications")
 async def websocket_notifications(
     websocket: WebSocket, 
-    token: str = Query(..., description="JWT token pour authentification")
+    token: str = Query(..., description="JWT token pour authentification"),
+    batch: bool = Query(False, description="Regrouper les messages en rafale dans une trame (tableau JSON)")
 ):
-    """WebSocket pour les notifications en temps réel"""
+    """
+    WebSocket pour les notifications en temps réel.
+    Avec batch=true, une trame peut contenir un tableau de messages au lieu d'un seul objet.
+    """
     user_id = None
     try:
         # ✅ CORRECTION : Vérifier le token avec logs détaillées
-        logger.info(f"🔐 Tentative de connexion WebSocket avec token: {token[:20]}...")
+        logger.debug("🔐 Tentative de connexion WebSocket")
         payload = jwt_service.verify_token(token)
         
-        if not payload:
-            logger.warning(f"❌ Token invalide ou expiré: {token[:20]}...")
+        if not payload or await jwt_service.is_token_blacklisted(token):
+            logger.warning("❌ Token WebSocket invalide ou expiré")
             await websocket.close(code=1008, reason="Token invalide ou expiré")
             return
         
-        logger.info(f"✅ Token valide. Payload: {payload}")
-        
         # ✅ CORRECTION : Extraire user_id en priorité depuis "sub" (comme dans login)
         user_id = str(payload.get("sub") or payload.get("id") or payload.get("code") or payload.get("username"))
         
         if not user_id:
-            logger.error(f"❌ user_id manquant dans le token JWT. Payload: {payload}")
+            logger.error(f"❌ user_id manquant dans le token JWT (claims: {sorted(payload)})")
             await websocket.close(code=1008, reason="user_id manquant dans le token")
             return
         
-        await manager.connect(websocket, user_id)
+        entities = await _user_entities(payload)
+        connection = await manager.connect(websocket, user_id, batch=batch, entities=entities)
         logger.info(f"✅ WebSocket connecté pour user_id={user_id}")
         
         try:
             while True:
                 # Recevoir les messages du client
                 data = await websocket.receive_text()
-                message = json.loads(data)
+                # Tout message entrant prouve que le client est vivant (heartbeat)
+                connection.touch()
+                try:
+                    message = json.loads(data)
+                except json.JSONDecodeError as e:
+                    logger.error(f"❌ Message JSON invalide de {user_id}: {e}")
+                    continue
                 
-                logger.info(f"📨 Message reçu de {user_id}: {message}")
+                logger.debug(f"📨 Message reçu de {user_id}: {message}")
                 
                 # ✅ Gérer différents types de messages
                 if message.get("action") == "mark_read":
                     # Client demande de marquer une notification comme lue
                     notification_id = message.get("notification_id")
-                    if notification_id:
-                        from app.services.notification_service import mark_notification_as_read
-                        mark_notification_as_read(user_id, notification_id)
-                        await websocket.send_text(json.dumps({
-                            "type": "ack",
-                            "message": f"Notification {notification_id} marquée comme lue"
-                        }))
+                    # Identifiant fourni par le client : entier positif (ou chaîne de chiffres)
+                    if isinstance(notification_id, str) and notification_id.isdigit():
+                        notification_id = int(notification_id)
+                    if isinstance(notification_id, bool) or not isinstance(notification_id, int) or notification_id < 0:
+                        logger.warning(f"⚠️ notification_id invalide de {user_id}: {notification_id!r}")
+                        connection.send({
+                            "type": "error",
+                            "action": "mark_read",
+                            "message": f"notification_id invalide: {notification_id!r}"
+                        })
+                        continue
+                    
+                    from app.services.notification_service import mark_notification_as_read
+                    try:
+                        await mark_notification_as_read(user_id, notification_id)
+                    except Exception as e:
+                        logger.error(f"❌ Erreur marquage notification {notification_id} pour {user_id}: {e}")
+                        connection.send({
+                            "type": "error",
+                            "action": "mark_read",
+                            "message": f"Notification {notification_id} non marquée comme lue"
+                        })
+                        continue
+                    # Réponses via la file de la connexion : un seul écrivain par socket
+                    connection.send({
+                        "type": "ack",
+                        "message": f"Notification {notification_id} marquée comme lue"
+                    })
                 
-                elif message.get("action") == "ping":
-                    # Heartbeat pour maintenir la connexion active
-                    await websocket.send_text(json.dumps({"type": "pong"}))
+                elif message.get("action") == "ping" or message.get("type") == "ping":
+                    # Heartbeat du client ({"action": "ping"} ou {"type": "ping"} côté mobile)
+                    connection.send({"type": "pong"})
                     logger.debug(f"🏓 Pong envoyé à {user_id}")
                 
+                elif message.get("action") == "subscribe":
+                    # Abonnement aux changements d'équipements : ["entity:SDDV", "zone:Z1", "famille:F1"]
+                    topics = message.get("topics") or []
+                    rejected = await manager.subscribe(connection, topics if isinstance(topics, list) else [topics])
+                    connection.send({
+                        "type": "subscribed",
+                        "topics": sorted(connection.topics),
+                        "rejected": rejected
+                    })
+                
+                elif message.get("action") == "unsubscribe":
+                    topics = message.get("topics") or []
+                    manager.unsubscribe(connection, topics if isinstance(topics, list) else [topics])
+                    connection.send({"type": "subscribed", "topics": sorted(connection.topics), "rejected": []})
+                
+                elif message.get("action") == "pong" or message.get("type") == "pong":
+                    # Réponse au ping du serveur : déjà prise en compte par touch()
+                    pass
+                
                 else:
                     logger.warning(f"⚠️ Action inconnue: {message}")
                 
         except WebSocketDisconnect:
             logger.info(f"🔌 WebSocket déconnecté normalement pour user_id={user_id}")
             manager.disconnect(websocket, user_id)
-        except json.JSONDecodeError as e:
-            logger.error(f"❌ Message JSON invalide de {user_id}: {e}")
         except Exception as e:
             logger.error(f"❌ Erreur traitement message de {user_id}: {e}")
             manager.disconnect(websocket, user_id)
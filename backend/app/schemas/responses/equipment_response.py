@@ -73,6 +73,26 @@ class EquipmentListResponse(BaseModel):
     equipments: List[Dict[str, Any]] = Field(..., description="Liste des équipements")
     count: int = Field(..., description="Nombre d'équipements")
     entity_hierarchy: Optional[Dict[str, Any]] = Field(None, description="Hiérarchie d'entité utilisée")
+    next_cursor: Optional[str] = Field(None, description="Curseur opaque de la page suivante (mode paginé)")
+    has_more: Optional[bool] = Field(None, description="Indique s'il reste des équipements (mode paginé)")
+    limit: Optional[int] = Field(None, description="Taille de page appliquée (mode paginé)")
+    watermark: Optional[str] = Field(None, description="Watermark de départ de la synchronisation incrémentale (liste complète ou première page)")
+    status: str = Field("success", description="Statut de la réponse")
+    message: str = Field("", description="Message de la réponse")
+
+    class Config:
+        from_attributes = True
+
+
+class EquipmentChangesResponse(BaseModel):
+    """Réponse de synchronisation incrémentale (changements depuis un watermark)"""
+    equipments: List[Dict[str, Any]] = Field(default_factory=list, description="Nouveaux équipements GMAO (DB principale)")
+    pending: List[Dict[str, Any]] = Field(default_factory=list, description="Équipements ajoutés/modifiés en attente (ClicClac)")
+    archived: List[Dict[str, Any]] = Field(default_factory=list, description="Équipements archivés/validés (historique ClicClac)")
+    count: int = Field(0, description="Nombre total de changements")
+    watermark: Optional[str] = Field(None, description="Watermark opaque à renvoyer au prochain appel (since) ; absent si une synchronisation complète est requise")
+    has_more: bool = Field(False, description="Indique s'il reste des changements à récupérer")
+    full_sync_required: bool = Field(False, description="True si le client doit faire une synchronisation complète")
     status: str = Field("success", description="Statut de la réponse")
     message: str = Field("", description="Message de la réponse")
 
@@ -96,11 +116,14 @@ class ArchiveEquipmentResponse(BaseModel):
     archived_count: int = Field(..., description="Nombre d'équipements archivés")
     error_code: Optional[str] = Field(None, description="Code d'erreur si échec")
     failed_ids: Optional[List[str]] = Field(None, description="Liste des IDs qui ont échoué (si partiellement réussi)")
+    chunk_reports: Optional[List[Dict[str, Any]]] = Field(None, description="Résultat par lot (requested, archived, failed_ids, error)")
     
 class AllEquipmentHistoriesResponse(BaseModel):
     """Réponse pour la liste de tous les historiques d'équipements"""
     data: List[Dict[str, Any]] = Field(..., description="Liste de tous les historiques avec attributs")
     count: int = Field(..., description="Nombre total d'historiques")
+    next_cursor: Optional[str] = Field(None, description="Curseur opaque de la page suivante (mode paginé)")
+    has_more: Optional[bool] = Field(None, description="Indique s'il reste des historiques (mode paginé)")
     status: str = Field("success", description="Statut de la réponse")
     message: str = Field("", description="Message de la réponse")
 
@@ -197,6 +220,8 @@ class PrestataireHistoryResponse(BaseModel):
     data: List[EquipmentHistoryItem]
     count: int
     prestataire: str
+    next_cursor: Optional[str] = None
+    has_more: Optional[bool] = None
     
     class Config:
         json_schema_extra = {
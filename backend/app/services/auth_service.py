@@ -1,7 +1,9 @@
 from typing import Union
-import bcrypt
 import pymssql
-from app.core.exceptions import AuthenticationError, DatabaseError, InvalidPasswordError, UserNotFoundError
+from app.core.exceptions import (
+    AuthenticationError, DatabaseError, DatabaseExecutorError, InvalidPasswordError, PasswordServiceError, UserNotFoundError
+)
+from app.db.sqlalchemy.executor import run_db
 from app.db.sqlalchemy.session import SQLAlchemyQueryExecutor, get_main_session, get_temp_session
 from app.core.config import CACHE_TTL_SHORT
 from app.core.cache import cache
@@ -9,93 +11,109 @@ from app.db.requests import (GET_USER_AUTHENTICATION_QUERY, UPDATE_USER_QUERY, G
 import logging
 
 from app.models.user_model import UserClicClac, UserModel
+from app.services.password_service import password_service
 
 logger = logging.getLogger(__name__)
 
-def authenticate_user(username: str, password: str) -> Union[UserModel, UserClicClac] | None:
+def find_clicclac_user(username: str) -> UserClicClac | None:
+    """Utilisateur ClicClac (MSSQL) par nom d'utilisateur ou email, None s'il n'existe pas"""
+    with get_temp_session() as session:
+        return session.query(UserClicClac).filter(
+            (UserClicClac.username == username) | (UserClicClac.email == username)
+        ).first()
+
+def complete_clicclac_login(user_temp: UserClicClac) -> UserClicClac:
+    """Mot de passe vérifié : met l'utilisateur ClicClac en cache et le marque connecté"""
+    cache_key = f"user_hierarchy_{user_temp.id}"
+    cache.set(cache_key, user_temp, CACHE_TTL_SHORT)
+    setattr(user_temp, 'is_connected', True)
+    update_user(user_temp)
+    logger.info(f"Utilisateur {user_temp.username} authentifié avec succès dans ClicClac.")
+    return user_temp  # Retourner UserClicClac (rôle déjà défini dans le modèle)
+
+def authenticate_coswin_user(username: str, password: str) -> UserModel:
+    """Authentification dans la base principale (Coswin, Oracle) via UserModel"""
+    with get_main_session() as session:
+        db = SQLAlchemyQueryExecutor(session)
+        
+        # query = GET_USER_AUTHENTICATION_QUERY
+        # params = {'username': username, 'password': password}
+        # results = db.execute_query(query, params=params)
+        
+        # Pour les tests Utilisateur direct via SQLAlchemy (non recommandé en production)
+        if (password == "pass"):
+            query = "SELECT TOP 1 pk_coswin_user, cwcu_code, cwcu_signature, cwcu_email, cwcu_entity, cwcu_preferred_group, cwcu_url_image, cwcu_is_absent FROM coswin_user WHERE cwcu_signature = :username OR cwcu_email = :username"
+            results = db.execute_query(query, params={'username': username})
+        else:
+            results = []
+        
+        if results:
+            user_main = UserModel.from_db_row(results[0])
+            
+            # ✅ NOUVEAU: Vérifier si l'utilisateur a le rôle ADMIN dans Coswin
+            admin_query = "SELECT 1 FROM coswin_user WHERE cwcu_code = :code AND cwcu_preferred_group LIKE '%ADMIN%'"
+            admin_result = db.execute_query(admin_query, params={'code': user_main.code})
+            user_main.role = 'ADMIN' if admin_result else 'USER'  # Assigner le rôle
+            
+            cache_key = f"user_hierarchy_{user_main.code}"
+            cache.set(cache_key, user_main, CACHE_TTL_SHORT)
+            
+            logger.info(f"Utilisateur {username} authentifié avec succès dans Coswin (rôle: {user_main.role}).")
+            return user_main  # Retourner UserModel avec rôle
+        else:
+            # Vérifier si l'utilisateur existe sans mot de passe (pour différencier)
+            query_check_user = "SELECT 1 FROM coswin_user WHERE cwcu_signature = :username OR cwcu_email = :username"
+            user_exists = db.execute_query(query_check_user, params={'username': username})
+            if user_exists:
+                logger.warning(f"Échec de l'authentification pour {username} : Utilisateur existe, mot de passe faux")
+                raise InvalidPasswordError(username)
+            else:
+                logger.warning(f"Échec de l'authentification pour {username} : Utilisateur inexistant")
+                raise UserNotFoundError(username)
+
+async def authenticate_user(username: str, password: str) -> Union[UserModel, UserClicClac] | None:
     """
     Authentifie un utilisateur avec son nom d'utilisateur et mot de passe.
     Vérifie d'abord la base temporaire (ClicClac, MSSQL) via UserClicClac,
     puis la base principale (Coswin, Oracle) via UserModel si non trouvé.
+    
+    Les accès DB passent par le pool DB, la vérification bcrypt par le pool de
+    processus de password_service : ni la boucle ni un thread DB n'attendent le hachage.
+    
+    Raises:
+        TooManyAttemptsError: Trop de tentatives pour cet utilisateur (429)
+        PasswordServiceBusyError: Pool de hachage saturé (503)
     """
     if not username or not password:
         logger.warning("Login ou mot de passe manquant.")
         raise ValueError("Username et mot de passe requis")
     
+    await password_service.check_attempts(username)
+    
     try:
         # 1) Vérifier d'abord dans la base temporaire (ClicClac)
-        with get_temp_session() as session:
-            user_temp = session.query(UserClicClac).filter(
-                (UserClicClac.username == username) | (UserClicClac.email == username)
-            ).first()
-            
-            if user_temp:
-                try:
-                    if bcrypt.checkpw(password.encode('utf-8'), user_temp.password.encode('utf-8')):
-                        cache_key = f"user_hierarchy_{user_temp.id}"
-                        cache.set(cache_key, user_temp, CACHE_TTL_SHORT)
-                        logger.info(f"Utilisateur {username} authentifié avec succès dans ClicClac.")
-                        if isinstance(user_temp, UserClicClac):
-                            setattr(user_temp, 'is_connected', True)
-                            update_user(user_temp)  
-                        return user_temp  # Retourner UserClicClac (rôle déjà défini dans le modèle)
-                    else:
-                        logger.warning(f"Mot de passe incorrect pour {username} dans ClicClac.")
-                        raise InvalidPasswordError(username)
-                except Exception as verify_error:
-                    logger.error(f"Erreur lors de la vérification bcrypt: {verify_error}")
-                    raise InvalidPasswordError(username)
-            else:
-                # Utilisateur non trouvé dans ClicClac, vérifier Coswin
-                pass
+        user_temp = await run_db(find_clicclac_user, username)
         
-        # 2) Si non trouvé dans ClicClac ou mot de passe incorrect, vérifier dans Coswin (Oracle)
-        with get_main_session() as session:
-            db = SQLAlchemyQueryExecutor(session)
-            
-            # query = GET_USER_AUTHENTICATION_QUERY
-            # params = {'username': username, 'password': password}
-            # results = db.execute_query(query, params=params)
-            
-            # Pour les tests Utilisateur direct via SQLAlchemy (non recommandé en production)
-            if (password == "pass"):
-                query = "SELECT TOP 1 pk_coswin_user, cwcu_code, cwcu_signature, cwcu_email, cwcu_entity, cwcu_preferred_group, cwcu_url_image, cwcu_is_absent FROM coswin_user WHERE cwcu_signature = :username OR cwcu_email = :username"
-                results = db.execute_query(query, params={'username': username})
-            else:
-                results = []
-            
-            if results:
-                user_main = UserModel.from_db_row(results[0])
-                
-                # ✅ NOUVEAU: Vérifier si l'utilisateur a le rôle ADMIN dans Coswin
-                admin_query = "SELECT 1 FROM coswin_user WHERE cwcu_code = :code AND cwcu_preferred_group LIKE '%ADMIN%'"
-                admin_result = db.execute_query(admin_query, params={'code': user_main.code})
-                user_main.role = 'ADMIN' if admin_result else 'USER'  # Assigner le rôle
-                
-                cache_key = f"user_hierarchy_{user_main.code}"
-                cache.set(cache_key, user_main, CACHE_TTL_SHORT)
-                
-                logger.info(f"Utilisateur {username} authentifié avec succès dans Coswin (rôle: {user_main.role}).")
-                return user_main  # Retourner UserModel avec rôle
-            else:
-                # Vérifier si l'utilisateur existe sans mot de passe (pour différencier)
-                query_check_user = "SELECT 1 FROM coswin_user WHERE cwcu_signature = :username OR cwcu_email = :username"
-                user_exists = db.execute_query(query_check_user, params={'username': username})
-                if user_exists:
-                    logger.warning(f"Échec de l'authentification pour {username} : Utilisateur existe, mot de passe faux")
-                    raise InvalidPasswordError(username)
-                else:
-                    logger.warning(f"Échec de l'authentification pour {username} : Utilisateur inexistant")
-                    raise UserNotFoundError(username)
+        if user_temp:
+            if not await password_service.verify_password(password, str(user_temp.password)):
+                logger.warning(f"Mot de passe incorrect pour {username} dans ClicClac.")
+                raise InvalidPasswordError(username)
+            user = await run_db(complete_clicclac_login, user_temp)
+        else:
+            # 2) Utilisateur non trouvé dans ClicClac, vérifier dans Coswin (Oracle)
+            user = await run_db(authenticate_coswin_user, username, password)
                 
     except DatabaseError as e:
         logger.error(f"❌ Erreur base de données principale: {e}")
         raise DatabaseError("Erreur de base de données lors de l'authentification.")
+    except (AuthenticationError, DatabaseExecutorError, PasswordServiceError):
+        raise
     except Exception as e:
-        if isinstance(e, AuthenticationError):
-            raise
         logger.error(f"❌ Erreur inattendue: {e}")
         raise DatabaseError("Erreur inattendue lors de l'authentification.")
+    
+    await password_service.reset_attempts(username)
+    return user
 
 def logout_user(username: str) -> bool:
     """
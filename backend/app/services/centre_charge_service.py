@@ -8,13 +8,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def get_centre_charges(entity: str) -> Dict[str, Any]:
+def centre_charges_cache_key(entity: str) -> str:
+    """Clé de cache des centres de charge d'une entité."""
+    return f"mobile_centre_charges_{entity}"
+
+def get_centre_charges(entity: str, refresh: bool = False) -> Dict[str, Any]:
     """Récupère les centres de charge depuis la base de données."""
 
-    cache_key = f"mobile_centre_charges_{entity}"
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
+    cache_key = centre_charges_cache_key(entity)
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
     
     query = COSTCENTRE_QUERY
     params = {}
@@ -42,7 +47,7 @@ def get_centre_charges(entity: str) -> Dict[str, Any]:
                 "count": len(centre_charges),# Nombre total en DB
             }
             
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, etag=True)
             logger.info(f"✅ {len(centre_charges)} centres de charge récupérés")
             return response
             
@@ -1,21 +1,27 @@
+from app.db.sqlalchemy.executor import run_db
 from app.db.sqlalchemy.session import SQLAlchemyQueryExecutor, get_main_session
 from app.models.entity_model import EntityModel
 from app.core.config import CACHE_TTL_SHORT
 from app.db.requests import (ENTITY_QUERY, HIERARCHIC)
-from app.core.cache import cache
-from typing import Any, Dict
+from app.core.cache import async_cache, cache
+from app.services.hierarchy_index import hierarchy_index
+from typing import Any, Dict, Optional
 import logging
 
 logger = logging.getLogger(__name__)
 
-def get_entities(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
+def entities_cache_key(entity: str) -> str:
+    """Clé de cache des entités visibles depuis une entité."""
+    return f"mobile_entities_{entity}"
+
+def get_entities(entity: str, hierarchy_result: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
     """Récupère les entités depuis la base de données."""
     
-    # Inclure la limite dans la clé de cache
-    cache_key = f"mobile_entities_{entity}"
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
+    cache_key = entities_cache_key(entity)
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
     
     # Récupérer la hiérarchie de l'entité
     try:
@@ -66,7 +72,7 @@ def get_entities(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any
                 "count": len(entities)
             }
             
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, etag=True)
             logger.info(f"✅ {len(entities)} entités récupérées")
             return response
             
@@ -74,8 +80,32 @@ def get_entities(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any
         logger.error(f"❌ Erreur entités: {e}")
         raise
 
+def _hierarchy_from_index(entity_code: str) -> Optional[Dict[str, Any]]:
+    """Hiérarchie lue dans l'index en mémoire (None si l'entité n'y figure pas)."""
+    hierarchy = hierarchy_index.get_descendants(entity_code)
+    if hierarchy is None:
+        return None
+    
+    return {
+        "entity_code": entity_code,
+        "hierarchy": hierarchy,
+        "count": len(hierarchy),
+        "generated_by": "hierarchy_index"
+    }
+
 def get_hierarchy(entity_code: str) -> Dict[str, Any]:
-    """Utilise la fonction Oracle sn_hierarchie pour récupérer la hiérarchie."""
+    """
+    Récupère la hiérarchie (entité + sous-entités) depuis l'index en mémoire.
+    Repli sur la fonction SQL sn_hierarchie si l'index est indisponible ou ne connaît pas l'entité.
+    """
+    try:
+        hierarchy_index.ensure_fresh()
+        indexed = _hierarchy_from_index(entity_code)
+        if indexed is not None:
+            return indexed
+    except Exception as e:
+        logger.warning(f"⚠️ Index de hiérarchie indisponible, repli SQL: {e}")
+    
     cache_key = f"entity_hierarchy_oracle_{entity_code}"
     cached = cache.get_data_only(cache_key)
     if cached:
@@ -113,6 +143,23 @@ def get_hierarchy(entity_code: str) -> Dict[str, Any]:
         logger.error(f"❌ Erreur hiérarchie Oracle: {e}")
         raise
 
+async def get_hierarchy_async(entity_code: str) -> Dict[str, Any]:
+    """
+    Variante async de get_hierarchy : lecture directe de l'index tant qu'il est frais,
+    sinon vérification de version (ou repli SQL) dans le pool DB.
+    """
+    if hierarchy_index.is_fresh():
+        indexed = _hierarchy_from_index(entity_code)
+        if indexed is not None:
+            return indexed
+        
+        # Entité absente de l'index : résultat SQL éventuellement en cache
+        cached = await async_cache.get_data_only(f"entity_hierarchy_oracle_{entity_code}")
+        if cached:
+            return cached
+    
+    return await run_db(get_hierarchy, entity_code)
+
 def get_all_entities() -> Dict[str, Any]:
     """Récupère les entités depuis la base de données."""
     
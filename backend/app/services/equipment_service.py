@@ -1,38 +1,65 @@
+from app.db.sqlalchemy.executor import run_db
 from app.db.sqlalchemy.session import get_main_session, get_temp_session, SQLAlchemyQueryExecutor
-from app.core.config import CACHE_TTL_SHORT
-from app.db.requests import (ATTRIBUTE_VALUES_QUERY, EQUIPMENT_BY_ID_QUERY, EQUIPMENT_CLASSE_ATTRIBUTS_QUERY, EQUIPMENT_INFINITE_QUERY, FEEDER_QUERY)
-from app.core.cache import cache, invalidate_equipment_insertion_cache
+from app.core.config import ARCHIVE_CHUNK_SIZE, CACHE_STALE_TTL, CACHE_TTL_SHORT, DEFAULT_PAGE_SIZE, MAX_LIMIT, MAX_PAGE_SIZE, SQL_IN_CHUNK_SIZE
+from app.db.requests import (ARCHIVE_EQUIPMENTS_BATCH_QUERY, ATTRIBUTE_VALUES_QUERY, EQUIPMENT_BY_ID_QUERY, EQUIPMENT_ATTRIBUTES_BY_CODES_QUERY, EQUIPMENT_CLASSE_ATTRIBUTS_QUERY, EQUIPMENT_HEAD_PAGE_QUERY, EQUIPMENT_HEAD_QUERY, EQUIPMENT_MAX_PK_QUERY, FEEDER_QUERY)
+from app.core.cache import async_cache, cache, entity_tags, invalidate_equipment_insertion_cache, TAG_ATTRIBUTE_VALUES, TAG_FEEDERS
 from app.services.statistique_service import invalidate_statistics_cache
-from typing import Dict, Any, List, Optional
+from datetime import date
+import asyncio
+from sqlalchemy import and_, or_, text
+from typing import Callable, Dict, Any, List, Optional
+import base64
+import json
 import logging
 
 from app.models.attribute_model import AttributeClicClac, HistoryAttributeClicClac
 from app.models.attribute_values_model import AttributeValues
 from app.models.equipment_model import EquipmentClicClac, EquipmentModel, EquipmentWithAttributesBuilder, HistoryEquipmentClicClac
 from app.models.user_model import UserClicClac
+from app.schemas.rest_response import create_pagination_response
 from app.services.auth_service import get_user_connect
-from app.services.notification_service import send_notification
+from app.services.notification_service import dispatch_notification, publish_equipment_changes, send_notification
+from app.services.centre_charge_service import get_centre_charges
+from app.services.entity_service import get_entities, get_hierarchy_async
+from app.services.famille_service import get_familles
+from app.services.unite_service import get_unites
+from app.services.zone_service import get_zones
 
 logger = logging.getLogger(__name__)
 
 # === FONCTION PRINCIPALE POUR MOBILE ===
-def get_equipments_infinite(
-    entity: str,
-    zone: Optional[str] = None,
-    famille: Optional[str] = None,
-    search_term: Optional[str] = None
-) -> Dict[str, Any]:
-    """Infinite scroll optimisé pour mobile avec hiérarchie d'entité obligatoire"""
-    
+def _encode_cursor(position: Dict[str, Any]) -> str:
+    """Encode une position de pagination keyset en curseur opaque (base64 URL-safe)."""
+    raw = json.dumps(position, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+
+def _decode_cursor(cursor: str) -> Dict[str, Any]:
+    """Décode un curseur opaque. Lève ValueError si le curseur est invalide."""
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        position = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except Exception as e:
+        raise ValueError(f"Curseur invalide: {cursor}") from e
+    if not isinstance(position, dict):
+        raise ValueError(f"Curseur invalide: {cursor}")
+    return position
+
+
+def _list_watermark(head_rows: List[tuple]) -> str:
+    """
+    Watermark de départ de la synchronisation incrémentale, calculé sur les têtes
+    effectivement servies (colonne 13 : pk_equipment) : une insertion postérieure
+    au remplissage du cache a un pk supérieur et sera renvoyée par /changes.
+    """
+    max_pk = max((int(row[13]) for row in head_rows), default=0)
+    return _encode_cursor({'pk': max_pk, 'ts': date.today().isoformat()})
+
+
+def _resolve_hierarchy_entities(entity: str) -> List[str]:
+    """Retourne les entités de la hiérarchie (ou l'entité seule en cas d'échec)."""
     from app.services.entity_service import get_hierarchy
-    
-    cache_key = f"mobile_eq_{entity}_{zone}_{famille}_{search_term}"
 
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
-    
-    # Récupérer la hiérarchie de l'entité
     try:
         hierarchy_result = get_hierarchy(entity)
         hierarchy_entities = hierarchy_result.get('hierarchy', [])
@@ -46,40 +73,207 @@ def get_equipments_infinite(
     except Exception as e:
         logger.error(f"Erreur récupération hiérarchie pour {entity}: {e}")
         hierarchy_entities = [entity]
-    
-    # Query de base avec conditions
-    base_query = EQUIPMENT_INFINITE_QUERY
-    params = {}
+
+    return hierarchy_entities
+
+
+def _build_equipment_filters(
+    hierarchy_entities: List[str],
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None
+) -> tuple[str, Dict[str, Any]]:
+    """Construit les conditions SQL (alias e) et les paramètres communs aux requêtes équipements."""
+    params: Dict[str, Any] = {}
     
     # Filtre par hiérarchie d'entités
     placeholders = ','.join([f':entity_{i}' for i in range(len(hierarchy_entities))])
-    base_query += f" AND e.ereq_entity IN ({placeholders})"
+    conditions = f" AND e.ereq_entity IN ({placeholders})"
     
     for i, entity_code in enumerate(hierarchy_entities):
         params[f'entity_{i}'] = entity_code
     
     # Autres filtres
     if zone:
-        base_query += " AND e.ereq_zone = :zone"
+        conditions += " AND e.ereq_zone = :zone"
         params['zone'] = zone
     if famille:
-        base_query += " AND e.ereq_category = :famille" 
+        conditions += " AND e.ereq_category = :famille" 
         params['famille'] = famille
     if search_term:
-        base_query += " AND (LOWER(e.ereq_code) LIKE LOWER(:search) OR LOWER(e.ereq_description) LIKE LOWER(:search))"
+        conditions += " AND (LOWER(e.ereq_code) LIKE LOWER(:search) OR LOWER(e.ereq_description) LIKE LOWER(:search))"
         params['search'] = f"%{search_term}%"
+
+    return conditions, params
+
+
+def _equipment_list_cache_key(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None
+) -> str:
+    """Clé de cache de la liste mobile complète (partagée par les chemins sync et async)."""
+    return f"mobile_eq_{entity}_{zone}_{famille}_{search_term}"
+
+
+def _parse_page_position(cursor: Optional[str], limit: int) -> tuple[Optional[int], int]:
+    """
+    Décode le curseur keyset et borne la taille de page.
+    
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+    
+    last_pk = None
+    if cursor:
+        position = _decode_cursor(cursor)
+        try:
+            last_pk = int(position['pk'])
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Curseur invalide: {cursor}") from e
+    
+    return last_pk, limit
+
+
+def _split_page(
+    rows: List[Any],
+    limit: int,
+    position: Callable[[Any], Dict[str, Any]]
+) -> tuple[List[Any], bool, Optional[str]]:
+    """
+    Découpe les `limit + 1` lignes lues : une ligne en trop indique qu'il reste des
+    données, le curseur suivant encode la position de la dernière ligne gardée.
+    
+    Returns:
+        (lignes de la page, has_more, next_cursor)
+    """
+    has_more = len(rows) > limit
+    rows = rows[:limit]
+    next_cursor = _encode_cursor(position(rows[-1])) if has_more and rows else None
+    return rows, has_more, next_cursor
+
+
+def _equipment_page_cache_key(
+    entity: str,
+    zone: Optional[str],
+    famille: Optional[str],
+    search_term: Optional[str],
+    last_pk: Optional[int],
+    limit: int
+) -> str:
+    """Clé de cache d'une page keyset."""
+    return f"{_equipment_list_cache_key(entity, zone, famille, search_term)}_page_{last_pk}_{limit}"
+
+
+def equipment_list_cache_key(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None
+) -> str:
+    """
+    Clé de cache de la réponse de GET /mobile/equipments pour ces paramètres
+    (liste complète, ou page keyset si `cursor`/`limit` sont fournis).
+    
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    if limit is None and cursor is None:
+        return _equipment_list_cache_key(entity, zone, famille, search_term)
+    last_pk, page_limit = _parse_page_position(cursor, limit or DEFAULT_PAGE_SIZE)
+    return _equipment_page_cache_key(entity, zone, famille, search_term, last_pk, page_limit)
+
+
+def _load_attributes_by_codes(executor: SQLAlchemyQueryExecutor, codes: List[str]) -> List[tuple]:
+    """Charge les attributs d'un ensemble de codes équipements par lots IN (...)."""
+    unique_codes = list(dict.fromkeys(code for code in codes if code))
+    attribute_rows: List[tuple] = []
+    
+    for start in range(0, len(unique_codes), SQL_IN_CHUNK_SIZE):
+        chunk = unique_codes[start:start + SQL_IN_CHUNK_SIZE]
+        placeholders = ','.join([f':code_{i}' for i in range(len(chunk))])
+        query = EQUIPMENT_ATTRIBUTES_BY_CODES_QUERY.format(codes=placeholders)
+        params = {f'code_{i}': code for i, code in enumerate(chunk)}
+        attribute_rows.extend(executor.execute_query(query, params=params))
+    
+    return attribute_rows
+
+
+def _fetch_equipments_two_phase(
+    executor: SQLAlchemyQueryExecutor,
+    head_query: str,
+    params: Dict[str, Any]
+) -> tuple[List[EquipmentModel], List[tuple]]:
+    """
+    Moteur de chargement en deux phases :
+    1) têtes d'équipements (une ligne étroite par équipement),
+    2) attributs des seuls codes retournés, en lots.
+    
+    Returns:
+        (équipements construits, lignes de têtes brutes)
+    """
+    head_rows = executor.execute_query(head_query, params=params)
+    if not head_rows:
+        return [], []
+    
+    attribute_rows = _load_attributes_by_codes(executor, [str(row[2]) for row in head_rows if row[2] is not None])
+    equipments = EquipmentWithAttributesBuilder.build_from_heads_and_attributes(head_rows, attribute_rows)
+    return equipments, head_rows
+
+
+def _load_clicclac_attributes_by_codes(session: Any, codes: List[str]) -> Dict[str, List[AttributeClicClac]]:
+    """Charge les attributs ClicClac d'un ensemble de codes par lots IN (...), groupés par code."""
+    unique_codes = list(dict.fromkeys(str(code) for code in codes if code is not None))
+    attributes_by_code: Dict[str, List[AttributeClicClac]] = {}
+    
+    for start in range(0, len(unique_codes), SQL_IN_CHUNK_SIZE):
+        chunk = unique_codes[start:start + SQL_IN_CHUNK_SIZE]
+        for attr in session.query(AttributeClicClac).filter(AttributeClicClac.code.in_(chunk)).all():
+            attributes_by_code.setdefault(str(attr.code), []).append(attr)
+    
+    return attributes_by_code
+
+
+def get_equipments_infinite(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Infinite scroll optimisé pour mobile avec hiérarchie d'entité obligatoire.
+    
+    `refresh=True` ignore l'entrée en cache (recalcul d'une entrée périmée).
+    """
+    
+    cache_key = _equipment_list_cache_key(entity, zone, famille, search_term)
+
+    if not refresh:
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
+    
+    # Récupérer la hiérarchie de l'entité
+    hierarchy_entities = _resolve_hierarchy_entities(entity)
+    
+    # Query de base avec conditions
+    conditions, params = _build_equipment_filters(hierarchy_entities, zone, famille, search_term)
+    base_query = EQUIPMENT_HEAD_QUERY + conditions
     
     # ORDER BY avec les bonnes colonnes
     base_query += " ORDER BY e.pk_equipment DESC"
     
     try:
-        # ✅ CORRECTION: Utiliser SQLAlchemy session au lieu de l'ancienne DB
         with get_main_session() as session:
             executor = SQLAlchemyQueryExecutor(session)
-            results = executor.execute_query(base_query, params=params)
             
-            # ✅ CORRECTION: Utiliser le builder pour construire les équipements
-            equipments = EquipmentWithAttributesBuilder.build_from_query_results(results)
+            # Têtes d'équipements puis attributs en lots (pas de produit équipement × attributs)
+            equipments, head_rows = _fetch_equipments_two_phase(executor, base_query, params)
             
             # Convertir en format API
             equipments_api = [eq.to_dict() for eq in equipments]
@@ -87,6 +281,7 @@ def get_equipments_infinite(
             response = {
                 'equipments': equipments_api,
                 'count': len(equipments_api),
+                'watermark': _list_watermark(head_rows),
                 'entity_hierarchy': {
                     'requested_entity': entity,
                     'hierarchy_used': hierarchy_entities,
@@ -94,8 +289,11 @@ def get_equipments_infinite(
                 }
             }
             
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
-            logger.info(f"✅ SQLAlchemy méthode: {len(equipments_api)} équipements récupérés en une requête")
+            cache.set(
+                cache_key, response, CACHE_TTL_SHORT,
+                tags=entity_tags(hierarchy_entities), etag=True, stale_ttl=CACHE_STALE_TTL
+            )
+            logger.info(f"✅ Chargement deux phases: {len(equipments_api)} équipements récupérés")
             return response
             
     except Exception as e:
@@ -103,6 +301,315 @@ def get_equipments_infinite(
         raise
 
 
+def get_equipments_page(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE,
+    refresh: bool = False
+) -> Dict[str, Any]:
+    """
+    Pagination keyset (pk_equipment DESC) pour l'infinite scroll mobile.
+    
+    Le coût d'une page ne dépend pas de sa position : on sélectionne les `limit + 1`
+    têtes suivant le curseur, puis les attributs de ces seuls équipements.
+    
+    Args:
+        entity: Entité (hiérarchie automatique)
+        zone, famille, search_term: Filtres optionnels
+        cursor: Curseur opaque retourné par la page précédente (None pour la première page)
+        limit: Taille de page, bornée à MAX_PAGE_SIZE
+        refresh: Ignorer l'entrée en cache (recalcul d'une entrée périmée)
+        
+    Returns:
+        Dictionnaire compatible EquipmentListResponse avec next_cursor et has_more
+        
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    last_pk, limit = _parse_page_position(cursor, limit)
+    cache_key = _equipment_page_cache_key(entity, zone, famille, search_term, last_pk, limit)
+
+    if not refresh:
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
+
+    hierarchy_entities = _resolve_hierarchy_entities(entity)
+    conditions, params = _build_equipment_filters(hierarchy_entities, zone, famille, search_term)
+
+    # Têtes de la page (une ligne de plus pour savoir s'il reste des données)
+    page_query = EQUIPMENT_HEAD_PAGE_QUERY + conditions
+    page_params = dict(params, page_limit=limit + 1)
+    if last_pk is not None:
+        page_query += " AND e.pk_equipment < :last_pk"
+        page_params['last_pk'] = last_pk
+    page_query += " ORDER BY e.pk_equipment DESC"
+
+    try:
+        with get_main_session() as session:
+            executor = SQLAlchemyQueryExecutor(session)
+            head_rows = executor.execute_query(page_query, params=page_params)
+            
+            head_rows, has_more, next_cursor = _split_page(head_rows, limit, lambda row: {'pk': int(row[13])})
+            
+            # Attributs des seuls équipements de la page
+            attribute_rows = _load_attributes_by_codes(executor, [str(row[2]) for row in head_rows if row[2] is not None])
+            equipments = EquipmentWithAttributesBuilder.build_from_heads_and_attributes(head_rows, attribute_rows)
+            equipments_api = [eq.to_dict() for eq in equipments]
+            
+            response = {
+                'equipments': equipments_api,
+                'count': len(equipments_api),
+                'next_cursor': next_cursor,
+                'has_more': has_more,
+                'limit': limit,
+                'watermark': _list_watermark(head_rows) if last_pk is None else None,
+                'entity_hierarchy': {
+                    'requested_entity': entity,
+                    'hierarchy_used': hierarchy_entities,
+                    'hierarchy_count': len(hierarchy_entities)
+                }
+            }
+            
+            cache.set(
+                cache_key, response, CACHE_TTL_SHORT,
+                tags=entity_tags(hierarchy_entities), etag=True, stale_ttl=CACHE_STALE_TTL
+            )
+            logger.info(f"✅ Page keyset: {len(equipments_api)} équipements (has_more={has_more})")
+            return response
+            
+    except Exception as e:
+        logger.error(f"❌ Erreur pagination keyset pour {entity}: {e}")
+        raise
+
+
+async def get_equipments_infinite_async(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Variante async de get_equipments_infinite : lecture du cache sans bloquer la boucle,
+    requête dans le pool DB sur miss.
+    
+    À l'expiration, une seule requête est lancée pour tous les workers ; l'entrée
+    périmée reste servie pendant CACHE_STALE_TTL le temps du recalcul.
+    """
+    return await async_cache.get_or_refresh(
+        _equipment_list_cache_key(entity, zone, famille, search_term),
+        lambda: run_db(get_equipments_infinite, entity, zone, famille, search_term, refresh=True)
+    )
+
+
+async def get_equipments_page_async(
+    entity: str,
+    zone: Optional[str] = None,
+    famille: Optional[str] = None,
+    search_term: Optional[str] = None,
+    cursor: Optional[str] = None,
+    limit: int = DEFAULT_PAGE_SIZE
+) -> Dict[str, Any]:
+    """
+    Variante async de get_equipments_page : lecture du cache sans bloquer la boucle, requête dans le pool DB sur miss.
+    
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    last_pk, page_limit = _parse_page_position(cursor, limit)
+    return await async_cache.get_or_refresh(
+        _equipment_page_cache_key(entity, zone, famille, search_term, last_pk, page_limit),
+        lambda: run_db(get_equipments_page, entity, zone, famille, search_term, cursor, limit, refresh=True)
+    )
+
+
+# Version du format du bundle /values : l'incrémenter invalide tous les bundles en cache
+VALUES_BUNDLE_VERSION = 1
+
+
+def values_bundle_cache_key(entity: str) -> str:
+    """Clé de cache du bundle de valeurs de référence d'une entité."""
+    return f"mobile_values_v{VALUES_BUNDLE_VERSION}_{entity}"
+
+
+async def get_equipment_values_bundle(entity: str, refresh: bool = False) -> Optional[Dict[str, Any]]:
+    """
+    Valeurs de référence du formulaire mobile (entités, unités, zones, familles,
+    centres de charge, feeders) assemblées en un seul bundle par entité.
+    
+    - bundle en cache : une seule lecture Redis
+    - sinon : les six services tournent en parallèle dans le pool DB
+      (coût ≈ la requête la plus lente), puis le bundle est mis en cache
+      avec les tags de la hiérarchie (invalidé avec les listes de l'entité)
+    - `refresh=True` : bundle et listes recalculés sans lire le cache (préchauffage)
+    
+    Returns:
+        Le bundle, ou None si une des listes obligatoires est vide
+    """
+    cache_key = values_bundle_cache_key(entity)
+    if not refresh:
+        cached = await async_cache.get_data_only(cache_key)
+        if cached:
+            return cached
+    
+    hierarchy_result = await get_hierarchy_async(entity)
+    
+    (
+        cost_charges_result,
+        entities_result,
+        familles_result,
+        unites_result,
+        zones_result,
+        feeder_result
+    ) = await asyncio.gather(
+        run_db(get_centre_charges, entity, refresh=refresh),
+        run_db(get_entities, entity, hierarchy_result, refresh=refresh),
+        run_db(get_familles, entity, hierarchy_result, refresh=refresh),
+        run_db(get_unites, entity, hierarchy_result, refresh=refresh),
+        run_db(get_zones, entity, hierarchy_result, refresh=refresh),
+        run_db(get_feeders, entity, hierarchy_result, refresh=refresh)
+    )
+    
+    if not cost_charges_result or not entities_result or not familles_result or not unites_result or not zones_result:
+        return None
+    
+    bundle = {
+        "entities": entities_result.get('entities', []),
+        "unites": unites_result.get('unites', []),
+        "zones": zones_result.get('zones', []),
+        "familles": familles_result.get('familles', []),
+        "cost_charges": cost_charges_result.get('centre_charges', []),
+        "feeders": (feeder_result or {}).get('feeders', [])
+    }
+    
+    hierarchy_entities = hierarchy_result.get('hierarchy') or [entity]
+    await async_cache.set(cache_key, bundle, CACHE_TTL_SHORT, tags=entity_tags(hierarchy_entities) + [TAG_FEEDERS], etag=True)
+    return bundle
+
+
+def _parse_watermark(since: Optional[str]) -> tuple[Optional[int], Optional[date]]:
+    """
+    Décode le watermark de synchronisation (pk, ts).
+
+    Raises:
+        ValueError: Si le watermark est invalide
+    """
+    if not since:
+        return None, None
+    position = _decode_cursor(since)
+    try:
+        return int(position['pk']), date.fromisoformat(str(position['ts']))
+    except (KeyError, TypeError, ValueError) as e:
+        raise ValueError(f"Watermark invalide: {since}") from e
+
+
+def get_equipment_changes(entity: str, since: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Synchronisation incrémentale mobile : changements depuis le watermark `since`.
+    
+    Le watermark opaque contient :
+    - pk : plus grand pk_equipment déjà synchronisé (insertions de la DB principale)
+    - ts : date de la dernière synchronisation (changements ClicClac en attente et archivés)
+    
+    Les colonnes de date ClicClac étant au jour près, les changements du jour du
+    watermark sont renvoyés à nouveau : le client doit les appliquer de façon idempotente.
+    Sans `since`, aucun changement n'est renvoyé et `full_sync_required` vaut True :
+    le client charge la liste complète (ou sa première page) puis synchronise avec le
+    watermark de cette réponse, calculé sur les équipements servis (la liste peut
+    venir du cache : un MAX(pk) calculé ici perdrait les insertions intermédiaires).
+    
+    Raises:
+        ValueError: Si le watermark est invalide
+    """
+    since_pk, since_date = _parse_watermark(since)
+    if since_pk is None or since_date is None:
+        return {
+            'equipments': [],
+            'pending': [],
+            'archived': [],
+            'count': 0,
+            'watermark': None,
+            'has_more': False,
+            'full_sync_required': True
+        }
+
+    today = date.today()
+    hierarchy_entities = _resolve_hierarchy_entities(entity)
+
+    try:
+        # 1) Insertions de la DB principale (pk_equipment > watermark)
+        with get_main_session() as session:
+            executor = SQLAlchemyQueryExecutor(session)
+            max_pk = executor.execute_scalar(EQUIPMENT_MAX_PK_QUERY)
+            max_pk = int(max_pk) if max_pk is not None else 0
+
+            conditions, params = _build_equipment_filters(hierarchy_entities)
+            query = EQUIPMENT_HEAD_PAGE_QUERY + conditions
+            query += " AND e.pk_equipment > :since_pk AND e.pk_equipment <= :max_pk ORDER BY e.pk_equipment ASC"
+            params.update(page_limit=MAX_LIMIT + 1, since_pk=since_pk, max_pk=max_pk)
+
+            head_rows = executor.execute_query(query, params=params)
+            has_more = len(head_rows) > MAX_LIMIT
+            head_rows = head_rows[:MAX_LIMIT]
+
+            attribute_rows = _load_attributes_by_codes(executor, [str(row[2]) for row in head_rows if row[2] is not None])
+            new_equipments = EquipmentWithAttributesBuilder.build_from_heads_and_attributes(head_rows, attribute_rows)
+            equipments_api = [eq.to_dict() for eq in new_equipments]
+
+            # Lot partiel : reprendre au dernier pk renvoyé, sans avancer la date ClicClac
+            next_pk = int(head_rows[-1][13]) if has_more else max_pk
+            next_ts = since_date if has_more else today
+
+        # 2) Changements ClicClac : équipements en attente et historiques depuis la date du watermark
+        with get_temp_session() as session:
+            pending_equipments = session.query(EquipmentClicClac).filter(
+                EquipmentClicClac.entity.in_(hierarchy_entities),
+                EquipmentClicClac.updated_at >= since_date
+            ).order_by(EquipmentClicClac.id).all()
+
+            pending_attributes = _load_clicclac_attributes_by_codes(session, [eq.code for eq in pending_equipments])
+
+            pending_api = []
+            for eq in pending_equipments:
+                setattr(eq, 'attributes', pending_attributes.get(str(eq.code), []))
+                pending_api.append(eq.to_dict_SDDV())
+
+            archived_equipments = session.query(HistoryEquipmentClicClac).filter(
+                HistoryEquipmentClicClac.entity.in_(hierarchy_entities),
+                HistoryEquipmentClicClac.date_history_created_at >= since_date
+            ).order_by(HistoryEquipmentClicClac.id).all()
+
+            archived_attributes = _load_history_attributes_by_ids(session, [int(hist.id) for hist in archived_equipments])  # type: ignore
+
+            archived_api = []
+            for hist in archived_equipments:
+                hist_dict = hist.to_dict()
+                hist_dict['attributes'] = [attr.to_dict() for attr in archived_attributes.get(int(hist.id), [])]  # type: ignore
+                archived_api.append(hist_dict)
+
+        response = {
+            'equipments': equipments_api,
+            'pending': pending_api,
+            'archived': archived_api,
+            'count': len(equipments_api) + len(pending_api) + len(archived_api),
+            'watermark': _encode_cursor({'pk': next_pk, 'ts': next_ts.isoformat()}),
+            'has_more': has_more,
+            'full_sync_required': False
+        }
+        logger.info(
+            f"✅ Sync incrémentale {entity}: {len(equipments_api)} nouveaux, "
+            f"{len(pending_api)} en attente, {len(archived_api)} archivés"
+        )
+        return response
+
+    except Exception as e:
+        logger.error(f"❌ Erreur synchronisation incrémentale pour {entity}: {e}")
+        raise
+
+
 def get_attribute_values(specification: str, attribute_index: str) -> List[AttributeValues]:
     """Récupère les valeurs des attributs pour un équipement donné."""
     if not specification or not attribute_index:
@@ -128,7 +635,7 @@ def get_attribute_values(specification: str, attribute_index: str) -> List[Attri
             })
 
             if not results:
-                cache.set(cache_key, [], CACHE_TTL_SHORT)
+                cache.set(cache_key, [], CACHE_TTL_SHORT, tags=[TAG_ATTRIBUTE_VALUES])
                 return []
 
             # ✅ CORRECTION: Créer les objets AttributeValues
@@ -143,7 +650,7 @@ def get_attribute_values(specification: str, attribute_index: str) -> List[Attri
             
             # Sérialiser pour le cache
             attributes_serialized = [attr.to_dict() for attr in attributes]
-            cache.set(cache_key, attributes_serialized, CACHE_TTL_SHORT)
+            cache.set(cache_key, attributes_serialized, CACHE_TTL_SHORT, tags=[TAG_ATTRIBUTE_VALUES])
             
             return attributes
 
@@ -152,13 +659,14 @@ def get_attribute_values(specification: str, attribute_index: str) -> List[Attri
         return []
 
 
-def get_feeders(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
+def get_feeders(entity: str, hierarchy_result: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
     """Récupère la liste des feeders."""
     
     cache_key = f"feeders_list_{entity}"
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
     
     # Récupérer la hiérarchie de l'entité
     try:
@@ -212,7 +720,7 @@ def get_feeders(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]
                     continue
 
             response = {"feeders": feeders, "count": len(feeders)}
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, tags=[TAG_FEEDERS])
             return response
             
     except Exception as e:
@@ -337,13 +845,12 @@ def update_equipment_mobile(equipment_id: str, updates: Dict[str, Any]) -> tuple
                 invalidate_statistics_cache()  # ✅ AJOUT : Invalider le cache des statistiques
                 
                 # ✅ AJOUT : Envoyer notification à l'admin
-                import asyncio
                 # Vérifier le role de l'utilisateur
                 user = get_user_connect(str(new_equipment.created_by))
                 
                 if user and isinstance(user, UserClicClac):
                     supervisor_id = str(user.supervisor) or "admin"
-                    asyncio.create_task(send_notification(
+                    dispatch_notification(send_notification(
                         user_id=supervisor_id,  # ID du superviseur ou admin par défaut
                         title="Équipement mis à jour",
                         message=f"L'équipement {updates['code']} a été mis à jour.",
@@ -353,7 +860,7 @@ def update_equipment_mobile(equipment_id: str, updates: Dict[str, Any]) -> tuple
                     user_id = str(user.id) if user else "unknown"
                     user_name = str(new_equipment.created_by) if new_equipment else "inconnu"
                     # ✅ CORRECTION : Passer sender_id pour exclure l'émetteur
-                    asyncio.create_task(send_notification(
+                    dispatch_notification(send_notification(
                         user_id="all",
                         title="Équipement mis à jour",
                         message=f"L'équipement {updates['code']} a été mis à jour par {user_name} utilisateur de GMAO.",
@@ -368,6 +875,12 @@ def update_equipment_mobile(equipment_id: str, updates: Dict[str, Any]) -> tuple
                     str(updates.get('entity', '')), 
                     str(updates.get('famille', ''))
                 )
+                dispatch_notification(publish_equipment_changes("updated", [{
+                    'code': updates['code'],
+                    'entity': updates.get('entity'),
+                    'zone': updates.get('zone'),
+                    'famille': updates.get('famille')
+                }]))
                 
                 return (True, equipment_id_new)
 
@@ -400,6 +913,9 @@ def update_equipment_web(equipment_id: str, updates: Dict[str, Any]) -> tuple[bo
                 logger.error(f"Équipement avec ID {equipment_id} introuvable dans ClicClac")
                 return (False, "Équipement introuvable")
 
+            # Sujets de l'équipement avant modification (entité, zone ou famille peuvent changer)
+            previous = {field: getattr(existing_equipment, field) for field in ('code', 'entity', 'zone', 'famille')}
+
             # 2) Mapper les clés camelCase vers snake_case pour correspondre au modèle
             field_mapping = {
                 'centreCharge': 'centre_charge',
@@ -475,14 +991,17 @@ def update_equipment_web(equipment_id: str, updates: Dict[str, Any]) -> tuple[bo
                     str(existing_equipment.famille)
                 )
                 invalidate_statistics_cache()  # ✅ AJOUT : Invalider le cache des statistiques
+                dispatch_notification(publish_equipment_changes("updated", [
+                    previous,
+                    {field: getattr(existing_equipment, field) for field in ('code', 'entity', 'zone', 'famille')}
+                ]))
                 
                 # ✅ AJOUT : Envoyer notification à l'admin
-                import asyncio
                 
                 # Vérifier le role de l'utilisateur
                 user = get_user_connect(str(existing_equipment.created_by))
                 user_id = str(user.id) if user else "unknown"
-                asyncio.create_task(send_notification(
+                dispatch_notification(send_notification(
                     user_id=user_id,  # ID du prestataire
                     title="Équipement modifié",
                     message=f"L'équipement {existing_equipment.code} a été modifié (champs: {', '.join(updated_fields)}).\nInspecté(e) par {str(existing_equipment.created_by)}.",
@@ -647,15 +1166,20 @@ def insert_equipment(equipment: EquipmentClicClac) -> tuple[bool, Optional[int]]
                     str(equipment.entity), 
                     str(equipment.famille)
                 )
+                dispatch_notification(publish_equipment_changes("created", [{
+                    'code': equipment.code,
+                    'entity': equipment.entity,
+                    'zone': equipment.zone,
+                    'famille': equipment.famille
+                }]))
                 
                 # ✅ AJOUT : Envoyer notification à l'admin
-                import asyncio
                 # Vérifier le role de l'utilisateur
                 user = get_user_connect(str(equipment.created_by))
                 
                 if user and isinstance(user, UserClicClac):
                     supervisor_id = str(user.supervisor) or "admin"
-                    asyncio.create_task(send_notification(
+                    dispatch_notification(send_notification(
                         user_id=supervisor_id,  # ID du superviseur ou admin par défaut
                         title="Nouvel équipement créé",
                         message=f"L'équipement {equipment.code} ({equipment.famille}) a été créé par le prestataire {equipment.created_by or 'utilisateur inconnu'}.",
@@ -664,7 +1188,7 @@ def insert_equipment(equipment: EquipmentClicClac) -> tuple[bool, Optional[int]]
                 else:
                     user_id = str(user.id) if user else "unknown"
                     # ✅ CORRECTION : Passer sender_id pour exclure l'émetteur
-                    asyncio.create_task(send_notification(
+                    dispatch_notification(send_notification(
                         user_id="all",
                         title="Nouvel équipement créé",
                         message=f"L'équipement {equipment.code} ({equipment.famille}) a été créé par l'utilisateur GMAO {equipment.created_by or 'utilisateur inconnu'}.",
@@ -685,249 +1209,394 @@ def insert_equipment(equipment: EquipmentClicClac) -> tuple[bool, Optional[int]]
         return (False, None)
 
 
-def get_all_equipment_web() -> Dict[str, Any]:
-    """Récupère tous les équipements pour l'interface web (non paginé)"""
+# Colonnes autorisées pour le tri de la grille web (liste blanche)
+WEB_EQUIPMENT_SORT_COLUMNS = {
+    'id': EquipmentClicClac.id,
+    'code': EquipmentClicClac.code,
+    'famille': EquipmentClicClac.famille,
+    'zone': EquipmentClicClac.zone,
+    'entity': EquipmentClicClac.entity,
+    'created_at': EquipmentClicClac.created_at,
+    'updated_at': EquipmentClicClac.updated_at,
+    'created_by': EquipmentClicClac.created_by,
+}
+
+# Filtres de statut de validation
+WEB_EQUIPMENT_STATUS_FILTERS = {
+    'new': EquipmentClicClac.is_new == True,
+    'updated': EquipmentClicClac.is_update == True,
+    'approved': EquipmentClicClac.is_approved == True,
+    'rejected': EquipmentClicClac.is_rejected == True,
+    'pending': and_(EquipmentClicClac.is_approved == False, EquipmentClicClac.is_rejected == False),
+}
+
+
+def get_all_equipment_web(
+    page: Optional[int] = None,
+    page_size: Optional[int] = None,
+    sort_by: str = 'id',
+    sort_order: str = 'desc',
+    entity: Optional[str] = None,
+    famille: Optional[str] = None,
+    zone: Optional[str] = None,
+    status: Optional[str] = None,
+    search: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Récupère les équipements ClicClac pour l'interface web, avec leurs attributs.
+    
+    Nombre de requêtes constant : un COUNT (mode paginé), une requête équipements,
+    puis les attributs de la page en lots IN (...).
+    Sans `page_size`, toute la liste filtrée est retournée (compatibilité).
+    
+    Raises:
+        ValueError: Si le tri ou le statut demandé est inconnu
+    """
+    sort_column = WEB_EQUIPMENT_SORT_COLUMNS.get(sort_by)
+    if sort_column is None:
+        raise ValueError(f"Tri non supporté: {sort_by} (valeurs: {', '.join(WEB_EQUIPMENT_SORT_COLUMNS)})")
+    if sort_order not in ('asc', 'desc'):
+        raise ValueError(f"Ordre de tri invalide: {sort_order} (asc ou desc)")
+    if status and status not in WEB_EQUIPMENT_STATUS_FILTERS:
+        raise ValueError(f"Statut non supporté: {status} (valeurs: {', '.join(WEB_EQUIPMENT_STATUS_FILTERS)})")
+    
     try:
-        # Utiliser SQLAlchemy session
         with get_temp_session() as session:
-            equipments = session.query(EquipmentClicClac).all()
+            query = session.query(EquipmentClicClac)
+            
+            if entity:
+                query = query.filter(EquipmentClicClac.entity == entity)
+            if famille:
+                query = query.filter(EquipmentClicClac.famille == famille)
+            if zone:
+                query = query.filter(EquipmentClicClac.zone == zone)
+            if status:
+                query = query.filter(WEB_EQUIPMENT_STATUS_FILTERS[status])
+            if search:
+                pattern = f"%{search}%"
+                query = query.filter(or_(
+                    EquipmentClicClac.code.ilike(pattern),
+                    EquipmentClicClac.description.ilike(pattern),
+                    EquipmentClicClac.created_by.ilike(pattern)
+                ))
+            
+            total_count = query.count() if page_size else None
+            
+            # Tri stable : id en second critère
+            order = sort_column.asc() if sort_order == 'asc' else sort_column.desc()
+            tie_breaker = EquipmentClicClac.id.asc() if sort_order == 'asc' else EquipmentClicClac.id.desc()
+            query = query.order_by(order, tie_breaker)
+            
+            if page_size:
+                page = max(page or 1, 1)
+                query = query.offset((page - 1) * page_size).limit(page_size)
+            
+            equipments = query.all()
+            
+            # Attributs de la page en une requête par lot (plus de N+1)
+            attributes_by_code = _load_clicclac_attributes_by_codes(session, [r.code for r in equipments])
             
             equipments_formatted = []
             for r in equipments:
-                attr = session.query(AttributeClicClac).filter_by(code=r.code).all()
-                setattr(r, 'attributes', attr)
+                setattr(r, 'attributes', attributes_by_code.get(str(r.code), []))
                 equipments_formatted.append(r.to_dict_SDDV())
-
-            return {"equipments": equipments_formatted, "count": len(equipments_formatted)}
+            
+            result: Dict[str, Any] = {"equipments": equipments_formatted, "count": len(equipments_formatted)}
+            
+            if page_size and page is not None and total_count is not None:
+                total_pages = (total_count + page_size - 1) // page_size
+                result["pagination"] = create_pagination_response({
+                    "data": equipments_formatted,
+                    "page": page,
+                    "page_size": page_size,
+                    "total_count": total_count,
+                    "total_pages": total_pages,
+                    "has_next": page < total_pages,
+                    "has_prev": page > 1
+                })["pagination"]
+            
+            return result
 
     except Exception as e:
         logger.error(f"❌ Erreur récupération tous équipements web: {e}")
         return {"equipments": [], "count": 0}
 
 
-def archive_equipments(equipment_ids: List[str]) -> tuple[bool, str, int, List[str]]:
+def archive_equipments(equipment_ids: List[str]) -> tuple[bool, str, int, List[str], List[Dict[str, Any]]]:
     """
     Archive les équipements spécifiés de la DB temporaire MSSQL (ClicClac) vers l'historique.
-    Pour chaque équipement :
-    - Récupère l'équipement et ses attributs.
-    - Insère dans HistoryEquipmentClicClac et HistoryAttributeClicClac.
-    - Supprime de EquipmentClicClac et AttributeClicClac.
-    Retourne : (success, message, archived_count, failed_ids)
+    
+    Traitement ensembliste par lots de ARCHIVE_CHUNK_SIZE IDs, une transaction par lot :
+    - INSERT ... SELECT vers history_equipment (OUTPUT des nouveaux IDs),
+    - INSERT ... SELECT des attributs vers history_attribute,
+    - DELETE des attributs puis des équipements originaux.
+    Un lot en échec est annulé en entier sans bloquer les suivants.
+    Le cache des statistiques est invalidé une seule fois en fin de traitement.
+    
+    Retourne : (success, message, archived_count, failed_ids, chunk_reports)
     """
-    logger.info(f"🔧 Archivage équipements ClicClac MSSQL IDs: {equipment_ids}")
+    logger.info(f"🔧 Archivage ensembliste de {len(equipment_ids)} équipements ClicClac")
 
     archived_count = 0
-    failed_ids = []
+    failed_ids: List[str] = []
+    chunk_reports: List[Dict[str, Any]] = []
+    archived_equipments: List[Dict[str, Any]] = []  # pour les événements de changement
+
+    # IDs numériques uniques (les IDs invalides échouent sans requête)
+    valid_ids: Dict[int, str] = {}
+    for equipment_id in equipment_ids:
+        try:
+            valid_ids.setdefault(int(equipment_id), str(equipment_id))
+        except (TypeError, ValueError):
+            logger.warning(f"ID d'équipement invalide ignoré: {equipment_id}")
+            failed_ids.append(str(equipment_id))
+
+    ids = list(valid_ids)
+    chunk_size = max(1, min(ARCHIVE_CHUNK_SIZE, SQL_IN_CHUNK_SIZE))
 
     try:
         with get_temp_session() as session:
-            for equipment_id in equipment_ids:
+            for chunk_index, start in enumerate(range(0, len(ids), chunk_size)):
+                chunk = ids[start:start + chunk_size]
+                placeholders = ','.join([f':id_{i}' for i in range(len(chunk))])
+                params = {f'id_{i}': equipment_id for i, equipment_id in enumerate(chunk)}
+                
                 try:
-                    # 1) Récupérer l'équipement existant
-                    equipment = session.query(EquipmentClicClac).filter(EquipmentClicClac.id == equipment_id).first()
-                    
-                    if not equipment:
-                        logger.warning(f"Équipement ID {equipment_id} introuvable, ignoré")
-                        failed_ids.append(equipment_id)
-                        continue
-                    
-                    # 2) Récupérer les attributs associés (peut être vide)
-                    attributes = session.query(AttributeClicClac).filter(AttributeClicClac.code == equipment.code).all()
-                    
-                    # 3) Créer l'entrée historique pour l'équipement
-                    history_equipment = HistoryEquipmentClicClac(
-                        commentaire=equipment.commentaire,
-                        equipment_id=equipment.id,  # ✅ Plus de contrainte FK, juste une référence
-                        code_parent=equipment.code_parent,
-                        code=equipment.code,
-                        famille=equipment.famille,
-                        zone=equipment.zone,
-                        entity=equipment.entity,
-                        unite=equipment.unite,
-                        centre_charge=equipment.centre_charge,
-                        description=equipment.description,
-                        longitude=equipment.longitude,
-                        latitude=equipment.latitude,
-                        feeder=equipment.feeder,
-                        feeder_description=equipment.feeder_description,
-                        info=equipment.info,
-                        etat=equipment.etat,
-                        type=equipment.type,
-                        localisation=equipment.localisation,
-                        niveau=equipment.niveau,
-                        n_serie=equipment.n_serie,
-                        created_at=equipment.created_at,
-                        updated_at=equipment.updated_at,
-                        created_by=equipment.created_by,
-                        judged_by=equipment.judged_by,
-                        is_update=equipment.is_update,
-                        is_new=equipment.is_new,
-                        is_approved=equipment.is_approved,
-                        is_rejected=equipment.is_rejected,
-                        is_deleted=equipment.is_deleted
+                    result = session.execute(text(ARCHIVE_EQUIPMENTS_BATCH_QUERY.format(ids=placeholders)), params)
+                    rows = result.fetchall()
+                    archived_ids = {int(row[0]) for row in rows}
+                    session.commit()
+                    archived_equipments.extend(
+                        {'code': row[1], 'entity': row[2], 'zone': row[3], 'famille': row[4]} for row in rows
                     )
                     
-                    session.add(history_equipment)
-                    session.flush()  # Pour obtenir l'ID de l'historique
-                    
-                    logger.info(f"✅ Équipement historique créé avec ID: {history_equipment.id}")
-                    
-                    # 4) Créer les entrées historiques pour les attributs (si présents)
-                    for attr in attributes:
-                        history_attribute = HistoryAttributeClicClac(
-                            history_id=history_equipment.id,
-                            specification=attr.specification,
-                            famille=attr.famille,
-                            indx=attr.indx,
-                            attribute_name=attr.attribute_name,
-                            value=attr.value,
-                            code=attr.code,
-                            description=attr.description,
-                            created_at=attr.created_at,
-                            updated_at=attr.updated_at,
-                            is_copy_ot=attr.is_copy_ot
-                        )
-                        session.add(history_attribute)
-                        logger.debug(f"Attribut historique créé: {attr.attribute_name}")
-                    
-                    # 5) Supprimer les attributs originaux
-                    session.query(AttributeClicClac).filter(AttributeClicClac.code == equipment.code).delete(synchronize_session='fetch')
-                    logger.debug(f"Attributs originaux supprimés pour {equipment.code}")
-                    
-                    # 6) Supprimer l'équipement original
-                    session.delete(equipment)
-                    logger.debug(f"Équipement original {equipment.code} supprimé")
+                    missing = [valid_ids[equipment_id] for equipment_id in chunk if equipment_id not in archived_ids]
+                    if missing:
+                        logger.warning(f"Lot {chunk_index}: {len(missing)} équipements introuvables: {missing}")
                     
-                    # 7) Commit final pour cet équipement (persistance atomique)
-                    session.commit()
-                    invalidate_statistics_cache()  # ✅ AJOUT
-                    
-                    archived_count += 1
-                    logger.info(f"✅ Équipement {equipment_id} ({equipment.code}) archivé avec {len(attributes)} attributs")
+                    failed_ids.extend(missing)
+                    archived_count += len(archived_ids)
+                    chunk_reports.append({
+                        'chunk': chunk_index,
+                        'requested': len(chunk),
+                        'archived': len(archived_ids),
+                        'failed_ids': missing,
+                        'error': None
+                    })
+                    logger.info(f"✅ Lot {chunk_index}: {len(archived_ids)}/{len(chunk)} équipements archivés")
                     
                 except Exception as e:
-                    logger.error(f"❌ Erreur archivage équipement {equipment_id}: {e}", exc_info=True)
+                    logger.error(f"❌ Erreur archivage lot {chunk_index}: {e}", exc_info=True)
                     session.rollback()
-                    failed_ids.append(equipment_id)
+                    chunk_failed = [valid_ids[equipment_id] for equipment_id in chunk]
+                    failed_ids.extend(chunk_failed)
+                    chunk_reports.append({
+                        'chunk': chunk_index,
+                        'requested': len(chunk),
+                        'archived': 0,
+                        'failed_ids': chunk_failed,
+                        'error': str(e)
+                    })
                     continue
             
             message = f"{archived_count} équipements archivés avec succès"
             if failed_ids:
                 message += f", {len(failed_ids)} échecs (IDs: {failed_ids})"
             
-            return (True, message, archived_count, failed_ids)
+            return (True, message, archived_count, failed_ids, chunk_reports)
     
     except Exception as e:
         logger.error(f"❌ Erreur globale archivage équipements: {e}", exc_info=True)
-        return (False, f"Erreur interne: {str(e)}", archived_count, failed_ids)
+        return (False, f"Erreur interne: {str(e)}", archived_count, failed_ids, chunk_reports)
     
+    finally:
+        if archived_count:
+            invalidate_statistics_cache()
+            dispatch_notification(publish_equipment_changes("archived", archived_equipments))
+
+
+def _load_history_attributes_by_ids(session: Any, history_ids: List[int]) -> Dict[int, List[HistoryAttributeClicClac]]:
+    """Charge les attributs historisés d'un ensemble d'historiques par lots IN (...), groupés par history_id."""
+    unique_ids = list(dict.fromkeys(history_ids))
+    attributes_by_history: Dict[int, List[HistoryAttributeClicClac]] = {}
+
+    for start in range(0, len(unique_ids), SQL_IN_CHUNK_SIZE):
+        chunk = unique_ids[start:start + SQL_IN_CHUNK_SIZE]
+        for attr in session.query(HistoryAttributeClicClac).filter(HistoryAttributeClicClac.history_id.in_(chunk)).all():
+            attributes_by_history.setdefault(int(attr.history_id), []).append(attr)  # type: ignore
+
+    return attributes_by_history
+
+
+def _parse_history_position(cursor: Optional[str], limit: Optional[int]) -> tuple[Optional[tuple[date, int]], Optional[int]]:
+    """
+    Décode le curseur keyset (date_history_created_at, id) des historiques.
+    Sans curseur ni limite, aucune pagination n'est appliquée (limite None).
 
-def get_all_equipment_histories() -> List[Dict[str, Any]]:
+    Raises:
+        ValueError: Si le curseur est invalide
     """
-    Récupère tous les historiques d'équipements, y compris leurs attributs.
-    Retourne une liste de dictionnaires avec chaque historique et ses attributs associés.
+    position = None
+    if cursor:
+        raw = _decode_cursor(cursor)
+        try:
+            position = (date.fromisoformat(str(raw['d'])), int(raw['id']))
+        except (KeyError, TypeError, ValueError) as e:
+            raise ValueError(f"Curseur invalide: {cursor}") from e
+
+    if limit is None and position is None:
+        return None, None
+
+    return position, max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+
+
+def _load_history_page(
+    session: Any,
+    position: Optional[tuple[date, int]],
+    limit: Optional[int],
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    entity: Optional[str] = None,
+    created_by: Optional[str] = None
+) -> tuple[List[Dict[str, Any]], Optional[str], bool]:
     """
-    logger.info("🔍 Récupération de tous les historiques d'équipements")
+    Charge une page d'historiques (date_history_created_at DESC, id DESC) et leurs attributs.
+
+    Deux requêtes par page quelle que soit la taille de l'archive :
+    les historiques (keyset), puis leurs attributs par history_id.
+
+    Returns:
+        (historiques sérialisés avec attributs, curseur suivant, has_more)
+    """
+    history_date = HistoryEquipmentClicClac.date_history_created_at
+    query = session.query(HistoryEquipmentClicClac)
+
+    if created_by:
+        query = query.filter(HistoryEquipmentClicClac.created_by == created_by)
+    if entity:
+        query = query.filter(HistoryEquipmentClicClac.entity == entity)
+    if date_from:
+        query = query.filter(history_date >= date_from)
+    if date_to:
+        query = query.filter(history_date <= date_to)
+    if position:
+        last_date, last_id = position
+        query = query.filter(or_(
+            history_date < last_date,
+            and_(history_date == last_date, HistoryEquipmentClicClac.id < last_id)
+        ))
+
+    query = query.order_by(history_date.desc(), HistoryEquipmentClicClac.id.desc())
+
+    if limit:
+        rows, has_more, next_cursor = _split_page(
+            query.limit(limit + 1).all(), limit,
+            lambda row: {'d': row.date_history_created_at.isoformat(), 'id': int(row.id)}
+        )
+    else:
+        rows, has_more, next_cursor = query.all(), False, None
+
+    attributes_by_history = _load_history_attributes_by_ids(session, [int(row.id) for row in rows])  # type: ignore
+
+    histories = []
+    for row in rows:
+        hist_dict = row.to_dict()
+        hist_dict['attributes'] = [attr.to_dict() for attr in attributes_by_history.get(int(row.id), [])]  # type: ignore
+        histories.append(hist_dict)
+
+    return histories, next_cursor, has_more
+
+
+def get_all_equipment_histories(
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    entity: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Récupère les historiques d'équipements, y compris leurs attributs.
+
+    Avec `cursor` et/ou `limit` : pagination keyset sur (date d'archivage, id) DESC.
+    Sans : toute l'archive filtrée (compatibilité), toujours en deux requêtes.
+
+    Returns:
+        {'histories': [...], 'next_cursor': str | None, 'has_more': bool}
+
+    Raises:
+        ValueError: Si le curseur est invalide
+    """
+    position, page_limit = _parse_history_position(cursor, limit)
+    logger.info(f"🔍 Récupération des historiques d'équipements (limite: {page_limit})")
 
     try:
         with get_temp_session() as session:
-            # 1) Récupérer tous les historiques d'équipement
-            history_equipments = session.query(HistoryEquipmentClicClac).order_by(
-                HistoryEquipmentClicClac.date_history_created_at.desc()
-            ).all()
-            
-            if not history_equipments:
-                logger.info("Aucun historique trouvé")
-                return []
-            
-            history_list = []
-            
-            # 2) Pour chaque historique d'équipement, récupérer ses attributs
-            for hist_eq in history_equipments:
-                # Récupérer les attributs associés
-                attributes = session.query(HistoryAttributeClicClac).filter(
-                    HistoryAttributeClicClac.history_id == hist_eq.id
-                ).all()
-                
-                # Convertir en dict
-                hist_dict = hist_eq.to_dict()
-                
-                hist_dict['attributes'] = [attr.to_dict() for attr in attributes]
-                
-                history_list.append(hist_dict)
-                logger.debug(f"Historique {hist_eq.id} récupéré avec {len(attributes)} attributs")
-            
-            logger.info(f"✅ {len(history_list)} historiques récupérés")
-            return history_list
-    
+            histories, next_cursor, has_more = _load_history_page(
+                session, position, page_limit,
+                date_from=date_from, date_to=date_to, entity=entity
+            )
+
+            logger.info(f"✅ {len(histories)} historiques récupérés")
+            return {'histories': histories, 'next_cursor': next_cursor, 'has_more': has_more}
+
     except Exception as e:
         logger.error(f"❌ Erreur récupération tous les historiques: {e}")
-        return []
-
-def get_all_equipment_histories_prestataire(username: str) -> List[Dict[str, Any]]:
+        return {'histories': [], 'next_cursor': None, 'has_more': False}
+
+def get_all_equipment_histories_prestataire(
+    username: str,
+    cursor: Optional[str] = None,
+    limit: Optional[int] = None,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    entity: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Récupère tous les historiques d'équipements pour un prestataire spécifique, y compris leurs attributs.
-    Retourne une liste de dictionnaires avec chaque historique et ses attributs associés.
+    Récupère les historiques d'équipements d'un prestataire, y compris leurs attributs.
+
+    Les équipements encore en cours (status 'in_progress') sont ajoutés sur la
+    première page uniquement ; les pages suivantes ne contiennent que l'archive.
+
+    Returns:
+        {'histories': [...], 'next_cursor': str | None, 'has_more': bool}
+
+    Raises:
+        ValueError: Si le curseur est invalide
     """
-    logger.info(f"🔍 Récupération de tous les historiques d'équipements pour le prestataire: {username}")
+    position, page_limit = _parse_history_position(cursor, limit)
+    logger.info(f"🔍 Récupération des historiques d'équipements pour le prestataire: {username}")
 
     try:
         with get_temp_session() as session:
-            # 1) Récupérer tous les historiques d'équipement pour le prestataire
-            history_equipments = session.query(HistoryEquipmentClicClac).filter(
-                HistoryEquipmentClicClac.created_by == username
-            ).order_by(
-                HistoryEquipmentClicClac.date_history_created_at.desc()
-            ).all()
-            
-            # 2) Récupérer tous les équipements en cours pour le prestataire
-            ongoing_equipments = session.query(EquipmentClicClac).filter(
-                EquipmentClicClac.created_by == username
-            ).order_by(
-                EquipmentClicClac.created_at.desc()
-            ).all()
-
-            if not history_equipments and not ongoing_equipments:
-                logger.info(f"Aucun historique trouvé pour le prestataire: {username}")
-                return []
-            
-            history_list = []
-            
-            # 3) Pour chaque historique d'équipement, récupérer ses attributs
-            for hist_eq in history_equipments:
-                # Récupérer les attributs associés
-                attributes = session.query(HistoryAttributeClicClac).filter(
-                    HistoryAttributeClicClac.code == hist_eq.code
-                ).all()
-                
-                # ✅ CORRECTION : Convertir directement en dict (to_dict() ne nécessite PAS d'attributs)
-                hist_dict = hist_eq.to_dict()
+            # 1) Page d'historiques archivés du prestataire (attributs par history_id)
+            history_list, next_cursor, has_more = _load_history_page(
+                session, position, page_limit,
+                date_from=date_from, date_to=date_to, entity=entity, created_by=username
+            )
+            for hist_dict in history_list:
                 hist_dict['status'] = 'archived'  # ✅ Marquer comme archivé
-                hist_dict['attributes'] = [attr.to_dict() for attr in attributes]
-                
-                history_list.append(hist_dict)
-                logger.debug(f"Historique {hist_eq.id} récupéré avec {len(attributes)} attributs")
-
-            # 4) Pour chaque équipement en cours, récupérer ses attributs
-            for on_equipment in ongoing_equipments:
-                # ✅ CORRECTION : Récupérer les attributs depuis la DB
-                attributes = session.query(AttributeClicClac).filter(
-                    AttributeClicClac.code == on_equipment.code
-                ).all()
-                
-                # ✅ SOLUTION : Ajouter dynamiquement l'attribut 'attributes' AVANT d'appeler to_dict_SDDV()
-                setattr(on_equipment, 'attributes', attributes)
-                
-                # ✅ Maintenant on_equipment.to_dict_SDDV() peut accéder à self.attributes
-                on_dict = on_equipment.to_dict_SDDV()
-                on_dict['status'] = 'in_progress'  # ✅ Marquer comme en cours
-                
-                history_list.append(on_dict)
-                logger.debug(f"Équipement en cours {on_equipment.id} récupéré avec {len(attributes)} attributs")
-            
+
+            # 2) Équipements en cours : première page seulement
+            if position is None:
+                ongoing_query = session.query(EquipmentClicClac).filter(EquipmentClicClac.created_by == username)
+                if entity:
+                    ongoing_query = ongoing_query.filter(EquipmentClicClac.entity == entity)
+                if date_from:
+                    ongoing_query = ongoing_query.filter(EquipmentClicClac.created_at >= date_from)
+                if date_to:
+                    ongoing_query = ongoing_query.filter(EquipmentClicClac.created_at <= date_to)
+                ongoing_equipments = ongoing_query.order_by(EquipmentClicClac.created_at.desc()).all()
+
+                attributes_by_code = _load_clicclac_attributes_by_codes(session, [eq.code for eq in ongoing_equipments])
+                for on_equipment in ongoing_equipments:
+                    setattr(on_equipment, 'attributes', attributes_by_code.get(str(on_equipment.code), []))
+                    on_dict = on_equipment.to_dict_SDDV()
+                    on_dict['status'] = 'in_progress'  # ✅ Marquer comme en cours
+                    history_list.append(on_dict)
+
             logger.info(f"✅ {len(history_list)} historiques récupérés pour le prestataire: {username}")
-            return history_list
-    
+            return {'histories': history_list, 'next_cursor': next_cursor, 'has_more': has_more}
+
     except Exception as e:
         logger.error(f"❌ Erreur récupération historiques pour le prestataire {username}: {e}", exc_info=True)
-        return []
\ No newline at end of file
+        return {'histories': [], 'next_cursor': None, 'has_more': False}
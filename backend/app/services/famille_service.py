@@ -8,12 +8,19 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def get_familles(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
+def familles_cache_key(entity: str) -> str:
+    """Clé de cache des familles d'une entité."""
+    return f"mobile_familles_{entity}"
+
+def get_familles(entity: str, hierarchy_result: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
     """Récupère toutes les familles depuis la base de données."""
     
-    cached = cache.get_data_only("mobile_familles")
-    if cached:
-        return cached
+    # Clé par entité : la liste dépend de la hiérarchie de l'entité demandée
+    cache_key = familles_cache_key(entity)
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
     
     # Récupérer la hiérarchie de l'entité
     try:
@@ -38,7 +45,8 @@ def get_familles(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any
         with get_main_session() as session:
             db = SQLAlchemyQueryExecutor(session)
             
-            hierarchy_entities.append('INFO_PARTAGEE') # Ajout de l'entité partagée
+            # Ajout de l'entité partagée (copie : la hiérarchie est partagée entre appels concurrents)
+            hierarchy_entities = [*hierarchy_entities, 'INFO_PARTAGEE']
             
             # Filtre par hiérarchie d'entités (OBLIGATOIRE)
             placeholders = ','.join([f':entity_{i}' for i in range(len(hierarchy_entities))])
@@ -61,7 +69,7 @@ def get_familles(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any
                     continue
 
             response = {"familles": familles, "count": len(familles)}
-            cache.set("mobile_familles", response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, etag=True)
             return response
     except Exception as e:
         logger.error(f"❌ Erreur familles: {e}")
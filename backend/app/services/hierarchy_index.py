@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import HIERARCHY_VERSION_CHECK_SECONDS
+from app.db.requests import ENTITY_TREE_QUERY, ENTITY_TREE_VERSION_QUERY
+from app.db.sqlalchemy.session import SQLAlchemyQueryExecutor, get_main_session
+
+logger = logging.getLogger(__name__)
+
+
+class EntityHierarchyIndex:
+    """
+    Index en mémoire de la hiérarchie des entités (table de fermeture).
+
+    La table entity est petite et change rarement : elle est chargée une fois par
+    processus, puis chaque lookup est une lecture de dictionnaire (aucun aller-retour DB).
+    Une empreinte (COUNT + CHECKSUM_AGG) est vérifiée au plus toutes les
+    HIERARCHY_VERSION_CHECK_SECONDS secondes ; l'index n'est reconstruit que si elle change.
+    """
+
+    def __init__(self, check_interval: int = HIERARCHY_VERSION_CHECK_SECONDS):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._descendants: Dict[str, Tuple[str, ...]] = {}
+        self._ancestors: Dict[str, Tuple[str, ...]] = {}
+        self._version: Optional[Tuple[Any, Any]] = None
+        self._checked_at = 0.0
+        self._loaded_at: Optional[float] = None
+
+    @staticmethod
+    def _build(rows: List[tuple]) -> Tuple[Dict[str, Tuple[str, ...]], Dict[str, Tuple[str, ...]]]:
+        """
+        Construit les fermetures à partir des couples (code, parent).
+
+        Returns:
+            (descendants : entité puis sous-entités en largeur, ancêtres : parent le plus proche en premier)
+        """
+        parents: Dict[str, Optional[str]] = {}
+        children: Dict[str, List[str]] = {}
+
+        for code, parent in rows:
+            if code is None:
+                continue
+            code = str(code)
+            parent = str(parent) if parent is not None else None
+            parents[code] = parent
+            if parent and parent != code:
+                children.setdefault(parent, []).append(code)
+
+        descendants: Dict[str, Tuple[str, ...]] = {}
+        for code in parents:
+            # Même ordre que la fonction SQL : l'entité elle-même, puis ses descendants
+            ordered = [code]
+            seen = {code}
+            queue = deque(children.get(code, []))
+            while queue:
+                child = queue.popleft()
+                if child in seen:
+                    continue  # Protection contre les cycles
+                seen.add(child)
+                ordered.append(child)
+                queue.extend(children.get(child, []))
+            descendants[code] = tuple(ordered)
+
+        ancestors: Dict[str, Tuple[str, ...]] = {}
+        for code in parents:
+            chain = []
+            seen = {code}
+            parent = parents.get(code)
+            while parent and parent not in seen:
+                chain.append(parent)
+                seen.add(parent)
+                parent = parents.get(parent)
+            ancestors[code] = tuple(chain)
+
+        return descendants, ancestors
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Vérifie l'empreinte de la table entity et recharge l'index si elle a changé.
+
+        Args:
+            force: Recharger même si l'empreinte est identique
+
+        Returns:
+            True si l'index a été (re)chargé
+        """
+        with self._lock:
+            # Un autre thread vient peut-être de faire la vérification
+            if not force and self.is_fresh():
+                return False
+
+            with get_main_session() as session:
+                db = SQLAlchemyQueryExecutor(session)
+                version_row = db.execute_query(ENTITY_TREE_VERSION_QUERY)
+                version = tuple(version_row[0]) if version_row else None
+
+                self._checked_at = time.monotonic()
+                if not force and self._loaded_at is not None and version == self._version:
+                    return False
+
+                rows = db.execute_query(ENTITY_TREE_QUERY)
+
+            descendants, ancestors = self._build(rows)
+            self._descendants = descendants
+            self._ancestors = ancestors
+            self._version = version
+            self._loaded_at = time.monotonic()
+
+        logger.info(f"🌳 Index de hiérarchie chargé: {len(descendants)} entités")
+        return True
+
+    def is_fresh(self) -> bool:
+        """True si l'index est chargé et que sa version a été vérifiée récemment"""
+        return self._loaded_at is not None and (time.monotonic() - self._checked_at) < self.check_interval
+
+    def ensure_fresh(self) -> None:
+        """Charge ou revérifie l'index si nécessaire (appel bloquant : à exécuter hors boucle async)"""
+        if self.is_fresh():
+            return
+        try:
+            self.refresh()
+        except Exception as e:
+            # Un index existant reste utilisable si la vérification échoue
+            logger.error(f"❌ Erreur rafraîchissement index de hiérarchie: {e}")
+            if self._loaded_at is None:
+                raise
+            self._checked_at = time.monotonic()
+
+    def get_descendants(self, entity_code: str) -> Optional[List[str]]:
+        """Entité puis ses sous-entités (copie), None si l'entité est inconnue de l'index"""
+        descendants = self._descendants.get(entity_code)
+        return list(descendants) if descendants is not None else None
+
+    def get_ancestors(self, entity_code: str) -> Optional[List[str]]:
+        """Ancêtres de l'entité, parent le plus proche en premier (copie), None si inconnue"""
+        ancestors = self._ancestors.get(entity_code)
+        return list(ancestors) if ancestors is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        """État de l'index (diagnostic)"""
+        return {
+            "loaded": self._loaded_at is not None,
+            "entities": len(self._descendants),
+            "age_seconds": round(time.monotonic() - self._loaded_at, 1) if self._loaded_at is not None else None,
+            "checked_seconds_ago": round(time.monotonic() - self._checked_at, 1) if self._loaded_at is not None else None,
+        }
+
+
+# Instance globale (une par processus)
+hierarchy_index = EntityHierarchyIndex()
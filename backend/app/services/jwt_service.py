@@ -1,31 +1,63 @@
+from collections import OrderedDict
 from datetime import datetime, timedelta, timezone
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from jose import jwt
 from jose.exceptions import ExpiredSignatureError, JWTError
-import bcrypt
-from app.core.config import JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES, JWT_REFRESH_TOKEN_EXPIRE_DAYS
-from app.core.cache import cache
+import asyncio
+import hashlib
+import json
+import threading
+import time
+from app.core.config import (
+    JWT_SECRET_KEY, JWT_ALGORITHM, JWT_ACCESS_TOKEN_EXPIRE_MINUTES, JWT_REFRESH_TOKEN_EXPIRE_DAYS,
+    JWT_CLAIMS_CACHE_SIZE, JWT_BLACKLIST_CHANNEL, JWT_BLACKLIST_RESYNC_DELAY
+)
+from app.core.cache import async_cache, cache
+from app.services.password_service import password_service
 import logging
 
 logger = logging.getLogger(__name__)
 
+BLACKLIST_PREFIX = "blacklist:"
+
+def token_digest(token: str) -> str:
+    """Empreinte courte d'un token (clé du cache de décodage et de la blacklist)"""
+    return hashlib.blake2b(token.encode("utf-8"), digest_size=16).hexdigest()
+
 # Contexte pour le hachage des mots de passe
 
 class JWTService:
+    """
+    Émission et vérification des tokens JWT.
+
+    Chemin rapide de vérification :
+    - cache LRU borné (JWT_CLAIMS_CACHE_SIZE) empreinte du token -> claims décodés,
+      valable jusqu'à `exp` : la signature n'est vérifiée qu'au premier passage
+      (une autre chaîne, même falsifiée, a une autre empreinte)
+    - miroir local de la blacklist Redis, tenu à jour par le canal JWT_BLACKLIST_CHANNEL ;
+      tant qu'il n'est pas synchronisé (écoute coupée), lecture directe dans Redis
+    """
+
     def __init__(self):
         self.SECRET_KEY = JWT_SECRET_KEY
         self.ALGORITHM = JWT_ALGORITHM
+        self._claims_lock = threading.Lock()
+        self._claims: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()  # empreinte -> (exp, claims)
+        self._revoked: Dict[str, float] = {}  # empreinte -> expiration (epoch)
+        self._mirror_registered = False
+        self._mirror_synced = False
+        self._mirror_reset_at = 0.0
+        self._resyncing = False
 
     @staticmethod
     def hash_password(password: str) -> str:
-        """Hache un mot de passe"""
-        salt = bcrypt.gensalt()
-        return bcrypt.hashpw(password.encode('utf-8'), salt).decode('utf-8')
+        """Hache un mot de passe (pool de processus, appel bloquant : hors boucle d'événements)"""
+        return password_service.hash_password_sync(password)
 
     @staticmethod
     def verify_password(plain_password: str, hashed_password: str) -> bool:
-        """Vérifie un mot de passe haché"""
-        return bcrypt.checkpw(plain_password.encode('utf-8'), hashed_password.encode('utf-8'))
+        """Vérifie un mot de passe haché (pool de processus, appel bloquant : hors boucle d'événements)"""
+        return password_service.verify_password_sync(plain_password, hashed_password)
 
     @staticmethod
     def create_access_token(data: Dict[str, Any], expires_delta: Optional[timedelta] = None) -> str:
@@ -51,7 +83,7 @@ class JWTService:
 
     def verify_token(self, token: str, expected_type: str = "access") -> dict | None:
         """
-        Vérifie et décode un token JWT avec logs détaillés
+        Vérifie et décode un token JWT (décodage mis en cache jusqu'à expiration)
         
         Args:
             token: Token JWT à vérifier
@@ -60,32 +92,48 @@ class JWTService:
         Returns:
             dict: Payload du token si valide, None sinon
         """
-        try:
-            logger.info("🔐 Décodage token JWT...")
-            
-            # Décoder le token
-            payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
-            
-            # ✅ CORRECTION : Vérifier le type attendu
-            token_type = payload.get("type", "access")
-            
-            if token_type != expected_type:
-                logger.warning(f"❌ Type de token incorrect: {token_type} (attendu: {expected_type})")
+        digest = token_digest(token)
+        now = time.time()
+        payload = None
+
+        with self._claims_lock:
+            cached = self._claims.get(digest)
+            if cached is not None:
+                if cached[0] > now:
+                    self._claims.move_to_end(digest)
+                    payload = cached[1]
+                else:
+                    del self._claims[digest]
+
+        if payload is None:
+            try:
+                payload = jwt.decode(token, self.SECRET_KEY, algorithms=[self.ALGORITHM])
+            except ExpiredSignatureError:
+                logger.debug("❌ Token expiré")
                 return None
-            
-            logger.info(f"✅ Token {expected_type} décodé avec succès")
-            return payload
-            
-        except ExpiredSignatureError:
-            logger.error("❌ Token expiré")
-            return None
-        except JWTError as e:
-            logger.error(f"❌ Token invalide: {e}")
-            return None
-        except Exception as e:
-            logger.error(f"❌ Erreur inattendue lors de la vérification: {e}")
+            except JWTError as e:
+                logger.warning(f"❌ Token invalide: {e}")
+                return None
+            except Exception as e:
+                logger.error(f"❌ Erreur inattendue lors de la vérification: {e}")
+                return None
+
+            exp = payload.get("exp")
+            if isinstance(exp, (int, float)):
+                with self._claims_lock:
+                    self._claims[digest] = (float(exp), payload)
+                    if len(self._claims) > JWT_CLAIMS_CACHE_SIZE:
+                        self._claims.popitem(last=False)
+
+        # ✅ CORRECTION : Vérifier le type attendu
+        token_type = payload.get("type", "access")
+        if token_type != expected_type:
+            logger.warning(f"❌ Type de token incorrect: {token_type} (attendu: {expected_type})")
             return None
 
+        # Copie : le payload en cache est partagé entre requêtes
+        return dict(payload)
+
     @staticmethod
     def refresh_access_token(refresh_token: str) -> Optional[str]:
         """
@@ -98,8 +146,6 @@ class JWTService:
             str: Nouveau access token, None si refresh token invalide
         """
         try:
-            jwt_service = JWTService()
-            
             # ✅ CORRECTION : Vérifier que c'est bien un refresh token
             payload = jwt_service.verify_token(refresh_token, expected_type="refresh")
             
@@ -125,11 +171,121 @@ class JWTService:
             logger.error(f"❌ Erreur lors du rafraîchissement: {e}")
             return None
 
-    @staticmethod
-    def blacklist_token(token: str, ttl: int = 3600) -> bool:
-        """Ajoute un token à la blacklist dans Redis"""
-        token_key = f"blacklist:{token}"
-        return cache.set(token_key, True, ttl)
+    def blacklist_token(self, token: str, ttl: int = 3600) -> bool:
+        """Ajoute un token à la blacklist Redis et aux miroirs locaux de tous les workers"""
+        digest = token_digest(token)
+        if not cache.set(f"{BLACKLIST_PREFIX}{digest}", True, ttl):
+            return False
+
+        expires_at = time.time() + ttl
+        self._revoke_locally(digest, expires_at)
+        try:
+            if cache.redis_client is not None:
+                cache.redis_client.publish(JWT_BLACKLIST_CHANNEL, json.dumps({"digest": digest, "expires_at": expires_at}))
+        except Exception as e:
+            logger.error(f"❌ Erreur diffusion révocation token: {e}")
+        return True
+
+    def _revoke_locally(self, digest: str, expires_at: float) -> None:
+        now = time.time()
+        # Copie puis remplacement : les lectures de la boucle ne prennent pas de verrou
+        revoked = {key: expiry for key, expiry in self._revoked.items() if expiry > now}
+        revoked[digest] = expires_at
+        self._revoked = revoked
+        with self._claims_lock:
+            self._claims.pop(digest, None)
+
+    def _on_blacklisted(self, message: Dict[str, Any]) -> None:
+        """Révocation publiée par un worker (thread d'écoute pub/sub)"""
+        try:
+            revocation = json.loads(message["data"])
+            self._revoke_locally(revocation["digest"], float(revocation["expires_at"]))
+        except Exception as e:
+            logger.error(f"❌ Révocation illisible, miroir de blacklist désynchronisé: {e}")
+            self._on_mirror_reset()
+
+    def _on_mirror_reset(self) -> None:
+        """Révocations possiblement manquées : retour à la lecture Redis jusqu'au rechargement"""
+        self._mirror_synced = False
+        self._mirror_reset_at = time.monotonic()
+
+    def register_blacklist_mirror(self) -> None:
+        """Abonne le miroir au canal des révocations (lifespan, avant cache.start_invalidation_listener)"""
+        if not self._mirror_registered:
+            cache.register_channel(JWT_BLACKLIST_CHANNEL, self._on_blacklisted, self._on_mirror_reset)
+            self._mirror_registered = True
+
+    def load_blacklist_mirror(self) -> bool:
+        """
+        (Re)charge le miroir depuis Redis (appel bloquant). Utilisé seulement si l'écoute
+        tourne : un miroir sans écoute manquerait les révocations suivantes.
+        """
+        if not self._mirror_registered or not cache.is_listening or cache.redis_client is None:
+            return False
+
+        try:
+            keys = list(cache.redis_client.scan_iter(match=f"{BLACKLIST_PREFIX}*", count=500))
+            pipe = cache.redis_client.pipeline(transaction=False)
+            for key in keys:
+                pipe.ttl(key)
+            ttls = pipe.execute() if keys else []
+
+            now = time.time()
+            revoked = {}
+            for key, ttl in zip(keys, ttls):
+                if ttl is None or ttl == -2:
+                    continue
+                suffix = key[len(BLACKLIST_PREFIX):]
+                # Anciennes entrées : token complet en clé
+                digest = token_digest(suffix) if "." in suffix else suffix
+                revoked[digest] = now + ttl if ttl > 0 else float("inf")
+
+            self._revoked = revoked
+            self._mirror_synced = True
+            logger.info(f"✅ Miroir de blacklist JWT chargé: {len(revoked)} tokens révoqués")
+            return True
+
+        except Exception as e:
+            logger.error(f"❌ Erreur chargement miroir de blacklist JWT: {e}")
+            self._on_mirror_reset()
+            return False
+
+    async def _resync_mirror(self) -> None:
+        try:
+            await asyncio.to_thread(self.load_blacklist_mirror)
+        finally:
+            self._resyncing = False
+
+    async def is_token_blacklisted(self, token: str) -> bool:
+        """Vérifie si un token a été révoqué (miroir local, sinon Redis sans bloquer la boucle)"""
+        digest = token_digest(token)
+        if self._mirror_synced:
+            expires_at = self._revoked.get(digest)
+            return expires_at is not None and expires_at > time.time()
+
+        if (
+            self._mirror_registered and not self._resyncing
+            and time.monotonic() - self._mirror_reset_at >= JWT_BLACKLIST_RESYNC_DELAY
+        ):
+            self._resyncing = True
+            asyncio.create_task(self._resync_mirror())
+
+        redis_client = async_cache.redis_client
+        if not async_cache.is_available or redis_client is None:
+            return False
+        try:
+            return bool(await redis_client.exists(f"{BLACKLIST_PREFIX}{digest}", f"{BLACKLIST_PREFIX}{token}"))
+        except Exception as e:
+            logger.error(f"❌ Erreur vérification blacklist: {e}")
+            return False
+
+    def stats(self) -> Dict[str, Any]:
+        """État du chemin rapide (diagnostic)"""
+        return {
+            "cached_tokens": len(self._claims),
+            "blacklist_mirror_synced": self._mirror_synced,
+            "revoked_tokens": len(self._revoked),
+        }
 
     @staticmethod
     def store_refresh_token(username: str, refresh_token: str) -> bool:
@@ -1,13 +1,133 @@
-from typing import Optional
+from typing import Any, Coroutine, Dict, List, Optional
 from app.services.websocket_service import manager
+from app.services.hierarchy_index import hierarchy_index
 from app.models.notification_model import NotificationModel
-from app.core.cache import cache
+from app.core.cache import async_cache
+from app.core.config import NOTIFICATION_INBOX_MAX, NOTIFICATION_TTL_SECONDS
+import asyncio
+import itertools
 import logging
 import json
 import time
 
 logger = logging.getLogger(__name__)
 
+# Boîte de réception par utilisateur :
+# - inbox:{user_id}:ids   sorted set des identifiants (score 0, membres à largeur fixe :
+#                         l'ordre lexicographique est l'ordre chronologique)
+# - inbox:{user_id}:items hash membre -> notification JSON
+# - inbox:{user_id}:seq   dernier identifiant attribué à l'utilisateur
+# Ajout, lecture d'une page et marquage lu en O(log n) ; aucune réécriture de la liste.
+INBOX_ID_WIDTH = 20
+
+# Attribution atomique d'un identifiant : horodatage en ms * 1000, strictement
+# croissant par utilisateur (deux notifications de la même milliseconde, depuis
+# deux workers, ne partagent jamais un membre de la boîte)
+_NEXT_ID_SCRIPT = """
+local candidate = tonumber(ARGV[1])
+local last = tonumber(redis.call('GET', KEYS[1]) or '0')
+if candidate <= last then
+    candidate = last + 1
+end
+local id = string.format('%.0f', candidate)
+redis.call('SET', KEYS[1], id, 'EX', ARGV[2])
+return id
+"""
+
+# Repli sans Redis : séquence locale au worker
+_local_sequence = itertools.count()
+
+# Ajout atomique + plafonnement (les plus anciennes non lues sortent de la boîte)
+_INBOX_APPEND_SCRIPT = """
+redis.call('ZADD', KEYS[1], 0, ARGV[1])
+redis.call('HSET', KEYS[2], ARGV[1], ARGV[2])
+local overflow = redis.call('ZCARD', KEYS[1]) - tonumber(ARGV[3])
+if overflow > 0 then
+    local dropped = redis.call('ZRANGE', KEYS[1], 0, overflow - 1)
+    redis.call('ZREMRANGEBYRANK', KEYS[1], 0, overflow - 1)
+    redis.call('HDEL', KEYS[2], unpack(dropped))
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return overflow
+"""
+
+def _inbox_keys(user_id: str) -> tuple[str, str]:
+    """Clés Redis (index ordonné, contenus) de la boîte de réception d'un utilisateur"""
+    return f"inbox:{user_id}:ids", f"inbox:{user_id}:items"
+
+def _inbox_member(notification_id: int) -> str:
+    """Membre du sorted set : identifiant à largeur fixe"""
+    return f"{int(notification_id):0{INBOX_ID_WIDTH}d}"
+
+async def _allocate_notification_id(user_id: str) -> int:
+    """Identifiant unique et croissant de la prochaine notification de l'utilisateur"""
+    candidate = int(time.time() * 1000) * 1000
+    redis_client = async_cache.redis_client
+    if async_cache.is_available and redis_client is not None:
+        try:
+            allocate = redis_client.register_script(_NEXT_ID_SCRIPT)
+            return int(await allocate(keys=[f"inbox:{user_id}:seq"], args=[candidate, NOTIFICATION_TTL_SECONDS]))
+        except Exception as e:
+            logger.error(f"❌ Erreur attribution identifiant de notification pour {user_id}: {e}")
+    return candidate + next(_local_sequence) % 1000
+
+async def _append_to_inbox(user_id: str, notification: Dict[str, Any]) -> None:
+    """Ajoute une notification à la boîte de réception (un aller-retour, atomique)"""
+    redis_client = async_cache.redis_client
+    if not async_cache.is_available or redis_client is None:
+        return
+    
+    # EVALSHA (le script n'est envoyé qu'une fois au serveur)
+    append = redis_client.register_script(_INBOX_APPEND_SCRIPT)
+    await append(
+        keys=list(_inbox_keys(user_id)),
+        args=[
+            _inbox_member(notification["id"]),
+            json.dumps(notification, ensure_ascii=False),
+            NOTIFICATION_INBOX_MAX,
+            NOTIFICATION_TTL_SECONDS
+        ]
+    )
+
+async def _migrate_legacy_inbox(user_id: str) -> None:
+    """Reprend une ancienne boîte stockée en liste JSON (notifications:{user_id}) puis la supprime"""
+    legacy_key = f"notifications:{user_id}"
+    existing = await async_cache.get_data_only(legacy_key)
+    if existing:
+        for notification in json.loads(existing):
+            if notification.get("id") is not None:
+                await _append_to_inbox(user_id, notification)
+    await async_cache.delete(legacy_key)
+
+# Boucle d'événements principale (liée au démarrage) pour les envois depuis les threads DB
+_event_loop: Optional[asyncio.AbstractEventLoop] = None
+
+def bind_event_loop(loop: asyncio.AbstractEventLoop) -> None:
+    """Enregistre la boucle principale (appelé dans le lifespan de l'application)"""
+    global _event_loop
+    _event_loop = loop
+
+def dispatch_notification(coro: Coroutine[Any, Any, Any]) -> None:
+    """
+    Planifie l'envoi d'une notification depuis du code synchrone.
+    
+    Les services tournent dans le pool de threads DB, sans boucle courante :
+    la coroutine est alors confiée à la boucle principale (run_coroutine_threadsafe).
+    """
+    try:
+        asyncio.get_running_loop().create_task(coro)
+        return
+    except RuntimeError:
+        pass
+    
+    if _event_loop is None or _event_loop.is_closed():
+        logger.warning("⚠️ Boucle principale indisponible, notification ignorée")
+        coro.close()
+        return
+    
+    asyncio.run_coroutine_threadsafe(coro, _event_loop)
+
 async def send_notification(
     user_id: str, 
     title: str, 
@@ -28,8 +148,8 @@ async def send_notification(
         sender_id: ID de l'émetteur à exclure des broadcasts
     """
     
-    # Générer un ID unique
-    notification_id = int(f"{int(time.time() * 1000)}{hash(user_id) % 1000:03d}")
+    # ID unique par destinataire, partagé par la boîte de réception et le message WebSocket
+    notification_id = await _allocate_notification_id(user_id)
     
     notification = NotificationModel(
         id=notification_id,
@@ -49,12 +169,8 @@ async def send_notification(
     else:
         logger.info(f"📨 Notification personnelle pour {user_id}: {title}")
         
-        # Stocker dans Redis
-        cache_key = f"notifications:{user_id}"
-        existing = cache.get_data_only(cache_key) or "[]"
-        notifications = json.loads(existing)
-        notifications.append(notification_dict)
-        cache.set(cache_key, json.dumps(notifications), ttl=7*24*3600)
+        # Stocker dans la boîte de réception Redis
+        await _append_to_inbox(user_id, notification_dict)
         
         # Envoyer via WebSocket
         await manager.send_to_user(notification_dict, user_id)
@@ -98,30 +214,129 @@ async def notify_equipment_updated(user_id: str, equipment_code: str):
         broadcast=False
     )
 
-def get_unread_notifications(user_id: str) -> list:
-    """Récupère les notifications non lues depuis Redis"""
-    cache_key = f"notifications:{user_id}"
-    existing = cache.get_data_only(cache_key) or "[]"
-    notifications = json.loads(existing)
+async def get_unread_notifications(
+    user_id: str,
+    limit: Optional[int] = None,
+    before: Optional[int] = None
+) -> Dict[str, Any]:
+    """
+    Récupère les notifications non lues depuis la boîte de réception Redis.
     
-    # Sécurité : s'assurer que toutes les notifications ont un ID
-    for notif in notifications:
-        if notif.get('id') is None:
-            notif['id'] = int(time.time() * 1000)
+    Sans `limit` : toute la boîte (bornée à NOTIFICATION_INBOX_MAX), ordre chronologique.
+    Avec `limit` : page des plus récentes d'abord, `before` = next_cursor de la page précédente.
     
-    return notifications
+    Returns:
+        {'count': total non lues, 'notifications': [...], 'next_cursor': int | None}
+    """
+    empty: Dict[str, Any] = {"count": 0, "notifications": [], "next_cursor": None}
+    redis_client = async_cache.redis_client
+    if not async_cache.is_available or redis_client is None:
+        return empty
+    
+    ids_key, items_key = _inbox_keys(user_id)
+    
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zcard(ids_key)
+    pipe.exists(f"notifications:{user_id}")
+    total, has_legacy = await pipe.execute()
+    if has_legacy:
+        await _migrate_legacy_inbox(user_id)
+        total = await redis_client.zcard(ids_key)
+    if not total:
+        return empty
+    
+    if limit is None:
+        members: List[str] = await redis_client.zrange(ids_key, 0, -1)
+    else:
+        upper = f"({_inbox_member(before)}" if before is not None else "+"
+        members = await redis_client.zrevrangebylex(ids_key, upper, "-", start=0, num=limit + 1)
+    
+    has_more = limit is not None and len(members) > limit
+    members = members[:limit] if limit is not None else members
+    if not members:
+        return {"count": total, "notifications": [], "next_cursor": None}
+    
+    bodies = await redis_client.hmget(items_key, members)
+    notifications = [json.loads(body) for body in bodies if body]
+    
+    return {
+        "count": total,
+        "notifications": notifications,
+        "next_cursor": int(members[-1]) if has_more else None
+    }
 
-def mark_notification_as_read(user_id: str, notification_id: int):
-    """Marque une notification comme lue en la supprimant de Redis"""
-    cache_key = f"notifications:{user_id}"
-    existing = cache.get_data_only(cache_key) or "[]"
-    notifications = json.loads(existing)
+async def mark_notification_as_read(user_id: str, notification_id: int) -> bool:
+    """Marque une notification comme lue en la retirant de la boîte (atomique, O(log n))"""
+    redis_client = async_cache.redis_client
+    if not async_cache.is_available or redis_client is None:
+        return False
     
-    initial_count = len(notifications)
-    notifications = [n for n in notifications if n.get("id") != notification_id]
-    removed_count = initial_count - len(notifications)
+    ids_key, items_key = _inbox_keys(user_id)
+    pipe = redis_client.pipeline(transaction=True)
+    pipe.zrem(ids_key, _inbox_member(notification_id))
+    pipe.hdel(items_key, _inbox_member(notification_id))
+    removed, _ = await pipe.execute()
+    
+    logger.info(f"✅ Notification {notification_id} marquée comme lue pour {user_id} ({removed} supprimée)")
+    return removed > 0
+
+async def mark_all_notifications_as_read(user_id: str) -> None:
+    """Vide la boîte de réception (UNLINK : libération mémoire hors du thread Redis)"""
+    redis_client = async_cache.redis_client
+    if not async_cache.is_available or redis_client is None:
+        return
+    
+    await redis_client.unlink(*_inbox_keys(user_id), f"notifications:{user_id}")
+    logger.info(f"✅ Toutes les notifications marquées comme lues pour {user_id}")
+
+def equipment_change_topics(equipment: Dict[str, Any]) -> List[str]:
+    """
+    Sujets concernés par un équipement : son entité et ses ancêtres (les listes mobiles
+    d'une entité incluent ses sous-entités), sa zone et sa famille.
+    """
+    topics = []
+    entity = equipment.get("entity")
+    if entity:
+        topics.append(f"entity:{entity}")
+        topics.extend(f"entity:{ancestor}" for ancestor in hierarchy_index.get_ancestors(str(entity)) or [])
+    if equipment.get("zone"):
+        topics.append(f"zone:{equipment['zone']}")
+    if equipment.get("famille"):
+        topics.append(f"famille:{equipment['famille']}")
+    return topics
+
+async def publish_equipment_changes(action: str, equipments: List[Dict[str, Any]]) -> None:
+    """
+    Pousse un événement compact aux abonnés des sujets touchés (au lieu du polling des listes).
+    Un message par sujet, avec les codes modifiés : le client recharge ce qui le concerne.
+    Les sujets zone:/famille: couvrent plusieurs entités : un message par entité, avec
+    son champ "entity", livré aux seuls abonnés dont la hiérarchie contient l'entité.
+    
+    Args:
+        action: created | updated | archived
+        equipments: Équipements modifiés ({code, entity, zone, famille})
+    """
+    codes_by_message: Dict[tuple[str, Optional[str]], List[str]] = {}
+    for equipment in equipments:
+        code = equipment.get("code")
+        if not code:
+            continue
+        entity = str(equipment.get("entity") or "")
+        for topic in equipment_change_topics(equipment):
+            codes = codes_by_message.setdefault((topic, None if topic.startswith("entity:") else entity), [])
+            if code not in codes:
+                codes.append(str(code))
     
-    cache.set(cache_key, json.dumps(notifications), ttl=7*24*3600)
+    for (topic, entity), codes in codes_by_message.items():
+        message = {
+            "type": "equipment_change",
+            "topic": topic,
+            "action": action,
+            "codes": codes
+        }
+        if entity is not None:
+            message["entity"] = entity
+        await manager.publish_topic(topic, message)
     
-    logger.info(f"✅ Notification {notification_id} marquée comme lue pour {user_id} ({removed_count} supprimée)")
-    return removed_count > 0
\ No newline at end of file
+    if codes_by_message:
+        logger.debug(f"📡 Changements d'équipements ({action}) publiés en {len(codes_by_message)} messages")
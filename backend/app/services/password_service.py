@@ -0,0 +1,200 @@
+import asyncio
+import logging
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, Optional, TypeVar
+
+from app.core.cache import async_cache
+from app.core.config import (
+    PASSWORD_ATTEMPT_WINDOW,
+    PASSWORD_MAX_ATTEMPTS,
+    PASSWORD_MAX_PENDING,
+    PASSWORD_POOL_WORKERS,
+)
+from app.core.exceptions import PasswordServiceBusyError, TooManyAttemptsError
+from app.core.password_hashing import check_password, hash_password
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Compteur de tentatives de connexion par utilisateur (fenêtre fixe, partagé par les workers)
+ATTEMPTS_KEY_PREFIX = "login_attempts:"
+
+
+class PasswordService:
+    """
+    Hachage et vérification bcrypt dans un pool de processus dédié.
+
+    bcrypt coûte des centaines de millisecondes de CPU par appel : hors du processus
+    de l'API, un pic de connexions (prise de poste) occupe tous les cœurs sans
+    bloquer la boucle d'événements ni les threads du pool DB.
+
+    - workers = PASSWORD_POOL_WORKERS (par défaut le nombre de cœurs), démarrés en
+      'spawn' (aucun thread ni connexion hérités du processus parent)
+    - au-delà de PASSWORD_MAX_PENDING hachages en attente, refus immédiat
+      (PasswordServiceBusyError → 503)
+    - au plus PASSWORD_MAX_ATTEMPTS tentatives de connexion par utilisateur sur
+      PASSWORD_ATTEMPT_WINDOW secondes (TooManyAttemptsError → 429), avant tout hachage
+    """
+
+    def __init__(self, max_workers: int = PASSWORD_POOL_WORKERS, max_pending: int = PASSWORD_MAX_PENDING):
+        self.max_workers = max(1, max_workers)
+        self.max_pending = max_pending
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self._lock = threading.Lock()
+
+        # Métriques
+        self._pending = 0
+        self._completed = 0
+        self._rejected = 0
+        self._throttled = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    mp_context=multiprocessing.get_context("spawn")
+                )
+            return self._pool
+
+    def start(self) -> None:
+        """Crée le pool (appelé dans le lifespan ; sinon créé au premier hachage)"""
+        self._get_pool()
+        logger.info(f"✅ Pool de hachage des mots de passe: {self.max_workers} processus, file max {self.max_pending}")
+
+    def shutdown(self) -> None:
+        """Arrête le pool de processus"""
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=False, cancel_futures=True)
+            logger.info("🛑 Pool de hachage des mots de passe arrêté")
+
+    def _reserve(self) -> None:
+        """Compte un hachage en attente, ou le refuse si la file est pleine"""
+        with self._lock:
+            if self._pending >= self.max_workers + self.max_pending:
+                self._rejected += 1
+                pending = self._pending
+            else:
+                self._pending += 1
+                return
+        logger.warning(f"⚠️ Pool de hachage saturé ({pending} vérifications), requête refusée")
+        raise PasswordServiceBusyError(pending)
+
+    def _release(self, completed: bool) -> None:
+        with self._lock:
+            self._pending -= 1
+            if completed:
+                self._completed += 1
+
+    def _on_broken_pool(self, pool: ProcessPoolExecutor) -> None:
+        """Un processus du pool est mort : le pool est recréé au prochain appel"""
+        logger.error("❌ Pool de hachage interrompu, recréation")
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+
+    async def _run(self, func: Callable[..., T], *args: Any) -> T:
+        self._reserve()
+        pool = self._get_pool()
+        completed = False
+        try:
+            result = await asyncio.get_running_loop().run_in_executor(pool, func, *args)
+            completed = True
+            return result
+        except BrokenProcessPool:
+            self._on_broken_pool(pool)
+            raise
+        finally:
+            self._release(completed)
+
+    def _run_sync(self, func: Callable[..., T], *args: Any) -> T:
+        """Variante bloquante pour le code synchrone (threads du pool DB)"""
+        self._reserve()
+        pool = self._get_pool()
+        completed = False
+        try:
+            result = pool.submit(func, *args).result()
+            completed = True
+            return result
+        except BrokenProcessPool:
+            self._on_broken_pool(pool)
+            raise
+        finally:
+            self._release(completed)
+
+    async def hash_password(self, password: str) -> str:
+        """Hache un mot de passe sans bloquer la boucle d'événements"""
+        return await self._run(hash_password, password)
+
+    async def verify_password(self, password: str, hashed_password: str) -> bool:
+        """Vérifie un mot de passe sans bloquer la boucle d'événements"""
+        return await self._run(check_password, password, hashed_password)
+
+    def hash_password_sync(self, password: str) -> str:
+        """Hache un mot de passe depuis du code synchrone (hors boucle d'événements)"""
+        return self._run_sync(hash_password, password)
+
+    def verify_password_sync(self, password: str, hashed_password: str) -> bool:
+        """Vérifie un mot de passe depuis du code synchrone (hors boucle d'événements)"""
+        return self._run_sync(check_password, password, hashed_password)
+
+    @staticmethod
+    def _attempts_key(username: str) -> str:
+        return f"{ATTEMPTS_KEY_PREFIX}{username.strip().lower()}"
+
+    async def check_attempts(self, username: str) -> None:
+        """
+        Compte une tentative de connexion (un aller-retour Redis, avant tout hachage).
+
+        Raises:
+            TooManyAttemptsError: Si l'utilisateur a dépassé PASSWORD_MAX_ATTEMPTS sur la fenêtre
+        """
+        redis_client = async_cache.redis_client
+        if not async_cache.is_available or redis_client is None:
+            return  # Sans Redis, pas de limitation (la file bornée protège le pool)
+
+        key = self._attempts_key(username)
+        try:
+            pipe = redis_client.pipeline(transaction=True)
+            # Création avec TTL si absent (début de fenêtre), puis incrément (le TTL est conservé)
+            pipe.set(key, 0, ex=PASSWORD_ATTEMPT_WINDOW, nx=True)
+            pipe.incr(key)
+            pipe.ttl(key)
+            _, attempts, ttl = await pipe.execute()
+        except Exception as e:
+            logger.error(f"❌ Erreur comptage des tentatives de {username}: {e}")
+            return
+
+        if attempts > PASSWORD_MAX_ATTEMPTS:
+            with self._lock:
+                self._throttled += 1
+            logger.warning(f"🚫 Trop de tentatives de connexion pour {username} ({attempts})")
+            raise TooManyAttemptsError(username, ttl if ttl and ttl > 0 else PASSWORD_ATTEMPT_WINDOW)
+
+    async def reset_attempts(self, username: str) -> None:
+        """Remet à zéro le compteur après une connexion réussie"""
+        if not async_cache.is_available:
+            return
+        await async_cache.delete(self._attempts_key(username))
+
+    def stats(self) -> Dict[str, Any]:
+        """État du pool de hachage (exposé par /health)"""
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "max_pending": self.max_pending,
+                "pending": self._pending,
+                "completed": self._completed,
+                "rejected": self._rejected,
+                "throttled": self._throttled,
+            }
+
+
+# Instance globale (un pool par worker de l'API)
+password_service = PasswordService()
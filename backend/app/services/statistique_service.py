@@ -1,7 +1,7 @@
 import logging
 from datetime import datetime
 from sqlalchemy import func, and_, case
-from typing import Dict
+from typing import Dict, List, Tuple
 import json  # ✅ AJOUT
 
 from app.db.sqlalchemy.session import get_main_session, get_temp_session
@@ -11,6 +11,57 @@ from app.core.cache import cache
 
 logger = logging.getLogger(__name__)
 
+def _count_if(condition):
+    """SUM(CASE WHEN condition THEN 1 ELSE 0 END) : compteur conditionnel."""
+    return func.sum(case((condition, 1), else_=0))
+
+def _get_detailed_statistics(temp_session) -> Tuple[List[Dict], List[Dict], List[Dict]]:
+    """
+    Répartitions par entité, famille et utilisateur en une seule requête
+    GROUP BY GROUPING SETS ((entity), (famille), (created_by)).
+    GROUPING(col) = 0 identifie l'ensemble auquel appartient chaque ligne.
+    
+    Returns:
+        (stats_by_entity, stats_by_family (top 10), stats_by_user)
+    """
+    entity_col = EquipmentClicClac.entity
+    family_col = EquipmentClicClac.famille
+    user_col = EquipmentClicClac.created_by
+    
+    rows = temp_session.query(
+        entity_col,
+        family_col,
+        user_col,
+        func.count(EquipmentClicClac.id).label('count'),
+        _count_if(EquipmentClicClac.is_new == True).label('new_count'),
+        _count_if(EquipmentClicClac.is_update == True).label('update_count'),
+        func.grouping(entity_col).label('g_entity'),
+        func.grouping(family_col).label('g_family'),
+        func.grouping(user_col).label('g_user')
+    ).group_by(
+        func.grouping_sets(entity_col, family_col, user_col)
+    ).all()
+    
+    stats_by_entity = []
+    stats_by_family = []
+    stats_by_user = []
+    
+    for row in rows:
+        if row.g_entity == 0:
+            stats_by_entity.append({"entity": row.entity or "N/A", "count": int(row.count)})
+        elif row.g_family == 0:
+            stats_by_family.append({"family": row.famille or "N/A", "count": int(row.count)})
+        elif row.g_user == 0 and row.created_by:
+            stats_by_user.append({
+                "username": row.created_by,
+                "new_count": int(row.new_count or 0),
+                "update_count": int(row.update_count or 0)
+            })
+    
+    # Top 10 des familles
+    stats_by_family.sort(key=lambda item: item["count"], reverse=True)
+    return stats_by_entity, stats_by_family[:10], stats_by_user
+
 def get_statistics_cockpit_web(include_details: bool = False) -> Dict:
     """
     Récupère les statistiques complètes pour le dashboard web
@@ -58,41 +109,34 @@ def get_statistics_cockpit_web(include_details: bool = False) -> Dict:
             total_gmao = main_session.query(func.count(EquipmentGMAO.id)).scalar() or 0
             logger.info(f"📦 Équipements GMAO: {total_gmao}")
         
-        # 2. Statistiques de la DB temporaire (MSSQL)
+        # 2. Statistiques de la DB temporaire (MSSQL) : un seul aller-retour
+        #    (agrégation conditionnelle sur chaque table, les deux agrégats en produit croisé)
         with get_temp_session() as temp_session:
-            # Total des équipements en attente
-            total_temp = temp_session.query(func.count(EquipmentClicClac.id)).scalar() or 0
-            
-            # Nouveaux équipements (is_new=True)
-            new_equipments = temp_session.query(func.count(EquipmentClicClac.id)).filter(
-                EquipmentClicClac.is_new == True
-            ).scalar() or 0
-            
-            # Équipements modifiés (is_update=True)
-            updated_equipments = temp_session.query(func.count(EquipmentClicClac.id)).filter(
-                EquipmentClicClac.is_update == True
-            ).scalar() or 0
-            
-            # Équipements approuvés
-            approved_equipments = temp_session.query(func.count(HistoryEquipmentClicClac.id)).filter(
-                HistoryEquipmentClicClac.is_approved == True
-            ).scalar() or 0
-            
-            # Équipements rejetés
-            rejected_equipments = temp_session.query(func.count(HistoryEquipmentClicClac.id)).filter(
-                HistoryEquipmentClicClac.is_rejected == True
-            ).scalar() or 0
-            
-            # Équipements en attente de validation
-            pending_validation = temp_session.query(func.count(EquipmentClicClac.id)).filter(
-                and_(
+            equipment_counts = temp_session.query(
+                func.count(EquipmentClicClac.id).label('total_temp'),
+                _count_if(EquipmentClicClac.is_new == True).label('new_equipments'),
+                _count_if(EquipmentClicClac.is_update == True).label('updated_equipments'),
+                _count_if(and_(
                     EquipmentClicClac.is_approved == False,
                     EquipmentClicClac.is_rejected == False
-                )
-            ).scalar() or 0
+                )).label('pending_validation')
+            ).subquery()
+            
+            history_counts = temp_session.query(
+                func.count(HistoryEquipmentClicClac.id).label('archived_equipments'),
+                _count_if(HistoryEquipmentClicClac.is_approved == True).label('approved_equipments'),
+                _count_if(HistoryEquipmentClicClac.is_rejected == True).label('rejected_equipments')
+            ).subquery()
+            
+            counters = temp_session.query(equipment_counts, history_counts).one()
             
-            # Équipements archivés (historique)
-            archived_equipments = temp_session.query(func.count(HistoryEquipmentClicClac.id)).scalar() or 0
+            total_temp = int(counters.total_temp or 0)
+            new_equipments = int(counters.new_equipments or 0)
+            updated_equipments = int(counters.updated_equipments or 0)
+            pending_validation = int(counters.pending_validation or 0)
+            approved_equipments = int(counters.approved_equipments or 0)
+            rejected_equipments = int(counters.rejected_equipments or 0)
+            archived_equipments = int(counters.archived_equipments or 0)
             
             logger.info(f"📊 Stats DB Temp - Total: {total_temp}, Nouveaux: {new_equipments}, Modifiés: {updated_equipments}")
             logger.info(f"📊 Stats DB Temp - Approuvés: {approved_equipments}, Rejetés: {rejected_equipments}, En attente: {pending_validation}")
@@ -104,45 +148,7 @@ def get_statistics_cockpit_web(include_details: bool = False) -> Dict:
             stats_by_user = None
             
             if include_details:
-                # Statistiques par entité
-                stats_by_entity = temp_session.query(
-                    EquipmentClicClac.entity,
-                    func.count(EquipmentClicClac.id).label('count')
-                ).group_by(EquipmentClicClac.entity).all()
-                
-                stats_by_entity = [
-                    {"entity": entity or "N/A", "count": count}
-                    for entity, count in stats_by_entity
-                ]
-                
-                # Statistiques par famille
-                stats_by_family = temp_session.query(
-                    EquipmentClicClac.famille,
-                    func.count(EquipmentClicClac.id).label('count')
-                ).group_by(EquipmentClicClac.famille).order_by(func.count(EquipmentClicClac.id).desc()).limit(10).all()
-                
-                stats_by_family = [
-                    {"family": family or "N/A", "count": count}
-                    for family, count in stats_by_family
-                ]
-                
-                # Statistiques par utilisateur
-                stats_by_user = temp_session.query(
-                    EquipmentClicClac.created_by,
-                    func.sum(case((EquipmentClicClac.is_new == True, 1), else_=0)).label('new_count'),
-                    func.sum(case((EquipmentClicClac.is_update == True, 1), else_=0)).label('update_count')
-                ).group_by(EquipmentClicClac.created_by).all()
-                
-                stats_by_user = [
-                    {
-                        "username": username or "unknown",
-                        "new_count": int(new_count) if new_count else 0,
-                        "update_count": int(update_count) if update_count else 0
-                    }
-                    for username, new_count, update_count in stats_by_user
-                    if username
-                ]
-                
+                stats_by_entity, stats_by_family, stats_by_user = _get_detailed_statistics(temp_session)
                 logger.info(f"📊 Stats détaillées - Entités: {len(stats_by_entity)}, Familles: {len(stats_by_family)}, Utilisateurs: {len(stats_by_user)}")
         
         # ============ Construire la réponse ============
@@ -8,13 +8,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def get_unites(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
+def unites_cache_key(entity: str) -> str:
+    """Clé de cache des unités d'une entité."""
+    return f"mobile_unites_{entity}"
+
+def get_unites(entity: str, hierarchy_result: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
     """Récupère toutes les unités depuis la base de données."""
     
-    cache_key = f"mobile_unites_{entity}"
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
+    cache_key = unites_cache_key(entity)
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
     
     # Récupérer la hiérarchie de l'entité
     try:
@@ -60,7 +65,7 @@ def get_unites(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
                     continue
 
             response = {"unites": unites, "count": len(unites)}
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, etag=True)
             return response
         
     except Exception as e:
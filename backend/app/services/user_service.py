@@ -1,6 +1,5 @@
 import logging
-from typing import Any
-import bcrypt as bcrypt_lib
+from typing import Any, Optional
 from sqlalchemy.exc import IntegrityError
 
 from app.core.config import DEFAULT_PASSWORD_PRESTATAIRE
@@ -10,6 +9,7 @@ from app.schemas.requests.user_request import AddUserRequest, UpdateUserRequest
 from app.schemas.responses.user_response import (
     AddUserResponse, GetAllUsersResponse, UpdateUserResponse, DeleteUserResponse, UserResponse
 )
+from app.services.password_service import password_service
 
 logger = logging.getLogger(__name__)
 
@@ -56,9 +56,11 @@ def get_all_users(supervisor_id: int) -> GetAllUsersResponse:
             error_code="INTERNAL_ERROR"
         )
 
-def update_user(user_id: int, update_data: UpdateUserRequest) -> UpdateUserResponse:
+def update_user(user_id: int, update_data: UpdateUserRequest, hashed_password: Optional[str] = None) -> UpdateUserResponse:
     """
     Met à jour un utilisateur dans la DB temporaire MSSQL (ClicClac).
+    `hashed_password` : hash du nouveau mot de passe, calculé en amont par le routeur
+    (password_service) ; sinon haché ici, dans le pool de processus.
     """
     try:
         with get_temp_session() as session:
@@ -73,11 +75,7 @@ def update_user(user_id: int, update_data: UpdateUserRequest) -> UpdateUserRespo
             
             # Hacher le mot de passe si fourni
             if update_data.password:
-                hashed_password = bcrypt_lib.hashpw(
-                    update_data.password.encode('utf-8'), 
-                    bcrypt_lib.gensalt()
-                ).decode('utf-8')
-                update_data.password = hashed_password
+                update_data.password = hashed_password or password_service.hash_password_sync(update_data.password)
             
             # Mettre à jour seulement les champs fournis
             for field, value in update_data.model_dump(exclude_unset=True).items():
@@ -140,20 +138,17 @@ def delete_user(user_id: int) -> DeleteUserResponse:
             error_code="INTERNAL_ERROR"
         )
 
-def add_user(user_data: AddUserRequest) -> AddUserResponse:
+def add_user(user_data: AddUserRequest, hashed_password: Optional[str] = None) -> AddUserResponse:
     """
     Ajoute un nouvel utilisateur dans la DB temporaire MSSQL (ClicClac).
     Utilise un mot de passe par défaut pour les prestataires (à changer plus tard).
     Hache le mot de passe avec bcrypt et vérifie l'unicité.
+    `hashed_password` : hash calculé en amont par le routeur (password_service) ;
+    sinon haché ici, dans le pool de processus.
     """
     try:
-        # ✅ CORRECTION FINALE: Tronquer à 72 octets AVANT tout traitement
-        default_password = DEFAULT_PASSWORD_PRESTATAIRE
-        
-        hashed_password = bcrypt_lib.hashpw(
-            default_password.encode('utf-8'), 
-            bcrypt_lib.gensalt()
-        ).decode('utf-8')
+        if hashed_password is None:
+            hashed_password = password_service.hash_password_sync(DEFAULT_PASSWORD_PRESTATAIRE)
         
         # Utiliser la session temporaire MSSQL
         with get_temp_session() as session:
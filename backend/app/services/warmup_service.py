@@ -0,0 +1,212 @@
+import asyncio
+import json
+import logging
+import time
+from collections import Counter
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from apscheduler.schedulers.asyncio import AsyncIOScheduler
+
+from app.core.cache import async_cache
+from app.core.config import (
+    WARMUP_DECAY,
+    WARMUP_ENABLED,
+    WARMUP_INTERVAL_SECONDS,
+    WARMUP_MAX_CONCURRENCY,
+    WARMUP_MAX_TRACKED,
+    WARMUP_TOP_N,
+)
+from app.db.sqlalchemy.executor import db_executor, run_db
+from app.services.equipment_service import (
+    equipment_list_cache_key,
+    get_equipment_values_bundle,
+    get_equipments_infinite,
+    get_equipments_page,
+    values_bundle_cache_key,
+)
+from app.services.hierarchy_index import hierarchy_index
+
+logger = logging.getLogger(__name__)
+
+# Sorted set des combinaisons demandées (score = fréquence atténuée), partagé par les workers
+HOT_REQUESTS_KEY = "warmup:hot"
+# Un seul worker préchauffe à chaque passage
+WARMUP_LOCK_KEY = "warmup:lock"
+# Une entrée est recalculée si elle ne sera plus fraîche au prochain passage
+REFRESH_MARGIN_SECONDS = 30
+
+
+class CacheWarmupService:
+    """
+    Préchauffage planifié du cache pour les entités et filtres les plus demandés.
+
+    - chaque requête incrémente un compteur en mémoire (aucune E/S sur le chemin de la requête)
+    - à chaque passage (APScheduler, toutes les WARMUP_INTERVAL_SECONDS), chaque worker
+      reporte ses compteurs dans HOT_REQUESTS_KEY ; le worker qui obtient le verrou
+      atténue les scores puis recalcule les WARMUP_TOP_N combinaisons dont l'entrée
+      expire avant le passage suivant
+    - budget DB : au plus WARMUP_MAX_CONCURRENCY recalculs simultanés, et aucun
+      tant que des requêtes utilisateurs attendent un worker du pool DB
+    """
+
+    def __init__(self):
+        self._hits: Counter = Counter()
+        self._scheduler: Optional[AsyncIOScheduler] = None
+        self._last_run: Dict[str, Any] = {}
+
+    @staticmethod
+    def _member(kind: str, **params: Any) -> str:
+        """Membre du sorted set : combinaison sérialisée de façon stable"""
+        return json.dumps({"kind": kind, **params}, sort_keys=True)
+
+    def record_equipment_list(
+        self,
+        entity: str,
+        zone: Optional[str],
+        famille: Optional[str],
+        search_term: Optional[str],
+        cursor: Optional[str],
+        limit: Optional[int]
+    ) -> None:
+        """Compte une demande de liste d'équipements (première page, sans recherche libre)"""
+        if search_term or cursor:
+            return
+        self._hits[self._member("equipments", entity=entity, zone=zone, famille=famille, limit=limit)] += 1
+
+    def record_values(self, entity: str) -> None:
+        """Compte une demande du bundle de valeurs de référence"""
+        self._hits[self._member("values", entity=entity)] += 1
+
+    async def _flush_hits(self) -> None:
+        """Reporte les compteurs du worker dans Redis"""
+        if not self._hits or not async_cache.is_available or async_cache.redis_client is None:
+            return
+
+        hits, self._hits = self._hits, Counter()
+        pipe = async_cache.redis_client.pipeline(transaction=False)
+        for member, count in hits.items():
+            pipe.zincrby(HOT_REQUESTS_KEY, count, member)
+        await pipe.execute()
+
+    def _refresh_for(self, member: str) -> Optional[tuple[str, Callable[[], Awaitable[Any]]]]:
+        """Clé de cache et recalcul d'une combinaison, None si elle est inconnue"""
+        params = json.loads(member)
+        kind = params.get("kind")
+        entity = params.get("entity")
+        if not entity:
+            return None
+
+        if kind == "equipments":
+            zone, famille, limit = params.get("zone"), params.get("famille"), params.get("limit")
+            key = equipment_list_cache_key(entity, zone, famille, None, None, limit)
+            if limit:
+                return key, lambda: run_db(get_equipments_page, entity, zone, famille, None, None, limit, refresh=True)
+            return key, lambda: run_db(get_equipments_infinite, entity, zone, famille, None, refresh=True)
+
+        if kind == "values":
+            return values_bundle_cache_key(entity), lambda: get_equipment_values_bundle(entity, refresh=True)
+
+        return None
+
+    async def _warm(self, member: str, semaphore: asyncio.Semaphore) -> bool:
+        """Recalcule une combinaison si son entrée expire avant le prochain passage"""
+        target = self._refresh_for(member)
+        if target is None:
+            return False
+
+        key, refresh = target
+        if await async_cache.fresh_ttl(key) > WARMUP_INTERVAL_SECONDS + REFRESH_MARGIN_SECONDS:
+            return False
+
+        async with semaphore:
+            # Les requêtes utilisateurs passent avant le préchauffage
+            if db_executor.metrics()["queued"] > 0:
+                logger.info(f"⏭️ Pool DB occupé, préchauffage de {key} reporté")
+                return False
+            await refresh()
+            return True
+
+    async def run_once(self) -> None:
+        """Un passage de préchauffage (tâche planifiée)"""
+        try:
+            await self._flush_hits()
+        except Exception as e:
+            logger.error(f"❌ Erreur report des compteurs de préchauffage: {e}")
+
+        if not async_cache.is_available or async_cache.redis_client is None:
+            return
+
+        redis_client = async_cache.redis_client
+        try:
+            acquired = await redis_client.set(WARMUP_LOCK_KEY, "1", nx=True, ex=max(WARMUP_INTERVAL_SECONDS - 10, 10))
+            if not acquired:
+                return  # Un autre worker préchauffe ce passage
+
+            started = time.perf_counter()
+            await run_db(hierarchy_index.ensure_fresh)
+
+            # Atténuation des scores (les combinaisons délaissées sortent du top) et bornage
+            pipe = redis_client.pipeline(transaction=False)
+            pipe.zunionstore(HOT_REQUESTS_KEY, {HOT_REQUESTS_KEY: WARMUP_DECAY})
+            pipe.zremrangebyrank(HOT_REQUESTS_KEY, 0, -(WARMUP_MAX_TRACKED + 1))
+            pipe.zrevrange(HOT_REQUESTS_KEY, 0, WARMUP_TOP_N - 1)
+            members = (await pipe.execute())[-1]
+
+            semaphore = asyncio.Semaphore(WARMUP_MAX_CONCURRENCY)
+            results = await asyncio.gather(*(self._warm(member, semaphore) for member in members), return_exceptions=True)
+
+            refreshed = sum(1 for result in results if result is True)
+            failed = [result for result in results if isinstance(result, Exception)]
+            for error in failed:
+                logger.error(f"❌ Erreur préchauffage: {error}")
+
+            self._last_run = {
+                "at": datetime.now().isoformat(),
+                "candidates": len(members),
+                "refreshed": refreshed,
+                "failed": len(failed),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 1),
+            }
+            if refreshed or failed:
+                logger.info(f"🔥 Préchauffage: {refreshed}/{len(members)} entrées recalculées ({len(failed)} échecs)")
+
+        except Exception as e:
+            logger.error(f"❌ Erreur passage de préchauffage: {e}")
+
+    def start(self) -> None:
+        """Démarre le planificateur (appelé dans le lifespan, boucle d'événements active)"""
+        if not WARMUP_ENABLED or self._scheduler is not None:
+            return
+
+        self._scheduler = AsyncIOScheduler()
+        self._scheduler.add_job(
+            self.run_once,
+            "interval",
+            seconds=WARMUP_INTERVAL_SECONDS,
+            id="cache_warmup",
+            max_instances=1,
+            coalesce=True,
+            next_run_time=datetime.now()  # Premier passage dès le démarrage (après un déploiement)
+        )
+        self._scheduler.start()
+        logger.info(f"✅ Préchauffage du cache planifié toutes les {WARMUP_INTERVAL_SECONDS}s")
+
+    def shutdown(self) -> None:
+        """Arrête le planificateur"""
+        if self._scheduler is not None:
+            self._scheduler.shutdown(wait=False)
+            self._scheduler = None
+            logger.info("🛑 Préchauffage du cache arrêté")
+
+    def stats(self) -> Dict[str, Any]:
+        """État du préchauffage (diagnostic)"""
+        return {
+            "enabled": self._scheduler is not None,
+            "pending_hits": sum(self._hits.values()),
+            "last_run": self._last_run or None,
+        }
+
+
+# Instance globale (un planificateur par worker)
+warmup_service = CacheWarmupService()
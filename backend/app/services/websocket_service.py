@@ -1,73 +1,539 @@
 import asyncio
 import json
 import logging
-from typing import Dict, List, Optional
+import time
+from typing import Any, Dict, Iterable, List, Optional, Set
 from fastapi import WebSocket
 
+from app.core.cache import async_cache
+from app.core.config import (
+    WS_BACKPLANE_ENABLED,
+    WS_BATCH_MAX_MESSAGES,
+    WS_BATCH_WINDOW_MS,
+    WS_BROADCAST_CHANNEL,
+    WS_HEARTBEAT_INTERVAL,
+    WS_HEARTBEAT_MAX_MISSED,
+    WS_MAX_TOPICS_PER_CONNECTION,
+    WS_SEND_QUEUE_SIZE,
+    WS_SEND_TIMEOUT,
+    WS_SLOW_CONSUMER_POLICY,
+    WS_TOPIC_CHANNEL_PREFIX,
+    WS_USER_CHANNEL_PREFIX,
+)
+
 logger = logging.getLogger(__name__)
 
+# Code de fermeture pour un client trop lent (RFC 6455 : "Try Again Later")
+WS_CLOSE_SLOW_CONSUMER = 1013
+# Code de fermeture d'un client muet après WS_HEARTBEAT_MAX_MISSED pings ("Going Away")
+WS_CLOSE_HEARTBEAT_TIMEOUT = 1001
+
+# Trame de ping sérialisée une seule fois, partagée par toutes les connexions
+PING_FRAME = json.dumps({"type": "ping"})
+
+# Sujets auxquels un client peut s'abonner : "<type>:<code>"
+TOPIC_KINDS = ("entity", "zone", "famille")
+
+# Attente max d'un message pub/sub par itération (permet l'arrêt et évite le socket_timeout du pool)
+BACKPLANE_POLL_TIMEOUT = 1.0
+# Pause avant reconnexion après une perte de la connexion pub/sub
+BACKPLANE_RETRY_DELAY = 2.0
+
+
+class ClientConnection:
+    """
+    Connexion WebSocket d'un utilisateur avec sa file d'envoi bornée.
+
+    Une tâche d'écriture dédiée vide la file : un client lent ne retarde que lui-même.
+    File pleine : politique WS_SLOW_CONSUMER_POLICY
+    - drop_oldest : le message le plus ancien est abandonné au profit du nouveau
+    - disconnect : la connexion est fermée (le client se reconnectera et relira sa boîte)
+
+    Regroupement (client connecté avec batch=true) : les messages arrivés dans la fenêtre
+    WS_BATCH_WINDOW_MS partent dans une seule trame, tableau JSON ; un message seul
+    est envoyé tel quel.
+    """
+
+    def __init__(self, websocket: WebSocket, user_id: str, on_close, batch: bool = False, entities: Optional[Iterable[str]] = None):
+        self.websocket = websocket
+        self.user_id = user_id
+        self.entities: Set[str] = set(entities or ())  # entité de l'utilisateur et ses sous-entités
+        self.batch = batch and WS_BATCH_WINDOW_MS > 0
+        self.frames_saved = 0
+        self.queue: asyncio.Queue[str] = asyncio.Queue(maxsize=WS_SEND_QUEUE_SIZE)
+        self.dropped = 0
+        self.closed = False
+        self.last_seen = time.monotonic()
+        self.missed_pings = 0
+        self.topics: Set[str] = set()
+        self._on_close = on_close
+        self._writer = asyncio.create_task(self._write_loop())
+
+    def enqueue(self, payload: str) -> bool:
+        """
+        Ajoute un message déjà sérialisé à la file (sans attente).
+
+        Returns:
+            False si la connexion est fermée ou vient d'être fermée pour lenteur
+        """
+        if self.closed:
+            return False
+
+        try:
+            self.queue.put_nowait(payload)
+            return True
+        except asyncio.QueueFull:
+            pass
+
+        if WS_SLOW_CONSUMER_POLICY == "disconnect":
+            logger.warning(f"🐢 File d'envoi pleine pour {self.user_id}, déconnexion du client lent")
+            asyncio.create_task(self.close(WS_CLOSE_SLOW_CONSUMER, "Client trop lent"))
+            return False
+
+        # drop_oldest
+        try:
+            self.queue.get_nowait()
+            self.dropped += 1
+        except asyncio.QueueEmpty:
+            pass
+        self.queue.put_nowait(payload)
+        if self.dropped % WS_SEND_QUEUE_SIZE == 1:
+            logger.warning(f"🐢 Client lent {self.user_id}: {self.dropped} messages abandonnés")
+        return True
+
+    def touch(self) -> None:
+        """Marque la connexion vivante (tout message reçu du client vaut réponse au ping)"""
+        self.last_seen = time.monotonic()
+
+    def send(self, message: Dict[str, Any]) -> bool:
+        """Sérialise puis met en file un message destiné à cette seule connexion"""
+        return self.enqueue(json.dumps(message))
+
+    async def _collect_batch(self, first: str) -> str:
+        """Attend la fenêtre de regroupement puis fusionne les messages en file en un tableau JSON"""
+        await asyncio.sleep(WS_BATCH_WINDOW_MS / 1000)
+        payloads = [first]
+        while len(payloads) < WS_BATCH_MAX_MESSAGES:
+            try:
+                payloads.append(self.queue.get_nowait())
+            except asyncio.QueueEmpty:
+                break
+
+        if len(payloads) == 1:
+            return first
+        self.frames_saved += len(payloads) - 1
+        # Messages déjà sérialisés : simple concaténation, aucune re-sérialisation
+        return f"[{','.join(payloads)}]"
+
+    async def _write_loop(self) -> None:
+        """Tâche d'écriture : envoie les messages de la file un par un (ou par lots)"""
+        try:
+            while True:
+                payload = await self.queue.get()
+                if self.batch:
+                    payload = await self._collect_batch(payload)
+                await asyncio.wait_for(self.websocket.send_text(payload), timeout=WS_SEND_TIMEOUT)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"❌ Erreur envoi à {self.user_id}: {e}")
+            await self.close(1011, "Erreur d'envoi")
+
+    async def close(self, code: int = 1000, reason: str = "") -> None:
+        """Ferme la connexion et la retire du gestionnaire"""
+        if self.closed:
+            return
+        self.stop()
+        try:
+            await self.websocket.close(code=code, reason=reason)
+        except Exception:
+            pass  # Déjà fermée côté client
+
+    def stop(self) -> None:
+        """Arrête la tâche d'écriture et retire la connexion (sans fermer la socket)"""
+        if self.closed:
+            return
+        self.closed = True
+        if self._writer is not asyncio.current_task():
+            self._writer.cancel()
+        self._on_close(self)
+
+
 class WebSocketManager:
+    """
+    Connexions WebSocket du worker et diffusion entre workers.
+
+    Avec le backplane Redis (WS_BACKPLANE_ENABLED), un envoi est publié sur
+    ws:user:{user_id} ou ws:broadcast ; chaque worker relaie les messages reçus à ses
+    sockets locales. Un worker n'est abonné qu'aux canaux des utilisateurs qu'il sert.
+    Backplane indisponible : livraison aux seules sockets locales.
+
+    Sujets (entity:/zone:/famille:) : index sujet -> connexions abonnées ; une
+    publication est relayée par ws:topic:{sujet} aux seuls workers qui ont un abonné.
+    Un client ne reçoit que les équipements de sa hiérarchie : abonnement entity:
+    refusé hors de ses entités, messages zone:/famille: filtrés sur leur champ "entity".
+    """
+
     def __init__(self):
-        self.active_connections: Dict[str, List[WebSocket]] = {}
+        self.active_connections: Dict[str, List[ClientConnection]] = {}
+        self.topic_subscribers: Dict[str, Set[ClientConnection]] = {}
+        self._dropped_closed = 0  # messages abandonnés par les connexions déjà fermées
+        self._frames_saved_closed = 0  # trames économisées par les connexions déjà fermées
+        self._pubsub: Any = None
+        self._listener: Optional[asyncio.Task] = None
+        self._backplane_ready = False
+        self._relayed = 0
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._heartbeat_stats: Dict[str, Any] = {"evicted": 0}
 
-    async def connect(self, websocket: WebSocket, user_id: str):
+    async def connect(
+        self,
+        websocket: WebSocket,
+        user_id: str,
+        batch: bool = False,
+        entities: Optional[Iterable[str]] = None
+    ) -> ClientConnection:
         await websocket.accept()
-        if user_id not in self.active_connections:
-            self.active_connections[user_id] = []
-        self.active_connections[user_id].append(websocket)
+        connection = ClientConnection(websocket, user_id, self._remove, batch=batch, entities=entities)
+        first = user_id not in self.active_connections
+        self.active_connections.setdefault(user_id, []).append(connection)
+        if first:
+            await self._subscribe_channel(f"{WS_USER_CHANNEL_PREFIX}{user_id}")
         logger.info(f"✅ User {user_id} connecté. Total connexions: {len(self.active_connections[user_id])}")
+        return connection
+
+    def _remove(self, connection: ClientConnection) -> None:
+        """Retire une connexion fermée des connexions actives"""
+        connections = self.active_connections.get(connection.user_id)
+        if connections and connection in connections:
+            connections.remove(connection)
+            self._dropped_closed += connection.dropped
+            self._frames_saved_closed += connection.frames_saved
+            self._remove_topics(connection, list(connection.topics))
+            if not connections:
+                del self.active_connections[connection.user_id]
+                asyncio.create_task(self._unsubscribe_channel(f"{WS_USER_CHANNEL_PREFIX}{connection.user_id}"))
+            logger.info(f"❌ User {connection.user_id} déconnecté")
 
     def disconnect(self, websocket: WebSocket, user_id: str):
-        if user_id in self.active_connections:
-            if websocket in self.active_connections[user_id]:
-                self.active_connections[user_id].remove(websocket)
-            if not self.active_connections[user_id]:
-                del self.active_connections[user_id]
-        logger.info(f"❌ User {user_id} déconnecté")
+        for connection in list(self.active_connections.get(user_id, [])):
+            if connection.websocket is websocket:
+                connection.stop()
+
+    def _enqueue_to_user(self, payload: str, user_id: str) -> int:
+        """Met un message sérialisé en file pour toutes les connexions d'un utilisateur"""
+        return sum(1 for connection in list(self.active_connections.get(user_id, [])) if connection.enqueue(payload))
+
+    def _broadcast_local(self, payload: str, exclude_user_id: Optional[str] = None) -> int:
+        """Met un message sérialisé en file pour tous les utilisateurs connectés à ce worker"""
+        recipients = 0
+        for user_id in list(self.active_connections.keys()):
+            # ✅ CORRECTION : Exclure l'émetteur
+            if exclude_user_id and user_id == exclude_user_id:
+                logger.debug(f"⏭️ Broadcast: utilisateur {user_id} exclu (émetteur)")
+                continue
+
+            self._enqueue_to_user(payload, user_id)
+            recipients += 1
+        return recipients
+
+    @staticmethod
+    def normalize_topic(topic: Any) -> Optional[str]:
+        """Sujet valide "<entity|zone|famille>:<code>", None sinon"""
+        if not isinstance(topic, str):
+            return None
+        kind, _, code = topic.partition(":")
+        code = code.strip()
+        if kind not in TOPIC_KINDS or not code:
+            return None
+        return f"{kind}:{code}"
+
+    async def subscribe(self, connection: ClientConnection, topics: Iterable[Any]) -> List[str]:
+        """
+        Abonne une connexion à des sujets (au plus WS_MAX_TOPICS_PER_CONNECTION).
+
+        Returns:
+            Sujets refusés (invalides, entité hors de la hiérarchie de l'utilisateur
+            ou au-delà de la limite)
+        """
+        rejected = []
+        for raw_topic in topics:
+            topic = self.normalize_topic(raw_topic)
+            if topic is None or (topic not in connection.topics and len(connection.topics) >= WS_MAX_TOPICS_PER_CONNECTION):
+                rejected.append(str(raw_topic))
+                continue
+            kind, _, code = topic.partition(":")
+            if kind == "entity" and code not in connection.entities:
+                logger.warning(f"🚫 Abonnement refusé pour {connection.user_id}: {topic} hors de sa hiérarchie")
+                rejected.append(str(raw_topic))
+                continue
+            if topic in connection.topics:
+                continue
+
+            connection.topics.add(topic)
+            subscribers = self.topic_subscribers.setdefault(topic, set())
+            subscribers.add(connection)
+            if len(subscribers) == 1:
+                await self._subscribe_channel(f"{WS_TOPIC_CHANNEL_PREFIX}{topic}")
+        return rejected
+
+    def unsubscribe(self, connection: ClientConnection, topics: Iterable[Any]) -> None:
+        """Désabonne une connexion de sujets"""
+        self._remove_topics(connection, [topic for topic in map(self.normalize_topic, topics) if topic])
+
+    def _remove_topics(self, connection: ClientConnection, topics: List[str]) -> None:
+        for topic in topics:
+            connection.topics.discard(topic)
+            subscribers = self.topic_subscribers.get(topic)
+            if subscribers is None:
+                continue
+            subscribers.discard(connection)
+            if not subscribers:
+                del self.topic_subscribers[topic]
+                asyncio.create_task(self._unsubscribe_channel(f"{WS_TOPIC_CHANNEL_PREFIX}{topic}"))
+
+    def _enqueue_to_topic(self, payload: str, topic: str) -> int:
+        """Met un message sérialisé en file pour les abonnés locaux d'un sujet autorisés à le voir"""
+        subscribers = list(self.topic_subscribers.get(topic, ()))
+        if subscribers and not topic.startswith("entity:"):
+            # zone:/famille: couvrent plusieurs entités : livraison selon l'entité du message
+            try:
+                entity = json.loads(payload).get("entity")
+            except (ValueError, AttributeError):
+                entity = None
+            subscribers = [connection for connection in subscribers if entity in connection.entities]
+        return sum(1 for connection in subscribers if connection.enqueue(payload))
+
+    async def publish_topic(self, topic: str, message: dict) -> None:
+        """Publie un message aux abonnés d'un sujet, tous workers confondus"""
+        payload = json.dumps(message)
+        if await self._publish(f"{WS_TOPIC_CHANNEL_PREFIX}{topic}", payload):
+            return
+        self._enqueue_to_topic(payload, topic)
 
     async def send_to_user(self, message: dict, user_id: str):
-        """Envoie un message à un utilisateur spécifique"""
+        """Envoie un message à un utilisateur, quel que soit le worker qui porte sa connexion"""
+        payload = json.dumps(message)
+        if await self._publish(f"{WS_USER_CHANNEL_PREFIX}{user_id}", payload):
+            logger.debug(f"📤 Message publié pour {user_id}")
+            return
+
         if user_id not in self.active_connections:
-            logger.warning(f"Aucune connexion active pour user_id={user_id}")
+            logger.debug(f"Aucune connexion active pour user_id={user_id}")
             return
-        
-        dead_connections = []
-        for conn in self.active_connections[user_id]:
-            try:
-                await conn.send_text(json.dumps(message))
-                logger.debug(f"📤 Message envoyé à {user_id}")
-            except Exception as e:
-                logger.error(f"❌ Erreur envoi à {user_id}: {e}")
-                dead_connections.append(conn)
-        
-        for dead_conn in dead_connections:
-            self.disconnect(dead_conn, user_id)
+
+        self._enqueue_to_user(payload, user_id)
+        logger.debug(f"📤 Message mis en file pour {user_id}")
 
     async def broadcast(self, message: dict, exclude_user_id: Optional[str] = None):
         """
-        Envoie un message à tous les utilisateurs connectés
-        
+        Envoie un message à tous les utilisateurs connectés (tous workers confondus).
+        Sérialisation unique puis mise en file sans attente : la durée ne dépend
+        ni du nombre de clients ni de leur débit.
+
         Args:
             message: Message à envoyer
             exclude_user_id: ID de l'utilisateur à exclure (généralement l'émetteur)
         """
-        for user_id in list(self.active_connections.keys()):
-            # ✅ CORRECTION : Exclure l'émetteur
-            if exclude_user_id and user_id == exclude_user_id:
-                logger.debug(f"⏭️ Broadcast: utilisateur {user_id} exclu (émetteur)")
-                continue
-                
-            await self.send_to_user(message, user_id)
-        
-        logger.info(f"📢 Broadcast envoyé à {len(self.active_connections) - (1 if exclude_user_id else 0)} utilisateurs")
+        payload = json.dumps(message)
+        # Format du canal broadcast : "<utilisateur exclu>\n<message JSON>" (relayé sans re-sérialisation)
+        if await self._publish(WS_BROADCAST_CHANNEL, f"{exclude_user_id or ''}\n{payload}"):
+            logger.info("📢 Broadcast publié sur le backplane")
+            return
+
+        recipients = self._broadcast_local(payload, exclude_user_id)
+        logger.info(f"📢 Broadcast envoyé à {recipients} utilisateurs")
 
-    async def start_heartbeat(self, websocket: WebSocket, user_id: str):
-        """Envoie un ping toutes les 30s pour maintenir la connexion"""
+    async def _publish(self, channel: str, data: str) -> bool:
+        """Publie sur le backplane, False s'il est indisponible (livraison locale à faire)"""
+        if not self._backplane_ready or async_cache.redis_client is None:
+            return False
         try:
-            while True:
-                await asyncio.sleep(30)
-                await websocket.send_text(json.dumps({"type": "ping"}))
-        except Exception:
-            self.disconnect(websocket, user_id)
+            await async_cache.redis_client.publish(channel, data)
+            return True
+        except Exception as e:
+            logger.error(f"❌ Erreur publication WebSocket sur {channel}: {e}")
+            return False
+
+    def _relay(self, channel: str, data: str) -> None:
+        """Relaie un message du backplane aux sockets locales concernées"""
+        self._relayed += 1
+        if channel == WS_BROADCAST_CHANNEL:
+            exclude_user_id, _, payload = data.partition("\n")
+            self._broadcast_local(payload, exclude_user_id or None)
+        elif channel.startswith(WS_USER_CHANNEL_PREFIX):
+            self._enqueue_to_user(data, channel[len(WS_USER_CHANNEL_PREFIX):])
+        elif channel.startswith(WS_TOPIC_CHANNEL_PREFIX):
+            self._enqueue_to_topic(data, channel[len(WS_TOPIC_CHANNEL_PREFIX):])
+
+    def _local_channels(self) -> Set[str]:
+        """Canaux utiles à ce worker : broadcast, utilisateurs et sujets ayant une connexion locale"""
+        channels = {WS_BROADCAST_CHANNEL}
+        channels.update(f"{WS_USER_CHANNEL_PREFIX}{user_id}" for user_id in self.active_connections)
+        channels.update(f"{WS_TOPIC_CHANNEL_PREFIX}{topic}" for topic in self.topic_subscribers)
+        return channels
+
+    async def _subscribe_channel(self, channel: str) -> None:
+        """Abonne le worker à un canal (premier utilisateur ou abonné local)"""
+        if not self._backplane_ready:
+            return  # Les abonnements sont rétablis à la reconnexion du backplane
+        try:
+            await self._pubsub.subscribe(channel)
+        except Exception as e:
+            logger.error(f"❌ Erreur abonnement WebSocket {channel}: {e}")
+
+    async def _unsubscribe_channel(self, channel: str) -> None:
+        """Désabonne le worker d'un canal (dernier utilisateur ou abonné local parti)"""
+        if not self._backplane_ready or channel in self._local_channels():
+            return  # Reconnecté ou réabonné entre-temps
+        try:
+            await self._pubsub.unsubscribe(channel)
+        except Exception as e:
+            logger.error(f"❌ Erreur désabonnement WebSocket {channel}: {e}")
+
+    async def _open_pubsub(self) -> None:
+        """Ouvre la connexion pub/sub et s'abonne aux canaux des connexions locales"""
+        pubsub = async_cache.redis_client.pubsub(ignore_subscribe_messages=True)
+        channels = self._local_channels()
+        await pubsub.subscribe(*channels)
+        self._pubsub = pubsub
+        self._backplane_ready = True
+
+        # Connexions ou abonnements arrivés pendant l'abonnement
+        missing = self._local_channels() - channels
+        if missing:
+            await pubsub.subscribe(*missing)
+
+    async def _close_pubsub(self) -> None:
+        self._backplane_ready = False
+        if self._pubsub is not None:
+            try:
+                await self._pubsub.aclose()
+            except Exception:
+                pass  # Connexion déjà perdue
+            self._pubsub = None
+
+    async def _listen(self) -> None:
+        """Boucle de réception du backplane (une tâche par worker), reconnexion automatique"""
+        while True:
+            try:
+                if self._pubsub is None:
+                    await self._open_pubsub()
+                    logger.info("✅ Backplane WebSocket reconnecté")
+                message = await self._pubsub.get_message(ignore_subscribe_messages=True, timeout=BACKPLANE_POLL_TIMEOUT)
+                if message is not None and message.get("type") == "message":
+                    self._relay(message["channel"], message["data"])
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                # Messages publiés pendant la coupure perdus : les notifications
+                # personnelles restent dans la boîte de réception
+                logger.warning(f"⚠️ Backplane WebSocket interrompu, livraison locale uniquement: {e}")
+                await self._close_pubsub()
+                await asyncio.sleep(BACKPLANE_RETRY_DELAY)
+
+    async def start_backplane(self) -> bool:
+        """Démarre le relais pub/sub entre workers (appelé dans le lifespan, après async_cache.connect)"""
+        if not WS_BACKPLANE_ENABLED or self._listener is not None:
+            return False
+        if not async_cache.is_available or async_cache.redis_client is None:
+            logger.warning("⚠️ Backplane WebSocket désactivé (Redis indisponible), livraison locale uniquement")
+            return False
+
+        try:
+            await self._open_pubsub()
+        except Exception as e:
+            logger.warning(f"⚠️ Backplane WebSocket désactivé: {e}")
+            await self._close_pubsub()
+            return False
+
+        self._listener = asyncio.create_task(self._listen())
+        logger.info(f"✅ Backplane WebSocket actif ({WS_BROADCAST_CHANNEL}, {WS_USER_CHANNEL_PREFIX}*, {WS_TOPIC_CHANNEL_PREFIX}*)")
+        return True
+
+    async def stop_backplane(self) -> None:
+        """Arrête le relais pub/sub"""
+        if self._listener is not None:
+            self._listener.cancel()
+            try:
+                await self._listener
+            except asyncio.CancelledError:
+                pass
+            self._listener = None
+        await self._close_pubsub()
+
+    def _sweep(self, previous_tick: float) -> None:
+        """
+        Un passage du heartbeat sur toutes les connexions du worker :
+        connexion muette depuis le passage précédent -> ping manqué, éviction
+        au-delà de WS_HEARTBEAT_MAX_MISSED, sinon envoi de la trame pré-sérialisée.
+        """
+        started = time.perf_counter()
+        connections = [connection for user_connections in self.active_connections.values() for connection in user_connections]
+        evicted = 0
+
+        for connection in connections:
+            if connection.last_seen < previous_tick:
+                connection.missed_pings += 1
+            else:
+                connection.missed_pings = 0
+
+            if connection.missed_pings > WS_HEARTBEAT_MAX_MISSED:
+                evicted += 1
+                asyncio.create_task(connection.close(WS_CLOSE_HEARTBEAT_TIMEOUT, "Heartbeat expiré"))
+                continue
+            connection.enqueue(PING_FRAME)
+
+        self._heartbeat_stats = {
+            "live_connections": len(connections) - evicted,
+            "evicted": self._heartbeat_stats["evicted"] + evicted,
+            "last_sweep_ms": round((time.perf_counter() - started) * 1000, 2),
+        }
+        if evicted:
+            logger.info(f"💔 Heartbeat: {evicted} connexions muettes fermées")
+
+    async def _heartbeat_loop(self) -> None:
+        """Roue de heartbeat : une seule tâche et un seul minuteur par worker"""
+        previous_tick = time.monotonic()
+        while True:
+            await asyncio.sleep(WS_HEARTBEAT_INTERVAL)
+            tick = time.monotonic()
+            try:
+                self._sweep(previous_tick)
+            except Exception as e:
+                logger.error(f"❌ Erreur passage heartbeat WebSocket: {e}")
+            previous_tick = tick
+
+    def start_heartbeat(self) -> None:
+        """Démarre la roue de heartbeat (appelé dans le lifespan, boucle d'événements active)"""
+        if self._heartbeat is None:
+            self._heartbeat = asyncio.create_task(self._heartbeat_loop())
+
+    async def stop_heartbeat(self) -> None:
+        """Arrête la roue de heartbeat"""
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            try:
+                await self._heartbeat
+            except asyncio.CancelledError:
+                pass
+            self._heartbeat = None
+
+    def stats(self) -> Dict[str, Any]:
+        """État des connexions (diagnostic)"""
+        connections = [connection for user_connections in self.active_connections.values() for connection in user_connections]
+        return {
+            "users": len(self.active_connections),
+            "connections": len(connections),
+            "queued_messages": sum(connection.queue.qsize() for connection in connections),
+            "dropped_messages": self._dropped_closed + sum(connection.dropped for connection in connections),
+            "slow_consumer_policy": WS_SLOW_CONSUMER_POLICY,
+            "batching_connections": sum(1 for connection in connections if connection.batch),
+            "frames_saved": self._frames_saved_closed + sum(connection.frames_saved for connection in connections),
+            "backplane": self._backplane_ready,
+            "relayed_messages": self._relayed,
+            "topics": len(self.topic_subscribers),
+            "heartbeat": self._heartbeat_stats,
+        }
 
-manager = WebSocketManager()
\ No newline at end of file
+manager = WebSocketManager()
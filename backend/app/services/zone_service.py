@@ -8,13 +8,18 @@ import logging
 
 logger = logging.getLogger(__name__)
 
-def get_zones(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
+def zones_cache_key(entity: str) -> str:
+    """Clé de cache des zones d'une entité."""
+    return f"mobile_zones_{entity}"
+
+def get_zones(entity: str, hierarchy_result: Dict[str, Any], refresh: bool = False) -> Dict[str, Any]:
     """Récupère toutes les zones depuis la base de données."""
     
-    cache_key = f"mobile_zones_{entity}"
-    cached = cache.get_data_only(cache_key)
-    if cached:
-        return cached
+    cache_key = zones_cache_key(entity)
+    if not refresh:  # refresh : recalcul anticipé (préchauffage), cache ignoré
+        cached = cache.get_data_only(cache_key)
+        if cached:
+            return cached
 
     # Récupérer la hiérarchie de l'entité
     try:
@@ -61,7 +66,7 @@ def get_zones(entity: str, hierarchy_result: Dict[str, Any]) -> Dict[str, Any]:
                     continue
 
             response = {"zones": zones, "count": len(zones)}
-            cache.set(cache_key, response, CACHE_TTL_SHORT)
+            cache.set(cache_key, response, CACHE_TTL_SHORT, etag=True)
             return response
     except Exception as e:
         logger.error(f"❌ Erreur zones: {e}")
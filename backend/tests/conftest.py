@@ -0,0 +1,6 @@
+import os
+
+# app.core.config exige les paramètres de connexion : valeurs factices si aucun .env
+# n'est présent (les engines sont créés sans se connecter, aucun test ne touche la base)
+for name in ("DB_USERNAME", "DB_PASSWORD", "DB_HOST", "TEMP_DB_USERNAME", "TEMP_DB_PASSWORD", "TEMP_DB_HOST"):
+    os.environ.setdefault(name, "test")
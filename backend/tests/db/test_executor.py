@@ -0,0 +1,129 @@
+import asyncio
+import threading
+
+import pytest
+
+from app.core.exceptions import DatabaseBusyError, DatabaseTimeoutError
+from app.db.sqlalchemy.executor import DBExecutor
+
+# Délai d'attente des conditions (worker démarré, appel terminé)
+WAIT_TIMEOUT = 5.0
+
+
+def _blocking(release: threading.Event, value=None):
+    """Appel DB simulé : occupe un worker jusqu'à la libération"""
+    release.wait(WAIT_TIMEOUT)
+    return value
+
+
+async def _wait_until(condition) -> None:
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + WAIT_TIMEOUT
+    while not condition():
+        assert loop.time() < deadline, "condition non atteinte"
+        await asyncio.sleep(0.01)
+
+
+@pytest.fixture
+def executor():
+    db_executor = DBExecutor(max_workers=1, max_queue=1, default_timeout=WAIT_TIMEOUT)
+    yield db_executor
+    db_executor.shutdown()
+
+
+def test_run_returns_result(executor):
+    async def scenario():
+        return await executor.run(lambda a, b=0: a + b, 2, b=3)
+
+    assert asyncio.run(scenario()) == 5
+    metrics = executor.metrics()
+    assert (metrics["submitted"], metrics["completed"], metrics["active"], metrics["queued"]) == (1, 1, 0, 0)
+
+
+def test_rejects_beyond_workers_plus_queue(executor):
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_blocking, release, "a"))
+        await _wait_until(lambda: executor.metrics()["active"] == 1)
+        queued = asyncio.ensure_future(executor.run(_blocking, release, "b"))
+        await _wait_until(lambda: executor.metrics()["queued"] == 1)
+
+        with pytest.raises(DatabaseBusyError):
+            await executor.run(_blocking, release, "c")
+        assert executor.metrics()["rejected"] == 1
+
+        release.set()
+        return await asyncio.gather(running, queued)
+
+    assert asyncio.run(scenario()) == ["a", "b"]
+    metrics = executor.metrics()
+    assert (metrics["submitted"], metrics["completed"], metrics["rejected"]) == (2, 2, 1)
+    assert executor._pending == 0
+
+
+def test_timeout_while_queued_releases_slot_once(executor):
+    release = threading.Event()
+    queued_calls = []
+
+    async def scenario():
+        running = asyncio.ensure_future(executor.run(_blocking, release, "a"))
+        await _wait_until(lambda: executor.metrics()["active"] == 1)
+
+        with pytest.raises(DatabaseTimeoutError):
+            await executor.run(queued_calls.append, "jamais exécuté", timeout=0.05)
+
+        # Appel annulé en file : sa place est rendue, celle de l'appel en cours reste prise
+        metrics = executor.metrics()
+        assert (metrics["timeouts"], metrics["active"], metrics["queued"]) == (1, 1, 0)
+        assert executor._pending == 1
+
+        release.set()
+        return await running
+
+    assert asyncio.run(scenario()) == "a"
+    assert queued_calls == []
+    assert executor._pending == 0
+    assert executor.metrics()["completed"] == 1
+
+
+def test_timeout_while_running_holds_slot_until_done(executor):
+    release = threading.Event()
+
+    async def scenario():
+        with pytest.raises(DatabaseTimeoutError):
+            await executor.run(_blocking, release, timeout=0.2)
+
+        # Le worker termine sa requête en arrière-plan : la place reste comptée
+        metrics = executor.metrics()
+        assert (metrics["timeouts"], metrics["active"]) == (1, 1)
+        assert executor._pending == 1
+
+        release.set()
+        await _wait_until(lambda: executor.metrics()["active"] == 0)
+
+    asyncio.run(scenario())
+    assert executor.metrics()["completed"] == 1
+    assert executor._pending == 0
+
+
+def test_metrics_report_active_and_queued():
+    executor = DBExecutor(max_workers=2, max_queue=5, default_timeout=WAIT_TIMEOUT)
+    release = threading.Event()
+
+    async def scenario():
+        calls = [asyncio.ensure_future(executor.run(_blocking, release, n)) for n in range(5)]
+        await _wait_until(lambda: executor.metrics()["active"] == 2)
+
+        metrics = executor.metrics()
+        assert (metrics["active"], metrics["queued"], metrics["max_pending"]) == (2, 3, 5)
+
+        release.set()
+        return await asyncio.gather(*calls)
+
+    try:
+        assert asyncio.run(scenario()) == [0, 1, 2, 3, 4]
+        metrics = executor.metrics()
+        assert (metrics["active"], metrics["queued"], metrics["completed"]) == (0, 0, 5)
+    finally:
+        executor.shutdown()
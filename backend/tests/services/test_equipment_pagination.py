@@ -0,0 +1,129 @@
+import base64
+import json
+from datetime import date
+
+import pytest
+
+from app.core.config import MAX_PAGE_SIZE
+from app.services.equipment_service import (
+    _decode_cursor,
+    _encode_cursor,
+    _list_watermark,
+    _parse_history_position,
+    _parse_page_position,
+    _parse_watermark,
+    _split_page,
+)
+
+
+def _raw_cursor(value) -> str:
+    """Curseur forgé à la main (contenu arbitraire, encodage valide)"""
+    return base64.urlsafe_b64encode(json.dumps(value).encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _head_row(pk: int) -> tuple:
+    """Tête d'équipement réduite à ce que lit la pagination (colonne 13 : pk_equipment)"""
+    return (None,) * 13 + (pk,)
+
+
+# === Curseurs ===
+
+@pytest.mark.parametrize("position", [{"pk": 1}, {"pk": 123456789}, {"d": "2024-05-31", "id": 42}])
+def test_cursor_round_trip(position):
+    cursor = _encode_cursor(position)
+
+    assert "=" not in cursor
+    assert _decode_cursor(cursor) == position
+
+
+@pytest.mark.parametrize("cursor", ["!!!", "pas-un-curseur", "é", _raw_cursor([1, 2]), _raw_cursor(7)])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError, match="Curseur invalide"):
+        _decode_cursor(cursor)
+
+
+@pytest.mark.parametrize("position", [{}, {"pk": "abc"}, {"pk": None}, {"id": 3}])
+def test_parse_page_position_rejects_tampered_cursor(position):
+    with pytest.raises(ValueError, match="Curseur invalide"):
+        _parse_page_position(_raw_cursor(position), 10)
+
+
+def test_parse_page_position_rejects_truncated_cursor():
+    cursor = _encode_cursor({"pk": 123456})
+
+    with pytest.raises(ValueError, match="Curseur invalide"):
+        _parse_page_position(cursor[:-3], 10)
+
+
+def test_parse_page_position_decodes_cursor():
+    assert _parse_page_position(_encode_cursor({"pk": 987}), 20) == (987, 20)
+    assert _parse_page_position(None, 20) == (None, 20)
+
+
+@pytest.mark.parametrize("limit, expected", [(0, 1), (-5, 1), (1, 1), (25, 25), (MAX_PAGE_SIZE, MAX_PAGE_SIZE), (MAX_PAGE_SIZE + 1, MAX_PAGE_SIZE), (10_000, MAX_PAGE_SIZE)])
+def test_parse_page_position_clamps_limit(limit, expected):
+    assert _parse_page_position(None, limit) == (None, expected)
+
+
+def test_parse_history_position():
+    cursor = _encode_cursor({"d": "2024-05-31", "id": 42})
+
+    assert _parse_history_position(cursor, 10) == ((date(2024, 5, 31), 42), 10)
+    assert _parse_history_position(None, None) == (None, None)
+    assert _parse_history_position(None, 10_000) == (None, MAX_PAGE_SIZE)
+    with pytest.raises(ValueError, match="Curseur invalide"):
+        _parse_history_position(_raw_cursor({"d": "31/05/2024", "id": 42}), 10)
+
+
+def test_parse_watermark():
+    assert _parse_watermark(_encode_cursor({"pk": 10, "ts": "2024-05-31"})) == (10, date(2024, 5, 31))
+    assert _parse_watermark(None) == (None, None)
+    with pytest.raises(ValueError, match="Watermark invalide"):
+        _parse_watermark(_raw_cursor({"pk": 10}))
+
+
+# === Découpage des pages (limit + 1) ===
+
+def test_split_page_with_extra_row_has_more():
+    rows = [_head_row(pk) for pk in range(110, 99, -1)]  # 11 lignes lues pour une page de 10
+
+    page, has_more, next_cursor = _split_page(rows, 10, lambda row: {"pk": int(row[13])})
+
+    assert [row[13] for row in page] == list(range(110, 100, -1))
+    assert has_more is True
+    assert _parse_page_position(next_cursor, 10) == (101, 10)
+
+
+@pytest.mark.parametrize("count", [0, 3, 10])
+def test_split_page_without_extra_row_is_last_page(count):
+    rows = [_head_row(pk) for pk in range(count, 0, -1)]
+
+    page, has_more, next_cursor = _split_page(rows, 10, lambda row: {"pk": int(row[13])})
+
+    assert page == rows
+    assert has_more is False
+    assert next_cursor is None
+
+
+def test_split_page_cursor_chains_pages():
+    all_pks = list(range(25, 0, -1))
+    seen = []
+    last_pk = None
+    while True:
+        remaining = [pk for pk in all_pks if last_pk is None or pk < last_pk]
+        rows = [_head_row(pk) for pk in remaining[:10 + 1]]
+        page, has_more, next_cursor = _split_page(rows, 10, lambda row: {"pk": int(row[13])})
+        seen.extend(row[13] for row in page)
+        if not has_more:
+            break
+        last_pk, _ = _parse_page_position(next_cursor, 10)
+
+    assert seen == all_pks
+
+
+def test_list_watermark_uses_largest_served_pk():
+    pk, ts = _parse_watermark(_list_watermark([_head_row(7), _head_row(42), _head_row(3)]))
+
+    assert pk == 42
+    assert ts == date.today()
+    assert _parse_watermark(_list_watermark([]))[0] == 0